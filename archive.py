@@ -0,0 +1,146 @@
+import io
+import os
+import tarfile
+import time
+import zipfile
+
+from encoder import DEFAULT_PROFILE, encode_image, format_bytes, get_profile
+from instrumentation import metrics, progress
+
+
+# Archivformate und ihre Dateiendungen
+ARCHIVE_FORMATS = {
+    "zip": (".zip",),
+    "tar": (".tar",),
+    "tar.gz": (".tar.gz", ".tgz"),
+}
+
+# Bereits komprimierte Einträge werden im ZIP nur gespeichert, nicht erneut komprimiert
+STORED_EXTENSIONS = (".png", ".webp", ".pdf")
+
+
+def archive_format(path):
+    """
+    Bestimmt das Archivformat aus der Dateiendung
+
+    Raises:
+        ValueError: Bei unbekannter Endung
+    """
+    lowered = path.lower()
+    for name, extensions in ARCHIVE_FORMATS.items():
+        if lowered.endswith(extensions):
+            return name
+    allowed = ", ".join(extension for extensions in ARCHIVE_FORMATS.values() for extension in extensions)
+    raise ValueError(f"Unbekanntes Archivformat: {path} (erlaubt: {allowed})")
+
+
+class ArchiveSink:
+    """
+    Schreibt kodierte Karten direkt als Einträge in ein ZIP- oder TAR-Archiv
+
+    Das Archiv entsteht unter einem temporären Namen und ersetzt die Zieldatei erst nach
+    erfolgreichem Abschluss, ein abgebrochener Export hinterlässt also kein halbes Archiv.
+    """
+
+    def __init__(self, path, archive_type=None):
+        self.path = path
+        self.archive_type = archive_type or archive_format(path)
+        self.entries = 0
+        self.bytes = 0
+        self._temp_path = path + ".tmp"
+        self._archive = None
+        self._mtime = time.time()
+
+    def __enter__(self):
+        output_dir = os.path.dirname(self.path)
+        if output_dir and not os.path.exists(output_dir):
+            os.makedirs(output_dir)
+        if self.archive_type == "zip":
+            self._archive = zipfile.ZipFile(self._temp_path, "w", zipfile.ZIP_DEFLATED)
+        else:
+            self._archive = tarfile.open(self._temp_path, "w:gz" if self.archive_type == "tar.gz" else "w")
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self._archive.close()
+        if exc_type is None:
+            os.replace(self._temp_path, self.path)
+        else:
+            os.remove(self._temp_path)
+
+    def add(self, name, data):
+        """
+        Fügt einen Eintrag hinzu (name mit '/' als Ordnertrenner)
+        """
+        with metrics.span("write", entry=name):
+            if self.archive_type == "zip":
+                info = zipfile.ZipInfo(name, time.localtime(self._mtime)[:6])
+                info.compress_type = zipfile.ZIP_STORED if name.lower().endswith(STORED_EXTENSIONS) \
+                    else zipfile.ZIP_DEFLATED
+                info.external_attr = 0o644 << 16
+                self._archive.writestr(info, data)
+            else:
+                info = tarfile.TarInfo(name)
+                info.size = len(data)
+                info.mtime = int(self._mtime)
+                info.mode = 0o644
+                self._archive.addfile(info, io.BytesIO(data))
+        self.entries += 1
+        self.bytes += len(data)
+        metrics.count("archive.entries")
+        metrics.count("bytes.written", len(data))
+
+
+def encode_entry(filename, item, profile=DEFAULT_PROFILE):
+    """
+    Kodiert ein Element der Kartengeneratoren (PIL-Bild oder VectorCanvas)
+
+    Returns:
+        tuple: (Dateiname mit Endung laut Profil bzw. Vektorformat, Bytes)
+    """
+    if hasattr(item, "tobytes") and not hasattr(item, "mode"):
+        with metrics.span("encode", profile=type(item).__name__):
+            return filename, item.tobytes()
+    data, _ = encode_image(item, profile)
+    return get_profile(profile).filename(filename), data
+
+
+def write_archive(sources, path, profile=DEFAULT_PROFILE, archive_type=None):
+    """
+    Streamt Karten aus Generatoren direkt in ein Archiv, ohne Zwischendateien
+
+    Es ist immer nur eine Karte (Bild und kodierte Bytes) gleichzeitig im Speicher.
+
+    Args:
+        sources (iterable): (Ordner im Archiv, Generator von (Dateiname, Bild/VectorCanvas)); Ordner '' = Wurzel
+        path (str): Zielarchiv (.zip, .tar, .tar.gz / .tgz)
+        profile (str): Kodierprofil der Rasterbilder
+        archive_type (str): Archivformat, falls es nicht aus der Endung hervorgeht
+
+    Returns:
+        ArchiveSink: mit entries (Anzahl Einträge) und bytes (Summe der Eintragsgrößen)
+    """
+    with ArchiveSink(path, archive_type) as sink:
+        for folder, items in sources:
+            for filename, item in items:
+                with metrics.span("card", entry=filename):
+                    name, data = encode_entry(filename, item, profile)
+                    # Bild freigeben, bevor der Generator die nächste Karte zeichnet
+                    del item
+                    sink.add(f"{folder}/{name}" if folder else name, data)
+                progress(f"📦 {folder + '/' if folder else ''}{name} ({format_bytes(len(data))})")
+    return sink
+
+
+def iter_board(excel_file="grundstuecke.xlsx", template_path="dkt_template.png", layout=None, font_size=32):
+    """
+    Beschriftetes Brett als einzelnes Element für write_archive
+
+    Yields:
+        tuple: ('dkt_beschriftet.png', PIL-Bild)
+    """
+    from board_layout import DEFAULT_LAYOUT
+    from script import FixedPricePositionLabeler
+
+    labeler = FixedPricePositionLabeler(template_path, excel_file=excel_file, layout=layout or DEFAULT_LAYOUT)
+    yield "dkt_beschriftet.png", labeler.render(font_size)
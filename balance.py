@@ -0,0 +1,369 @@
+import argparse
+import csv
+import time
+
+import numpy as np
+
+from board_layout import DEFAULT_LAYOUT, load_layout
+from card_actions import JAIL, MOVE_BY, MOVE_TO, load_action_table
+from instrumentation import metrics
+from workbooks import BOARD_SCHEMA, PROPERTY_SCHEMA, load_workbook
+
+
+# Seiten in Zugrichtung (Uhrzeigersinn); unten und links läuft der Weg gegen die Anchor-Richtung
+SIDE_ORDER = ("top", "right", "bottom", "left")
+REVERSED_SIDES = ("bottom", "left")
+
+# Mietspalten der Grundstückskarten und ihre Bedeutung je Kartenart
+RENT_COLUMNS = ('Miete', 'Miete_1_Haus', 'Miete_2_Haus', 'Miete_3_Haus', 'Miete_4_Haus', 'Miete_Hotel')
+RENT_LEVELS = {
+    'strasse': ("allein", "1 Haus", "2 Häuser", "3 Häuser", "4 Häuser", "Hotel"),
+    'bahnhof': ("1 Bahnhof", "2 Bahnhöfe", "3 Bahnhöfe", "4 Bahnhöfe"),
+    'werk': ("1 Werk", "2 Werke"),
+}
+
+# Werke: Miete = Faktor × Augensumme (Erwartungswert zweier Würfel)
+WERK_FACTORS = (4, 10)
+MEAN_ROLL = 7
+
+
+class BoardTrack:
+    """
+    Spielweg des Bretts: Feld 0 ist Start, gezogen wird im Uhrzeigersinn
+
+    rows enthält je Feld die Zeile in grundstuecke.xlsx (-1 für Ecken und Kartenfelder),
+    card_fields markiert die unbeschrifteten Felder, auf denen eine Ereigniskarte gezogen wird.
+    """
+
+    def __init__(self, rows, names, jail, go_to_jail, card_fields):
+        self.rows = rows
+        self.names = names
+        self.jail = jail
+        self.go_to_jail = go_to_jail
+        self.card_fields = card_fields
+
+    @property
+    def size(self):
+        return len(self.rows)
+
+    def position_of(self, row):
+        """
+        Feldnummer einer Zeile aus grundstuecke.xlsx (None, wenn sie nicht auf dem Brett liegt)
+        """
+        positions = np.flatnonzero(self.rows == row)
+        return int(positions[0]) if len(positions) else None
+
+
+class RentYield:
+    """
+    Erwartete Mieteinnahmen je gegnerischem Wurf für jedes Grundstück und jede Ausbaustufe
+
+    Alle Felder sind NumPy-Arrays in Brettreihenfolge; nicht belegte Stufen sind NaN.
+    """
+
+    def __init__(self, positions, names, kinds, frequency, rents, costs):
+        self.positions = positions
+        self.names = names
+        self.kinds = kinds
+        self.frequency = frequency
+        self.rents = rents
+        self.costs = costs
+        self.per_roll = frequency[:, None] * rents
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.payback = costs / self.per_roll
+
+    def __len__(self):
+        return len(self.positions)
+
+    def write_csv(self, path):
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f, delimiter=";")
+            levels = range(self.rents.shape[1])
+            writer.writerow(["Feld", "Name", "Art", "Treffer je Wurf"]
+                            + [f"Ertrag Stufe {level}" for level in levels]
+                            + [f"Amortisation Stufe {level}" for level in levels])
+            for row in range(len(self)):
+                writer.writerow([int(self.positions[row]), self.names[row], self.kinds[row],
+                                 f"{self.frequency[row]:.6f}"]
+                                + [_csv_number(value) for value in self.per_roll[row]]
+                                + [_csv_number(value) for value in self.payback[row]])
+
+
+def board_track(board_workbook, layout=DEFAULT_LAYOUT):
+    """
+    Leitet den Spielweg aus den Feldpositionen der Layout-Datei ab (Abschnitt 'track')
+
+    Raises:
+        ValueError: Wenn das Layout keinen Spielweg beschreibt oder zwei Felder auf dieselbe Stelle fallen
+    """
+    spec = load_layout(layout).get("track")
+    if spec is None:
+        raise ValueError(f"{layout}: Kein Abschnitt 'track', der Spielweg ist unbekannt")
+
+    fields = load_layout(layout)["fields"]
+    per_side = int(spec.get("fields_per_side", 9))
+    first = spec.get("first_anchor", min(field["anchor"] for field in fields))
+    last = spec.get("last_anchor", max(field["anchor"] for field in fields))
+    pitch = (last - first) / (per_side - 1)
+    start = SIDE_ORDER.index(spec.get("start_side", "top"))
+    side_order = SIDE_ORDER[start:] + SIDE_ORDER[:start]
+
+    size = 4 * (per_side + 1)
+    rows = np.full(size, -1)
+    names = [""] * size
+    for corner, name in enumerate(spec.get("corners", ())):
+        names[corner * (per_side + 1)] = name
+
+    board_names = board_workbook['Name']
+    for field in fields:
+        offset = (last - field["anchor"]) if field["side"] in REVERSED_SIDES else (field["anchor"] - first)
+        slot = int(round(offset / pitch))
+        if not 0 <= slot < per_side:
+            raise ValueError(f"{layout}: Feld {field['index']} liegt außerhalb der {per_side} Felder einer Seite")
+        position = side_order.index(field["side"]) * (per_side + 1) + 1 + slot
+        if rows[position] >= 0:
+            raise ValueError(f"{layout}: Felder {rows[position]} und {field['index']} liegen beide auf Feld {position}")
+        rows[position] = field["index"]
+        names[position] = board_names[field["index"]] if field["index"] < len(board_names) else ""
+
+    corners = np.zeros(size, dtype=bool)
+    corners[::per_side + 1] = True
+    card_fields = (rows < 0) & ~corners
+    for position in np.flatnonzero(card_fields):
+        names[position] = "Ereignisfeld"
+
+    return BoardTrack(rows, names, int(spec.get("jail", 2 * (per_side + 1))),
+                      int(spec.get("go_to_jail", 3 * (per_side + 1))), card_fields)
+
+
+def card_moves(actions, track):
+    """
+    Bewegungen der Ereigniskarten aus der Aktionstabelle (siehe card_actions.py)
+
+    Returns:
+        tuple: (Liste je Karte: None, 'jail', ('to', Feld) oder ('by', Schritte);
+                Liste (Zeile, Ziel) der Ziele, die nicht auf dem Brett liegen)
+    """
+    targets, unresolved = actions.resolve_targets(track.names)
+    moves = []
+    for position in range(len(actions)):
+        kind = actions.kinds[position]
+        if kind == JAIL:
+            moves.append('jail')
+        elif kind == MOVE_BY and actions.steps[position]:
+            moves.append(('by', int(actions.steps[position])))
+        elif kind == MOVE_TO and targets[position] >= 0:
+            moves.append(('to', int(targets[position])))
+        else:
+            moves.append(None)
+    return moves, unresolved
+
+
+def landing_effects(track, moves):
+    """
+    Wohin ein Stein gelangt, der auf einem Feld landet (Ereigniskarte, Geh in den Häfn)
+
+    Returns:
+        ndarray: (Felder × Felder + 1), letzte Spalte = Häfn
+    """
+    size = track.size
+    effects = np.zeros((size, size + 1))
+    effects[np.arange(size), np.arange(size)] = 1
+    effects[track.go_to_jail] = 0
+    effects[track.go_to_jail, size] = 1
+
+    if moves:
+        share = 1 / len(moves)
+        for field in np.flatnonzero(track.card_fields):
+            for move in moves:
+                if move is None:
+                    continue
+                if move == 'jail':
+                    target = size
+                elif move[0] == 'to':
+                    target = move[1]
+                else:
+                    target = (field + move[1]) % size
+                    if target == track.go_to_jail:
+                        target = size
+                effects[field, field] -= share
+                effects[field, target] += share
+    return effects
+
+
+def dice_matrices(size):
+    """
+    Zugwahrscheinlichkeiten zweier Würfel, getrennt nach Pasch und Nicht-Pasch
+
+    Returns:
+        tuple: (ohne Pasch, mit Pasch), je (Felder × Felder)
+    """
+    first, second = np.meshgrid(np.arange(1, 7), np.arange(1, 7))
+    sums, doubles = (first + second).ravel(), (first == second).ravel()
+    origins = np.repeat(np.arange(size)[:, None], len(sums), axis=1)
+    targets = (origins + sums[None, :]) % size
+
+    plain, double = np.zeros((size, size)), np.zeros((size, size))
+    np.add.at(plain, (origins[:, ~doubles], targets[:, ~doubles]), 1 / 36)
+    np.add.at(double, (origins[:, doubles], targets[:, doubles]), 1 / 36)
+    return plain, double
+
+
+def transition_matrix(track, effects, jail_turns=3):
+    """
+    Übergangsmatrix eines Wurfs
+
+    Zustände: (Feld, bisherige Pasche 0-2) für jedes Feld, danach die Runden im Häfn. Der dritte
+    Pasch in Folge führt in den Häfn; dort wird bis zu jail_turns-mal auf einen Pasch gewürfelt,
+    danach wird gezahlt und mit dem letzten Wurf gezogen.
+    """
+    if jail_turns < 1:
+        raise ValueError("jail_turns muss mindestens 1 sein")
+
+    size = track.size
+    plain, double = dice_matrices(size)
+    after_plain, after_double = plain @ effects, double @ effects
+    jail = 3 * size
+
+    matrix = np.zeros((3 * size + jail_turns, 3 * size + jail_turns))
+    for doubles in range(3):
+        block = slice(doubles * size, (doubles + 1) * size)
+        matrix[block, :size] += after_plain[:, :size]
+        matrix[block, jail] += after_plain[:, size]
+        if doubles < 2:
+            matrix[block, (doubles + 1) * size:(doubles + 2) * size] += after_double[:, :size]
+            matrix[block, jail] += after_double[:, size]
+        else:
+            matrix[block, jail] += 1 / 6
+
+    for turn in range(jail_turns):
+        state = jail + turn
+        # Pasch: raus, ohne erneut zu würfeln
+        matrix[state, :size] += after_double[track.jail, :size]
+        matrix[state, jail] += after_double[track.jail, size]
+        if turn < jail_turns - 1:
+            matrix[state, state + 1] += 5 / 6
+        else:
+            matrix[state, :size] += after_plain[track.jail, :size]
+            matrix[state, jail] += after_plain[track.jail, size]
+    return matrix
+
+
+def steady_state(matrix):
+    """
+    Stationäre Verteilung π mit π·P = π und Σπ = 1
+    """
+    states = matrix.shape[0]
+    system = matrix.T - np.eye(states)
+    system[-1] = 1
+    rhs = np.zeros(states)
+    rhs[-1] = 1
+    return np.linalg.solve(system, rhs)
+
+
+def landing_frequencies(track, moves=(), jail_turns=3):
+    """
+    Wahrscheinlichkeit, dass ein Wurf auf dem jeweiligen Feld endet
+
+    Returns:
+        tuple: (ndarray je Feld, Anteil der Würfe, die im Häfn enden)
+    """
+    with metrics.span("balance.solve", states=3 * track.size + jail_turns):
+        distribution = steady_state(transition_matrix(track, landing_effects(track, moves), jail_turns))
+    size = track.size
+    return distribution[:3 * size].reshape(3, size).sum(axis=0), distribution[3 * size:].sum()
+
+
+def rent_yield(track, frequency, property_workbook):
+    """
+    Verknüpft die Trefferwahrscheinlichkeiten mit den Mieten aus besitzkarten.xlsx
+
+    Zeile i von grundstuecke.xlsx gehört zu Zeile i von besitzkarten.xlsx; Felder ohne Karte
+    (z.B. Zahlfelder) fehlen im Ergebnis. Die Kosten einer Stufe sind Kaufpreis plus Häuser
+    (Hotel = 5 Häuser), bei Bahnhöfen und Werken nur der Kaufpreis.
+
+    Returns:
+        RentYield
+    """
+    positions = np.flatnonzero((track.rows >= 0) & (track.rows < len(property_workbook)))
+    rows = track.rows[positions]
+
+    werk = np.asarray(property_workbook['IstWerk'])[rows] == 1
+    bahnhof = (np.asarray(property_workbook['IstBahnhof'])[rows] == 1) & ~werk
+    kinds = np.where(werk, 'werk', np.where(bahnhof, 'bahnhof', 'strasse'))
+
+    rents = np.column_stack([np.asarray(property_workbook[column], dtype=float)[rows] for column in RENT_COLUMNS])
+    rents[bahnhof, len(RENT_LEVELS['bahnhof']):] = np.nan
+    rents[werk] = np.nan
+    rents[np.ix_(werk, range(len(WERK_FACTORS)))] = np.array(WERK_FACTORS, dtype=float) * MEAN_ROLL
+
+    houses = np.arange(len(RENT_COLUMNS), dtype=float)
+    kaufpreis = np.asarray(property_workbook['Kaufpreis'], dtype=float)[rows]
+    hauspreis = np.asarray(property_workbook['Hauspreis'], dtype=float)[rows]
+    costs = kaufpreis[:, None] + np.where(kinds == 'strasse', hauspreis, 0)[:, None] * houses[None, :]
+
+    names = [property_workbook['Name'][row] for row in rows]
+    return RentYield(positions, names, kinds, frequency[positions], rents, costs)
+
+
+def analyze(board_file="grundstuecke.xlsx", property_file="besitzkarten.xlsx", event_file="ereignis_gemeinschaft.xlsx",
+            layout=DEFAULT_LAYOUT, jail_turns=3):
+    """
+    Trefferwahrscheinlichkeiten und Mietertrag aus den drei Arbeitsmappen
+
+    Returns:
+        tuple: (BoardTrack, Felder-Wahrscheinlichkeiten, Häfn-Anteil, RentYield, (Zeile, Ziel) nicht gefundener
+                Kartenziele)
+    """
+    track = board_track(load_workbook(board_file, BOARD_SCHEMA), layout)
+    moves, unresolved = card_moves(load_action_table(event_file), track)
+    frequency, in_jail = landing_frequencies(track, moves, jail_turns)
+    return track, frequency, in_jail, rent_yield(track, frequency, load_workbook(property_file, PROPERTY_SCHEMA)), \
+        unresolved
+
+
+def print_report(track, frequency, in_jail, yields, top=None):
+    """
+    Gibt Trefferwahrscheinlichkeiten und Ertrag je Ausbaustufe aus
+    """
+    mean = 1 / track.size
+    print(f"\n🎲 Treffer je Wurf (Durchschnitt {mean:.2%}, im Häfn {in_jail:.2%})")
+    order = np.argsort(-frequency)[:top] if top else range(track.size)
+    for position in order:
+        bar = "█" * int(round(frequency[position] / mean * 10))
+        print(f"   {position:2d} {track.names[position][:18]:<18} {frequency[position]:6.2%} {bar}")
+
+    print("\n💰 Mietertrag je gegnerischem Wurf in € (Amortisation in Würfen)")
+    for row in range(len(yields)):
+        levels = RENT_LEVELS[yields.kinds[row]]
+        values = "  ".join(f"{label} {yields.per_roll[row, level]:5.2f} ({yields.payback[row, level]:4.0f})"
+                           for level, label in enumerate(levels))
+        print(f"   {yields.positions[row]:2d} {yields.names[row][:18]:<18} {yields.frequency[row]:6.2%}  {values}")
+
+
+def _csv_number(value):
+    return "" if np.isnan(value) else f"{value:.4f}"
+
+
+# Hauptfunktion
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Markow-Kette des Bretts: Trefferwahrscheinlichkeiten und Mietertrag")
+    parser.add_argument("--board", default="grundstuecke.xlsx", help="Grundstücke des Bretts")
+    parser.add_argument("--property", default="besitzkarten.xlsx", help="Grundstückskarten mit den Mieten")
+    parser.add_argument("--event", default="ereignis_gemeinschaft.xlsx", help="Ereigniskarten (Bewegungen)")
+    parser.add_argument("--layout", default=DEFAULT_LAYOUT, help="Layout-Datei mit dem Abschnitt 'track'")
+    parser.add_argument("--jail-turns", type=int, default=3, help="Würfe auf einen Pasch im Häfn, bevor gezahlt wird")
+    parser.add_argument("--top", type=int, default=None, help="Nur die N häufigsten Felder auflisten")
+    parser.add_argument("--csv", default=None, help="Ertragstabelle zusätzlich als CSV speichern")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    board_track_, frequency_, in_jail_, yields_, unresolved_ = analyze(args.board, args.property, args.event,
+                                                                       args.layout, args.jail_turns)
+    print_report(board_track_, frequency_, in_jail_, yields_, args.top)
+    for row_, target_ in unresolved_:
+        print(f"⚠️ Zeile {row_ + 2}: Kartenziel '{target_}' nicht auf dem Brett, Karte gilt als ohne Bewegung")
+    if args.csv:
+        yields_.write_csv(args.csv)
+        print(f"💾 Ertragstabelle gespeichert: {args.csv}")
+    print(f"\n⏱️ Analyse in {(time.perf_counter() - start) * 1000:.1f} ms")
@@ -0,0 +1,351 @@
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import PIL
+
+from encoder import DEFAULT_PROFILE, PROFILES, encode_image, get_profile
+from instrumentation import StageTimer, peak_rss_mb
+from workbooks import BOARD_SCHEMA, EVENT_SCHEMA, PROPERTY_SCHEMA, load_workbook
+
+
+# Standardordner für Ergebnisse (eine JSON-Datei pro Lauf)
+RESULTS_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks")
+
+BENCHMARK_TARGETS = ("property", "event", "board")
+
+# Karten pro Messblock: so liegen nie mehr als CHUNK_SIZE Bilder gleichzeitig im Speicher
+CHUNK_SIZE = 64
+
+# Bausteine für synthetische Texte
+NAME_WORDS = ["Bad", "Turm", "See", "Park", "Post", "Hafen", "Wald", "Berg", "Mühle", "Brücke", "Schloss", "Markt"]
+LONG_NAME_WORDS = ["Gasthaus", "Zur", "Stillen", "Alten", "Post", "am", "Großen", "Teich", "Oberen", "Dorfplatz",
+                   "Hinter", "Der", "Kirche"]
+EVENT_SENTENCES = ["Du gehst spazieren und findest eine Abkürzung.", "Die Bank hat einen Rechenfehler gemacht.",
+                   "Heute ist dein Geburtstag und alle gratulieren dir.",
+                   "Deine Versicherung zahlt nach einem Schaden.",
+                   "Du hast beim Schönheitswettbewerb den zweiten Platz belegt."]
+EVENT_ACTIONS = ["Zahle {amount}€.", "Erhalte {amount}€ aus der Bank.", "Erhalte von jedem Mitspieler {amount}€.",
+                 "Gehe zurück zum Startfeld.", "Rücke vor bis Los und ziehe {amount}€ ein."]
+COLORS = ["#8B4513", "#87CEEB", "#FF69B4", "#FFA500", "#FF0000", "#FFFF00", "#00FF00", "#0000FF"]
+
+
+def synthetic_name(rng, texts):
+    if texts == "long":
+        return " ".join(rng.choice(LONG_NAME_WORDS) for _ in range(rng.randint(3, 5)))
+    return rng.choice(NAME_WORDS) + rng.choice(["straße", "weg", "platz", ""])
+
+
+def synthetic_property_data(rows, texts="short", bahnhof_share=0.15, werk_share=0.07, seed=1):
+    """
+    Spalten einer synthetischen besitzkarten.xlsx mit Straßen, Bahnhöfen und Werken
+    """
+    rng = random.Random(seed)
+    data = {column.name: [] for column in PROPERTY_SCHEMA.columns}
+    for _ in range(rows):
+        kind = rng.random()
+        price = rng.randrange(60, 400, 20)
+        data['Name'].append(synthetic_name(rng, texts))
+        data['Farbe'].append(rng.choice(COLORS))
+        data['Kaufpreis'].append(price)
+        data['Miete'].append(price // 10)
+        for column, factor in [('Miete_1_Haus', 5), ('Miete_2_Haus', 15), ('Miete_3_Haus', 45),
+                               ('Miete_4_Haus', 60), ('Miete_Hotel', 80)]:
+            data[column].append(price // 10 * factor)
+        data['Hauspreis'].append(50 * (1 + price // 150))
+        data['Hypothek'].append(price // 2)
+        data['IstBahnhof'].append(1 if kind < bahnhof_share else 0)
+        data['IstWerk'].append(1 if bahnhof_share <= kind < bahnhof_share + werk_share else 0)
+    return data
+
+
+def synthetic_event_data(rows, texts="short", seed=1):
+    """
+    Spalten einer synthetischen ereignis_gemeinschaft.xlsx
+    """
+    rng = random.Random(seed)
+    data = {'Text': [], 'Aktion': []}
+    for _ in range(rows):
+        sentences = rng.randint(3, 5) if texts == "long" else 1
+        data['Text'].append(" ".join(rng.choice(EVENT_SENTENCES) for _ in range(sentences)))
+        actions = rng.randint(2, 3) if texts == "long" else 1
+        data['Aktion'].append(" ".join(rng.choice(EVENT_ACTIONS).format(amount=rng.randrange(50, 4000, 50))
+                                       for _ in range(actions)))
+    return data
+
+
+def synthetic_board_data(rows, texts="short", seed=1):
+    """
+    Spalten einer synthetischen grundstuecke.xlsx (mindestens 30 Felder für das Standard-Layout)
+    """
+    rng = random.Random(seed)
+    rows = max(rows, 30)
+    return {'Name': [synthetic_name(rng, texts) for _ in range(rows)],
+            'Preis': [rng.randrange(60, 400, 20) for _ in range(rows)]}
+
+
+def write_workbook(data, path):
+    """
+    Schreibt synthetische Spalten als Arbeitsmappe (Endung bestimmt das Format)
+    """
+    import pandas as pd
+
+    frame = pd.DataFrame(data)
+    if path.endswith(".csv"):
+        frame.to_csv(path, index=False)
+    else:
+        frame.to_excel(path, index=False)
+    return path
+
+
+def chunks(items, size=CHUNK_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def bench_property(path, output_folder, profile):
+    from besitzkarten import CARD_HEIGHT, CARD_WIDTH, create_property_card, get_property_template, \
+        property_card_kind, property_name_lines
+
+    timer = StageTimer()
+    with timer.stage("load"):
+        workbook = load_workbook(path, PROPERTY_SCHEMA, use_cache=False)
+        rows = [(index, record._asdict()) for index, record in workbook.rows() if record.name]
+
+    def layout(property_data):
+        template = get_property_template(property_card_kind(property_data), CARD_WIDTH, CARD_HEIGHT)
+        property_name_lines(property_data['name'], CARD_WIDTH, template.color_bar_height)
+        template.paragraph_lines(property_data)
+
+    draw = (lambda property_data: create_property_card(property_data, CARD_WIDTH, CARD_HEIGHT))
+    return run_card_stages(timer, rows, layout, draw, output_folder, "property_card", profile)
+
+
+def bench_event(path, output_folder, profile):
+    from ereignis_gemeinschaft import CARD_HEIGHT, CARD_WIDTH, create_dkt_card, event_text_lines
+
+    timer = StageTimer()
+    with timer.stage("load"):
+        workbook = load_workbook(path, EVENT_SCHEMA, use_cache=False)
+        rows = [(index, (record.text, record.action)) for index, record in workbook.rows()
+                if record.text or record.action]
+
+    layout = (lambda row: event_text_lines(row[0], row[1], CARD_WIDTH, CARD_HEIGHT))
+    draw = (lambda row: create_dkt_card(row[0], row[1], CARD_WIDTH, CARD_HEIGHT))
+    return run_card_stages(timer, rows, layout, draw, output_folder, "dkt_card", profile)
+
+
+def run_card_stages(timer, rows, layout, draw, output_folder, prefix, profile):
+    """
+    Misst layout, draw, encode und write blockweise (draw enthält das Layout erneut, wie beim echten Rendern)
+    """
+    extension = get_profile(profile).extension
+    bytes_written = 0
+    for chunk in chunks(rows):
+        with timer.stage("layout"):
+            for _, row in chunk:
+                layout(row)
+        with timer.stage("draw"):
+            images = [(index, draw(row)) for index, row in chunk]
+        with timer.stage("encode"):
+            encoded = [(index, encode_image(img, profile)[0]) for index, img in images]
+        del images
+        with timer.stage("write"):
+            for index, data in encoded:
+                with open(os.path.join(output_folder, f"{prefix}_{index + 1:05d}.{extension}"), 'wb') as f:
+                    f.write(data)
+                bytes_written += len(data)
+    return timer, len(rows), bytes_written
+
+
+def bench_board(path, output_folder, profile, template_path):
+    from labels import rasterizer
+    from script import FixedPricePositionLabeler
+
+    # Kalter Beschriftungs-Cache, damit jeder Lauf gleich viel rastert
+    rasterizer.clear()
+
+    timer = StageTimer()
+    with timer.stage("load"):
+        workbook = load_workbook(path, BOARD_SCHEMA, use_cache=False)
+    # Der Beschrifter misst decode/layout selbst und danach fonts/labels/composite in render()
+    labeler = FixedPricePositionLabeler(template_path, df=workbook)
+    timer.stages.extend(labeler.timer.stages)
+    labeler.timer = timer
+    img = labeler.render(32)
+    with timer.stage("encode"):
+        data, _ = encode_image(img, profile)
+    with timer.stage("write"):
+        with open(os.path.join(output_folder, f"board.{get_profile(profile).extension}"), 'wb') as f:
+            f.write(data)
+    return timer, len(labeler.slots), len(data)
+
+
+def run_benchmark(target, rows, texts="short", profile=DEFAULT_PROFILE, source_format="xlsx", bahnhof_share=0.15,
+                  werk_share=0.07, template_path="dkt_template.png", seed=1):
+    """
+    Führt einen Benchmark-Fall aus (synthetische Arbeitsmappe in einem temporären Ordner)
+
+    Returns:
+        dict: Messwerte je Schritt, pro Karte und insgesamt
+    """
+    with tempfile.TemporaryDirectory(prefix="dkt_bench_") as folder:
+        path = os.path.join(folder, f"{target}.{source_format}")
+        if target == "property":
+            write_workbook(synthetic_property_data(rows, texts, bahnhof_share, werk_share, seed), path)
+        elif target == "event":
+            write_workbook(synthetic_event_data(rows, texts, seed), path)
+        else:
+            write_workbook(synthetic_board_data(rows, texts, seed), path)
+
+        output_folder = os.path.join(folder, "output")
+        os.makedirs(output_folder)
+
+        start = time.perf_counter()
+        if target == "property":
+            timer, items, bytes_written = bench_property(path, output_folder, profile)
+        elif target == "event":
+            timer, items, bytes_written = bench_event(path, output_folder, profile)
+        else:
+            timer, items, bytes_written = bench_board(path, output_folder, profile, template_path)
+        total_seconds = time.perf_counter() - start
+
+    stages = timer.totals()
+    return {
+        'target': target,
+        'rows': rows,
+        'texts': texts,
+        'source_format': source_format,
+        'items': items,
+        'total_seconds': total_seconds,
+        'stages': stages,
+        'per_item_ms': {name: stage['seconds'] * 1000 / max(items, 1) for name, stage in stages.items()},
+        'bytes_written': bytes_written,
+        'peak_mb': peak_rss_mb(),
+        'peak_growth_mb': max((stage['peak_growth_mb'] or 0 for stage in stages.values()), default=0),
+    }
+
+
+def run_isolated(*args):
+    """
+    Führt run_benchmark in einem frischen Prozess aus, damit die Speicherspitze nur diesen Fall misst
+    """
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        return executor.submit(run_benchmark, *args).result()
+
+
+def git_revision():
+    """
+    Aktueller Commit und ob es ungespeicherte Änderungen gibt (None außerhalb eines Git-Repos)
+    """
+    folder = os.path.dirname(os.path.abspath(__file__))
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=folder, capture_output=True, text=True,
+                                check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=folder,
+                                    capture_output=True, text=True, check=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit, dirty
+
+
+def save_results(results, output_folder=RESULTS_FOLDER):
+    """
+    Speichert die Ergebnisse eines Laufs als JSON (Dateiname mit Zeit und Commit)
+    """
+    os.makedirs(output_folder, exist_ok=True)
+    name = time.strftime("%Y%m%d-%H%M%S") + (f"_{results['commit']}" if results['commit'] else "")
+    path = os.path.join(output_folder, f"{name}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+    return path
+
+
+def compare_results(old_path, new_path):
+    """
+    Vergleicht zwei Ergebnisdateien Fall für Fall und Schritt für Schritt (Faktor neu/alt)
+    """
+    with open(old_path, encoding="utf-8") as f:
+        old = json.load(f)
+    with open(new_path, encoding="utf-8") as f:
+        new = json.load(f)
+
+    print(f"📊 {old.get('commit') or old_path} → {new.get('commit') or new_path}")
+    old_runs = {(run['target'], run['rows'], run['texts']): run for run in old['runs']}
+    for run in new['runs']:
+        key = (run['target'], run['rows'], run['texts'])
+        previous = old_runs.get(key)
+        if previous is None:
+            continue
+        print(f"   {run['target']:<9} {run['rows']:>6} Zeilen, {run['texts']:<5}", end="")
+        for name, per_item in run['per_item_ms'].items():
+            before = previous['per_item_ms'].get(name)
+            if before:
+                print(f"  {name} {per_item / before:5.2f}x", end="")
+        print(f"  gesamt {run['total_seconds'] / previous['total_seconds']:5.2f}x")
+
+
+def print_run(run):
+    stages = "  ".join(f"{name} {per_item:7.2f}" for name, per_item in run['per_item_ms'].items())
+    print(f"   {run['target']:<9} {run['rows']:>6} Zeilen, {run['texts']:<5} ms/Stück: {stages}   "
+          f"gesamt {run['total_seconds']:6.2f} s, Spitze {run['peak_mb'] or 0:.0f} MB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark der drei Generatoren mit synthetischen Arbeitsmappen")
+    parser.add_argument("targets", nargs="*", default=list(BENCHMARK_TARGETS),
+                        help=f"Generatoren: {', '.join(BENCHMARK_TARGETS)} (Standard: alle)")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10, 100, 1000],
+                        help="Zeilenzahlen der synthetischen Arbeitsmappen (z. B. 10 100 1000 10000)")
+    parser.add_argument("--texts", nargs="+", choices=("short", "long"), default=["short", "long"],
+                        help="Kurze und/oder lange Namen und Texte")
+    parser.add_argument("--bahnhof", type=float, default=0.15, help="Anteil Bahnhöfe unter den Grundstücken")
+    parser.add_argument("--werk", type=float, default=0.07, help="Anteil Werke unter den Grundstücken")
+    parser.add_argument("--profile", choices=tuple(PROFILES), default=DEFAULT_PROFILE, help="Kodierprofil")
+    parser.add_argument("--source-format", choices=("xlsx", "csv"), default="xlsx", help="Format der Arbeitsmappen")
+    parser.add_argument("--template", default="dkt_template.png", help="Brettvorlage")
+    parser.add_argument("--output", default=RESULTS_FOLDER, help="Ordner für die JSON-Ergebnisse")
+    parser.add_argument("--in-process", action="store_true",
+                        help="Alle Fälle im selben Prozess (schneller, Speicherspitzen sind dann kumulativ)")
+    parser.add_argument("--compare", nargs=2, metavar=("ALT", "NEU"), help="Zwei Ergebnisdateien vergleichen")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare_results(*args.compare)
+        sys.exit(0)
+
+    unknown = [target for target in args.targets if target not in BENCHMARK_TARGETS]
+    if unknown:
+        parser.error(f"Unbekannte Generatoren: {unknown}")
+
+    commit, dirty = git_revision()
+    results = {
+        'created': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'commit': commit,
+        'dirty': dirty,
+        'python': platform.python_version(),
+        'pillow': PIL.__version__,
+        'platform': platform.platform(),
+        'profile': args.profile,
+        'runs': [],
+    }
+
+    print(f"⏱️ Benchmark {commit or ''}{' (geändert)' if dirty else ''} - Profil {args.profile}")
+    for target in args.targets:
+        # Das Brett hat immer 30 Felder, mehr Zeilen ändern nur die Größe der Arbeitsmappe
+        for rows in args.rows:
+            for texts in args.texts:
+                runner = run_benchmark if args.in_process else run_isolated
+                run = runner(target, rows, texts, args.profile, args.source_format, args.bahnhof, args.werk,
+                             args.template)
+                results['runs'].append(run)
+                print_run(run)
+
+    print(f"💾 Ergebnisse gespeichert: {save_results(results, args.output)}")
@@ -1,74 +1,56 @@
-from PIL import Image, ImageDraw, ImageFont
-import textwrap
+from PIL import Image, ImageDraw
+import argparse
 import os
-import pandas as pd
+import re
+from functools import lru_cache
 
+from encoder import DEFAULT_PROFILE, PROFILES, encoding_fingerprint, format_bytes, output_extension, save_image, \
+    save_vector
+from fonts import get_font, font_fingerprint, font_stats
+from instrumentation import add_instrumentation_arguments, instrumented, metrics, progress
+from manifest import BuildManifest, BuildResult, card_hash
+from parallel import run_jobs
+from textlayout import fit_text, measure_text, wrap_text
+from vector import VECTOR_FORMATS, create_canvas
+from workbooks import PROPERTY_SCHEMA, as_workbook, iter_records, load_workbook
 
-def create_property_cards_from_excel(excel_file="besitzkarten.xlsx", output_folder="output/property_cards"):
+
+# Bei jeder Änderung am Kartenlayout erhöhen, damit alle Karten neu gezeichnet werden
+RENDERER_VERSION = 2
+
+# Kartenabmessungen im Hochformat (Grundstückskarten, 300 dpi)
+CARD_WIDTH = 675  # Schmaler als Ereigniskarten
+CARD_HEIGHT = 1050  # Höher als Ereigniskarten
+
+
+# Pflichtspalten der Excel-Datei
+REQUIRED_COLUMNS = PROPERTY_SCHEMA.required_columns
+
+
+def create_property_cards_from_excel(excel_file="besitzkarten.xlsx", output_folder="output/property_cards", jobs=1,
+                                     force=False, output_format="raster", profile=DEFAULT_PROFILE):
     """
     Erstellt Grundstückskarten aus Excel-Datei mit farbigem oberen Balken
 
     Args:
         excel_file (str): Pfad zur Excel-Datei
         output_folder (str): Ordner für die generierten Bilder
+        jobs (int): Anzahl paralleler Prozesse (0 = alle Kerne)
+        force (bool): Alle Karten neu zeichnen, auch wenn sie unverändert sind
+        output_format (str): 'raster' (PNG/WebP laut Profil) oder vektoriell 'svg' / 'pdf'
+        profile (str): Kodierprofil der Rasterausgabe ('print', 'web', 'webp', 'thumb')
+
+    Returns:
+        BuildResult oder None, falls die Excel-Datei nicht gelesen werden konnte
     """
 
     try:
-        # Excel-Datei einlesen
-        df = pd.read_excel(excel_file)
-        print(f"📊 Excel-Datei geladen: {len(df)} Grundstückskarten gefunden")
-
-        # Überprüfen ob die erforderlichen Spalten vorhanden sind
-        required_columns = ['Name', 'Farbe', 'Kaufpreis', 'Miete', 'Miete_1_Haus', 'Miete_2_Haus', 'Miete_3_Haus',
-                            'Miete_4_Haus', 'Miete_Hotel', 'Hauspreis', 'Hypothek']
-        missing_columns = [col for col in required_columns if col not in df.columns]
-
-        if missing_columns:
-            print(f"❌ Fehlende Spalten in der Excel-Datei: {missing_columns}")
-            print(f"📋 Verfügbare Spalten: {list(df.columns)}")
-            return
-
-        # Kartenabmessungen im Hochformat (Grundstückskarten)
-        card_width = 675  # Schmaler als Ereigniskarten
-        card_height = 1050  # Höher als Ereigniskarten
-
-        # Ausgabeordner erstellen
-        if not os.path.exists(output_folder):
-            os.makedirs(output_folder)
-
-        # Für jede Zeile in der Excel-Datei eine Karte erstellen
-        for index, row in df.iterrows():
-            # Daten aus Excel lesen
-            property_data = {
-                'name': str(row['Name']) if pd.notna(row['Name']) else "",
-                'color': str(row['Farbe']) if pd.notna(row['Farbe']) else "#0066CC",
-                'kaufpreis': int(row['Kaufpreis']) if pd.notna(row['Kaufpreis']) else 0,
-                'miete': int(row['Miete']) if pd.notna(row['Miete']) else 0,
-                'miete_1_haus': int(row['Miete_1_Haus']) if pd.notna(row['Miete_1_Haus']) else 0,
-                'miete_2_haus': int(row['Miete_2_Haus']) if pd.notna(row['Miete_2_Haus']) else 0,
-                'miete_3_haus': int(row['Miete_3_Haus']) if pd.notna(row['Miete_3_Haus']) else 0,
-                'miete_4_haus': int(row['Miete_4_Haus']) if pd.notna(row['Miete_4_Haus']) else 0,
-                'miete_hotel': int(row['Miete_Hotel']) if pd.notna(row['Miete_Hotel']) else 0,
-                'hauspreis': int(row['Hauspreis']) if pd.notna(row['Hauspreis']) else 0,
-                'hypothek': int(row['Hypothek']) if pd.notna(row['Hypothek']) else 0,
-                'IstBahnhof': int(row['IstBahnhof']) if pd.notna(row['IstBahnhof']) else 0,
-                'IstWerk': int(row['IstWerk']) if pd.notna(row['IstWerk']) else 0
-            }
-
-            # Leere Namen überspringen
-            if not property_data['name']:
-                continue
-
-            # Grundstückskarte erstellen
-            img = create_property_card(property_data, card_width, card_height)
-
-            # Bild speichern
-            filename = f"property_card_{index + 1:02d}_{property_data['name'].replace(' ', '_')}.png"
-            filepath = os.path.join(output_folder, filename)
-            img.save(filepath, dpi=(300, 300))
-            print(f"Grundstückskarte {index + 1} erstellt: {filepath}")
-
-        print(f"\n✅ {len(df)} Grundstückskarten aus Excel erfolgreich erstellt!")
+        # Excel-Datei einlesen (Schema wird dabei geprüft, bei unveränderter Datei aus dem Cache)
+        workbook = load_workbook(excel_file, PROPERTY_SCHEMA)
+        progress(f"📊 Excel-Datei geladen: {len(workbook)} Grundstückskarten gefunden")
+
+        return build_property_cards(workbook, output_folder, jobs=jobs, force=force, output_format=output_format,
+                                    profile=profile)
 
     except FileNotFoundError:
         print(f"❌ Excel-Datei '{excel_file}' nicht gefunden!")
@@ -78,58 +60,519 @@ def create_property_cards_from_excel(excel_file="besitzkarten.xlsx", output_fold
         print(f"❌ Fehler beim Lesen der Excel-Datei: {e}")
 
 
+def build_property_cards(workbook, output_folder="output/property_cards", jobs=1, force=False, executor=None,
+                         output_format="raster", profile=DEFAULT_PROFILE):
+    """
+    Erstellt die Grundstückskarten aus einer bereits geladenen Arbeitsmappe
+
+    Args:
+        workbook: LoadedWorkbook (oder DataFrame) mit dem Inhalt von besitzkarten.xlsx
+        output_folder (str): Ordner für die generierten Bilder
+        jobs (int): Anzahl paralleler Prozesse (0 = alle Kerne)
+        force (bool): Alle Karten neu zeichnen, auch wenn sie unverändert sind
+        executor: Optional ein gemeinsamer Prozess-Pool (z. B. von 'dkt build')
+        output_format (str): 'raster' (PNG/WebP laut Profil) oder vektoriell 'svg' / 'pdf'
+        profile (str): Kodierprofil der Rasterausgabe ('print', 'web', 'webp', 'thumb')
+
+    Returns:
+        BuildResult
+
+    Raises:
+        ValueError: Wenn Pflichtspalten fehlen oder Format / Profil unbekannt sind
+    """
+    workbook = as_workbook(workbook, PROPERTY_SCHEMA)
+    extension = output_extension(output_format, profile)
+
+    # Kartenabmessungen im Hochformat (Grundstückskarten)
+    card_width = CARD_WIDTH
+    card_height = CARD_HEIGHT
+
+    # Ausgabeordner erstellen
+    if not os.path.exists(output_folder):
+        os.makedirs(output_folder)
+
+    # Aufgaben für jede Zeile in der Excel-Datei sammeln
+    tasks = []
+    for index, record in workbook.rows():
+        property_data = record._asdict()
+
+        # Leere Namen überspringen
+        if not property_data['name']:
+            continue
+
+        tasks.append((index, property_data, card_width, card_height, output_folder, output_format, profile))
+
+    # Nur Karten zeichnen, deren Inhalt sich seit dem letzten Lauf geändert hat
+    with metrics.span("plan", cards=len(tasks)):
+        manifest = BuildManifest(output_folder)
+        entries = [(property_card_filename(index, property_data, extension),
+                    property_card_hash(property_data, card_width, card_height, output_format, profile))
+                   for index, property_data, _, _, _, _, _ in tasks]
+        plan = manifest.plan(entries, force=force)
+
+    # Karten erstellen (bei jobs > 1 parallel in einem Prozess-Pool)
+    render_tasks = [tasks[position] for position in plan.render]
+    results, errors = run_jobs(render_property_card_file, render_tasks, jobs, executor=executor)
+
+    result = BuildResult("property")
+    for task, encoded in zip(render_tasks, results):
+        if encoded:
+            result.add_encoded(encoded)
+            progress(f"Grundstückskarte {task[0] + 1} erstellt: {encoded}")
+
+    for position, message in errors:
+        index, property_data = render_tasks[position][:2]
+        result.errors.append((index + 1, message))
+        print(f"❌ Grundstückskarte {index + 1} ({property_data['name']}) fehlgeschlagen: {message}")
+
+    with metrics.span("finish"):
+        copied = manifest.finish(plan, [plan.render[position] for position, _ in errors])
+    for position in copied:
+        result.copied.append(os.path.join(output_folder, entries[position][0]))
+        progress(f"Grundstückskarte {tasks[position][0] + 1} kopiert: {entries[position][0]}")
+
+    result.unchanged = len(plan.unchanged)
+    result.stale = len(plan.stale)
+    metrics.count("cards.rendered", len(result.created))
+    metrics.count("cards.copied", len(copied))
+    metrics.count("cards.unchanged", result.unchanged)
+
+    progress(f"\n✅ {len(result.created)} Grundstückskarten aus Excel erfolgreich erstellt!")
+    if result.created:
+        progress(f"💾 {format_bytes(result.bytes_written)} geschrieben, "
+                 f"Kodierung {result.encode_seconds * 1000:.0f} ms")
+    progress(f"♻️ {len(copied)} kopiert, {len(plan.unchanged)} unverändert, {len(plan.stale)} veraltete entfernt")
+    if errors:
+        print(f"⚠️ {len(errors)} Grundstückskarten konnten nicht erstellt werden")
+    stats = font_stats()
+    if stats['misses']:
+        progress(f"🔤 Schriften-Cache: {stats['hits']} Treffer, {stats['misses']} geladen")
+
+    return result
+
+
+def iter_property_cards(excel_file="besitzkarten.xlsx", card_width=CARD_WIDTH, card_height=CARD_HEIGHT,
+                        output_format="raster", workbook=None):
+    """
+    Erzeugt die Grundstückskarten nacheinander im Speicher, ohne sie zu speichern
+
+    Jede Karte wird erst beim Abruf gezeichnet. Ohne workbook werden CSV/JSON-Lines-Dateien
+    blockweise gelesen (siehe workbooks.iter_records), sodass auch riesige Decks nur eine
+    Karte im Speicher halten.
+
+    Yields:
+        tuple: (Dateiname, PIL-Bild) bzw. bei 'svg' / 'pdf' (Dateiname, VectorCanvas)
+    """
+    rows = as_workbook(workbook, PROPERTY_SCHEMA).rows() if workbook is not None else \
+        iter_records(excel_file, PROPERTY_SCHEMA)
+    for index, record in rows:
+        property_data = record._asdict()
+        if not property_data['name']:
+            continue
+        if output_format in VECTOR_FORMATS:
+            yield (property_card_filename(index, property_data, output_format),
+                   create_property_card_vector(property_data, card_width, card_height, output_format))
+        else:
+            yield property_card_filename(index, property_data), create_property_card(property_data, card_width,
+                                                                                      card_height)
+
+
+def property_card_filename(index, property_data, extension="png"):
+    """
+    Deterministischer Dateiname einer Grundstückskarte
+    """
+    return f"property_card_{index + 1:02d}_{property_data['name'].replace(' ', '_')}.{extension}"
+
+
+def property_card_hash(property_data, card_width, card_height, output_format="raster", profile=DEFAULT_PROFILE):
+    """
+    Inhalts-Hash einer Grundstückskarte für inkrementelle Builds
+    """
+    return card_hash(RENDERER_VERSION, property_data, card_width, card_height, font_fingerprint(),
+                     encoding_fingerprint(output_format, profile))
+
+
+def render_property_card_file(index, property_data, card_width, card_height, output_folder, output_format="raster",
+                              profile=DEFAULT_PROFILE):
+    """
+    Erstellt eine Grundstückskarte und speichert sie (läuft auch in Worker-Prozessen)
+
+    Returns:
+        EncodedFile: Pfad, Größe in Bytes und Kodierzeit
+    """
+    filename = property_card_filename(index, property_data, output_extension(output_format, profile))
+    filepath = os.path.join(output_folder, filename)
+
+    with metrics.span("card", card=index + 1, name=property_data['name']):
+        if output_format in VECTOR_FORMATS:
+            return save_vector(create_property_card_vector(property_data, card_width, card_height, output_format),
+                               filepath)
+
+        return save_image(create_property_card(property_data, card_width, card_height), filepath, profile)
+
+
 def create_property_card(property_data, card_width, card_height):
     """
     Erstellt eine einzelne Grundstückskarte
     """
+    template = get_property_template(property_card_kind(property_data), card_width, card_height)
+    with metrics.span("draw"):
+        return template.render(property_data)
 
-    # Neues Bild mit transparentem Hintergrund erstellen
-    img = Image.new('RGBA', (card_width, card_height), (0, 0, 0, 0))
 
-    # Abgerundete Karte als Basis erstellen
-    card_base = create_rounded_property_base(card_width, card_height)
-    img.paste(card_base, (0, 0))
+def create_property_card_vector(property_data, card_width, card_height, output_format="svg"):
+    """
+    Erstellt eine einzelne Grundstückskarte als Vektorgrafik ('svg' oder 'pdf')
 
-    draw = ImageDraw.Draw(img)
+    Returns:
+        VectorCanvas: mit tobytes() / save(filepath)
+    """
+    canvas = create_canvas(output_format, card_width, card_height)
+    template = get_property_template(property_card_kind(property_data), card_width, card_height)
+    with metrics.span("draw"):
+        template.draw_vector(canvas, property_data)
+    return canvas
 
-    # Farbiger oberer Balken
-    color_bar_height = 120
-    corner_radius = 50
 
-    # Oberer farbiger Balken (abgerundete obere Ecken)
-    draw.rounded_rectangle(
-        [3, 3, card_width - 3, color_bar_height],
-        radius=corner_radius,
-        fill=property_data['color'],
-        outline='black',
-        width=2
-    )
+def property_card_kind(property_data):
+    """
+    Bestimmt die Kartenart: 'werk', 'bahnhof' oder 'strasse'
+    """
+    if property_data['IstWerk'] == 1:
+        return 'werk'
+    if property_data['IstBahnhof'] == 1:
+        return 'bahnhof'
+    return 'strasse'
 
-    # Rechteck unten am farbigen Balken (um untere Ecken gerade zu machen)
-    draw.rectangle(
-        [3, color_bar_height - corner_radius, card_width - 3, color_bar_height],
-        fill=property_data['color'],
-        outline=None
-    )
 
-    # Linie unter dem farbigen Balken
-    draw.line(
-        [3, color_bar_height, card_width - 3, color_bar_height],
-        fill='black',
-        width=2
-    )
+@lru_cache(maxsize=None)
+def get_property_template(kind, card_width, card_height):
+    """
+    Liefert die vorkompilierte Vorlage einer Kartenart (einmal pro Prozess)
+    """
+    return PropertyCardTemplate(kind, card_width, card_height)
+
 
-    # Grundstücksname im farbigen Balken
-    add_property_name(draw, property_data['name'], card_width, color_bar_height)
+class PropertyCardTemplate:
+    """
+    Vorkompilierte Grundstückskarte einer Kartenart (Straße, Bahnhof, Werk)
+
+    Rahmen, Trennlinien und feste Beschriftungen werden einmal gezeichnet, alle
+    Zeilenpositionen einmal berechnet. Der Rahmen mit farbigem Balken wird pro Farbe
+    zwischengespeichert, sodass beim Zeichnen einer Karte nur noch die Werte fehlen.
+    """
 
-    # Preisinformationen hinzufügen
-    add_property_details(draw, property_data, card_width, card_height, color_bar_height)
+    color_bar_height = 120
+    corner_radius = 50
+    margin = 40
 
-    # In RGB konvertieren für Speicherung
-    final_img = Image.new('RGB', (card_width, card_height), 'white')
-    final_img.paste(img, (0, 0), img)
+    # Kompakte Zeilenabstände innerhalb der Abschnitte
+    line_spacing_medium = 6
+    line_spacing_small = 4
+    separator_height = 8
 
-    return final_img
+    def __init__(self, kind, card_width, card_height):
+        self.kind = kind
+        self.card_width = card_width
+        self.card_height = card_height
+        self.price_column_x = card_width - 80
+
+        self.font_large = get_font(40)  # Kaufpreis
+        self.font_medium = get_font(30)  # Mieten
+        self.font_small = get_font(28)  # Häuser/Hypothek
+
+        # Feste Texte (x, y, Text, Schrift), Werte (x, y, Format, Schrift, rechtsbündig) und
+        # Absätze mit Werten, die erst beim Zeichnen umbrochen werden (x, y, Format, Schrift, Breite, Höhe)
+        self.static_texts = []
+        self.value_slots = []
+        self.paragraph_slots = []
+        self.separators = []
+        self._compile_layout()
+
+        self._base = create_rounded_property_base(card_width, card_height)
+        self._frames = {}
+
+    def _compile_layout(self):
+        """
+        Berechnet alle Zeilenpositionen der Kartenart (vertikal zentrierter Kaufpreis)
+        """
+        font_large, font_medium, font_small = self.font_large, self.font_medium, self.font_small
+        margin = self.margin
+
+        large_height = font_large.getbbox("Ag")[3] - font_large.getbbox("Ag")[1]
+        medium_step = font_medium.getbbox("Ag")[3] - font_medium.getbbox("Ag")[1] + self.line_spacing_medium
+        small_step = font_small.getbbox("Ag")[3] - font_small.getbbox("Ag")[1] + self.line_spacing_small
+
+        # Verfügbare Höhe berechnen
+        available_height = self.card_height - self.color_bar_height - 40  # 40px Rand unten
+        start_y = self.color_bar_height + 30
+
+        # Höhe der drei Abschnitte: Kaufpreis, Mieten (6 Zeilen), Häuser + Hypothek (4 Zeilen)
+        section1_height = large_height
+        miete_content_height = 6 * medium_step - self.line_spacing_medium
+        house_content_height = 4 * small_step - self.line_spacing_small
+        total_content_height = (section1_height + miete_content_height + house_content_height
+                                + 2 * self.separator_height)
+
+        # Verfügbaren Platz auf 5 Bereiche verteilen (3 Abschnitte + 2 Trennbereiche)
+        remaining_space = available_height - total_content_height
+        section_spacing = max(15, remaining_space // 5)  # Mindestens 15px Abstand
+
+        current_y = start_y
+
+        # 1. KAUFPREIS ABSCHNITT (vertikal zentriert in seinem Bereich)
+        kaufpreis_section_height = section1_height + section_spacing
+        self.kaufpreis_y = current_y + (kaufpreis_section_height - section1_height) // 2
+        current_y += kaufpreis_section_height
+
+        # Trennstrich 1
+        self.separators.append(current_y)
+        current_y += self.separator_height + section_spacing
+
+        # 2. MIETEN ABSCHNITT
+        if self.kind == 'werk':
+            # Absatz mit dem Namen des Werks, Platz für 4 Zeilen
+            self.paragraph_slots.append((
+                margin, current_y,
+                "Wenn man Besitzer von '{name}' ist, so ist die Miete 4-mal so hoch, wie Augen auf den "
+                "zwei Würfeln sind",
+                font_medium, self.card_width - 2 * margin, 4 * medium_step))
+            current_y += 4 * medium_step
+        else:
+            if self.kind == 'bahnhof':
+                miete_lines = [
+                    ("Miete allein", "{miete} €"),
+                    ("Wenn man 2 Bahnhöfe besitzt", "{miete_1_haus} €"),
+                    ("Wenn man 3 Bahnhöfe besitzt", "{miete_2_haus} €"),
+                    ("Wenn man 4 Bahnhöfe besitzt", "{miete_3_haus} €")
+                ]
+            else:
+                miete_lines = [
+                    ("Miete allein", "{miete} €"),
+                    ("Miete mit 1 Haus", "{miete_1_haus} €"),
+                    ("Miete mit 2 Häusern", "{miete_2_haus} €"),
+                    ("Miete mit 3 Häusern", "{miete_3_haus} €"),
+                    ("Miete mit 4 Häusern", "{miete_4_haus} €"),
+                    ("Miete mit Hotel", "{miete_hotel} €")
+                ]
+            for label, value in miete_lines:
+                # Label linksbündig, Preis rechtsbündig
+                self.static_texts.append((margin, current_y, label, font_medium))
+                self.value_slots.append((self.price_column_x, current_y, value, font_medium, True))
+                current_y += medium_step
+
+        current_y += section_spacing - self.line_spacing_medium
+
+        # Trennstrich 2
+        self.separators.append(current_y)
+        current_y += self.separator_height + section_spacing
+
+        # 3. HÄUSER UND HYPOTHEK ABSCHNITT
+        if self.kind == 'strasse':
+            house_lines = [
+                ("Häuser kosten je", "{hauspreis} €"),
+                ("Hotels kosten je", "{hauspreis} €"),
+                ("(plus 4 Häuser)", ""),
+                ("Hypothek", "{hypothek} €")
+            ]
+            for label, value in house_lines:
+                self.static_texts.append((margin, current_y, label, font_small))
+                if value:
+                    self.value_slots.append((self.price_column_x, current_y, value, font_small, True))
+                current_y += small_step
+
+        elif self.kind == 'werk':
+            werk_text_below = ("Wenn man Besitzer beider Versorungswerke ist, so ist die Miete 10-mal so hoch, "
+                               "wie Augen auf den zwei Würfeln sind")
+            for line in wrap_text(werk_text_below, font_medium, self.card_width - 2 * margin):
+                self.static_texts.append((margin, current_y, line, font_medium))
+                current_y += small_step
+
+            # Leerzeile, dann Hypothek
+            current_y += small_step
+            self.value_slots.append((margin, current_y, "Hypothek: {hypothek}€", font_medium, False))
+            current_y += small_step
+
+    def frame(self, color):
+        """
+        Vorgezeichneter Kartenrahmen mit farbigem Balken und festen Texten (pro Farbe gecacht)
+        """
+        frame = self._frames.get(color)
+        if frame is not None:
+            return frame
+
+        img = self._base.copy()
+        draw = ImageDraw.Draw(img)
+
+        card_width = self.card_width
+        color_bar_height = self.color_bar_height
+
+        # Oberer farbiger Balken (abgerundete obere Ecken)
+        draw.rounded_rectangle(
+            [3, 3, card_width - 3, color_bar_height],
+            radius=self.corner_radius,
+            fill=color,
+            outline='black',
+            width=2
+        )
+
+        # Rechteck unten am farbigen Balken (um untere Ecken gerade zu machen)
+        draw.rectangle(
+            [3, color_bar_height - self.corner_radius, card_width - 3, color_bar_height],
+            fill=color,
+            outline=None
+        )
+
+        # Linie unter dem farbigen Balken
+        draw.line(
+            [3, color_bar_height, card_width - 3, color_bar_height],
+            fill='black',
+            width=2
+        )
+
+        for y_position in self.separators:
+            draw_separator_line(draw, y_position, card_width, self.margin, self.price_column_x)
+
+        for x, y, text, font in self.static_texts:
+            draw.text((x, y), text, fill='black', font=font)
+
+        # In RGB konvertieren (transparente Ecken werden weiß)
+        frame = Image.new('RGB', (self.card_width, self.card_height), 'white')
+        frame.paste(img, (0, 0), img)
+
+        self._frames[color] = frame
+        return frame
+
+    def draw_vector(self, canvas, property_data):
+        """
+        Zeichnet dieselbe Karte mit Vektorbefehlen (Rahmen, Balken, Linien und Text)
+        """
+        card_width = self.card_width
+        color_bar_height = self.color_bar_height
+        color = property_data['color']
+
+        # Abgerundete Basis und farbiger Balken wie in create_rounded_property_base / frame
+        canvas.rounded_rectangle([0, 0, card_width, self.card_height], radius=50, fill='white', outline='black',
+                                 width=3)
+        canvas.rounded_rectangle([3, 3, card_width - 3, color_bar_height], radius=self.corner_radius, fill=color,
+                                 outline='black', width=2)
+        canvas.rectangle([3, color_bar_height - self.corner_radius, card_width - 3, color_bar_height], fill=color)
+        canvas.line([3, color_bar_height, card_width - 3, color_bar_height], fill='black', width=2)
+
+        for y_position in self.separators:
+            canvas.line([self.margin, y_position, self.price_column_x, y_position], fill='#AAAAAA', width=3)
+
+        for x, y, text, font in self.static_texts:
+            canvas.text((x, y), text, font)
+
+        font_name, name_lines = property_name_lines(property_data['name'], card_width, color_bar_height)
+        for y, line in name_lines:
+            canvas.text((card_width / 2, y), line, font_name, fill='white', align='center')
+
+        canvas.text((card_width / 2, self.kaufpreis_y), f"KAUFPREIS {property_data['kaufpreis']} €", self.font_large,
+                    align='center')
+
+        for x, y, value_format, font, right_aligned in self.value_slots:
+            canvas.text((x, y), value_format.format(**property_data), font, align='right' if right_aligned else 'left')
+
+        for x, y, line, font in self.paragraph_lines(property_data):
+            canvas.text((x, y), line, font)
+
+    def render(self, property_data):
+        """
+        Zeichnet eine Karte: Rahmen kopieren und nur die Werte der Karte einsetzen
+        """
+        img = self.frame(property_data['color']).copy()
+        draw = ImageDraw.Draw(img)
+
+        # Grundstücksname im farbigen Balken
+        add_property_name(draw, property_data['name'], self.card_width, self.color_bar_height)
+
+        # Kaufpreis zentriert
+        kaufpreis_text = f"KAUFPREIS {property_data['kaufpreis']} €"
+        bbox = draw.textbbox((0, 0), kaufpreis_text, font=self.font_large)
+        text_width = bbox[2] - bbox[0]
+        x = (self.card_width - text_width) // 2
+        draw.text((x, self.kaufpreis_y), kaufpreis_text, fill='black', font=self.font_large)
+
+        for x, y, value_format, font, right_aligned in self.value_slots:
+            value = value_format.format(**property_data)
+            if right_aligned:
+                bbox = draw.textbbox((0, 0), value, font=font)
+                x -= bbox[2] - bbox[0]
+            draw.text((x, y), value, fill='black', font=font)
+
+        for x, y, line, font in self.paragraph_lines(property_data):
+            draw.text((x, y), line, fill='black', font=font)
+
+        return img
+
+    def paragraph_blocks(self, property_data):
+        """
+        Gesetzte Absätze mit Werten (Schrift wird verkleinert, falls der Absatz sonst nicht passt)
+
+        Returns:
+            list: (x, y, TextBlock)
+        """
+        blocks = []
+        with metrics.span("layout"):
+            for x, y, text_format, font, max_width, max_height in self.paragraph_slots:
+                blocks.append((x, y, fit_text(text_format.format(**property_data), max_width, max_height,
+                                              max_size=font.size, min_size=font.size // 2,
+                                              line_spacing=self.line_spacing_medium)))
+        return blocks
+
+    def paragraph_lines(self, property_data):
+        """
+        Umbrochene Zeilen der Absätze mit Werten
+
+        Returns:
+            list: (x, y, Zeile, Schrift)
+        """
+        lines = []
+        for x, y, block in self.paragraph_blocks(property_data):
+            for row, line in enumerate(block.lines):
+                lines.append((x, y + row * block.line_height, line, block.font))
+        return lines
+
+    def overflows(self, property_data):
+        """
+        Misst alle Texte einer Karte gegen ihre Boxen, ohne zu zeichnen (für preflight.py)
+
+        Returns:
+            list: (Feld, Meldung) je Text, der nicht passt oder überlappt
+        """
+        problems = []
+        if not property_name_block(property_data['name'], self.card_width, self.color_bar_height).fits:
+            problems.append(('Name', "passt auch in 24 px nicht in den Farbbalken"))
+
+        kaufpreis_width = measure_text(f"KAUFPREIS {property_data['kaufpreis']} €", self.font_large)
+        if kaufpreis_width > self.card_width - 2 * self.margin:
+            problems.append(('Kaufpreis', f"ist {kaufpreis_width:.0f} px breit, Platz sind "
+                                          f"{self.card_width - 2 * self.margin} px"))
+
+        # Rechtsbündige Werte dürfen nicht in die Beschriftung links davon ragen
+        label_ends = {y: x + measure_text(text, font) for x, y, text, font in self.static_texts}
+        for x, y, value_format, font, right_aligned in self.value_slots:
+            value = value_format.format(**property_data)
+            width = measure_text(value, font)
+            if right_aligned and y in label_ends and x - width < label_ends[y] + 10:
+                problems.append((value_field(value_format), f"'{value}' überlappt die Beschriftung"))
+            elif not right_aligned and x + width > self.card_width - self.margin:
+                problems.append((value_field(value_format), f"'{value}' ragt über den Kartenrand"))
+
+        for _, _, block in self.paragraph_blocks(property_data):
+            if not block.fits:
+                problems.append(('Absatz', "passt auch in halber Schriftgröße nicht in seine Box"))
+        return problems
+
+
+def value_field(value_format):
+    """
+    Name des Datenfelds in einem Werteformat wie '{miete_1_haus} €'
+    """
+    match = re.search(r"\{(\w+)\}", value_format)
+    return match.group(1) if match else value_format
 
 
 def create_rounded_property_base(width, height):
@@ -152,187 +595,48 @@ def create_rounded_property_base(width, height):
     return base
 
 
-def add_property_name(draw, name, card_width, color_bar_height):
+def property_name_block(name, card_width, color_bar_height, margin=40):
     """
-    Fügt den Grundstücksnamen im farbigen Balken hinzu
-    """
-    try:
-        font_name = ImageFont.truetype("arial.ttf", 48)  # Viel größer: 48pt
-    except:
-        font_name = ImageFont.load_default()
+    Setzt den Grundstücksnamen in der größten passenden Schrift (48 bis 24 px)
 
-    # Text in Zeilen aufteilen falls zu lang
-    max_chars = 14  # Weniger Zeichen da größere Schrift
-    name_lines = textwrap.fill(name, width=max_chars).split('\n')
-
-    # Zeilenhöhe berechnen
-    line_height = font_name.getbbox("Ag")[3] - font_name.getbbox("Ag")[1] + 4
-    total_height = len(name_lines) * line_height
+    Returns:
+        TextBlock
+    """
+    return fit_text(name, card_width - 2 * margin, color_bar_height - 16, max_size=48, min_size=24,
+                    line_spacing=4)
 
-    # Startposition für vertikale Zentrierung im farbigen Balken
-    start_y = (color_bar_height - total_height) // 2
 
-    # Namen zeichnen (weiß auf farbigem Hintergrund)
-    current_y = start_y
-    for line in name_lines:
-        bbox = draw.textbbox((0, 0), line, font=font_name)
-        text_width = bbox[2] - bbox[0]
-        x = (card_width - text_width) // 2
-        draw.text((x, current_y), line, fill='white', font=font_name)
-        current_y += line_height
+def property_name_lines(name, card_width, color_bar_height, margin=40):
+    """
+    Bricht den Grundstücksnamen nach Pixelbreite um und zentriert die Zeilen vertikal im farbigen Balken
 
+    Die Schrift startet bei 48 px und wird nur verkleinert, wenn der Name sonst nicht in den Balken passt.
 
-def add_property_details(draw, property_data, card_width, card_height, color_bar_height):
+    Returns:
+        tuple: (Schrift, Liste von (y, Zeile))
     """
-    Fügt die Preisinformationen zur Grundstückskarte mit vertikal zentriertem Kaufpreis hinzu
-    """
-    try:
-        font_large = ImageFont.truetype("arial.ttf", 40)  # Kaufpreis
-        font_medium = ImageFont.truetype("arial.ttf", 30)  # Mieten
-        font_small = ImageFont.truetype("arial.ttf", 28)  # Häuser/Hypothek
-    except:
-        font_large = ImageFont.load_default()
-        font_medium = ImageFont.load_default()
-        font_small = ImageFont.load_default()
-
-    # Verfügbare Höhe berechnen
-    available_height = card_height - color_bar_height - 40  # 40px Rand unten
-    start_y = color_bar_height + 30
-
-    margin = 40
-    price_column_x = card_width - 80
+    with metrics.span("layout"):
+        block = property_name_block(name, card_width, color_bar_height, margin)
 
-    # Kompakte Zeilenabstände innerhalb der Abschnitte
-    line_spacing_medium = 6  # Kompakter für mehr Platz
-    line_spacing_small = 4  # Kompakter für mehr Platz
-    separator_height = 8
+    # Startposition für vertikale Zentrierung im farbigen Balken
+    start_y = (color_bar_height - block.height) // 2
 
-    # Berechne die Höhe jedes Abschnitts
-    # Abschnitt 1: Kaufpreis
-    section1_height = font_large.getbbox("Ag")[3] - font_large.getbbox("Ag")[1]
-
-    # Abschnitt 2: Mieten (6 Zeilen)
-    miete_content_height = 6 * (
-                font_medium.getbbox("Ag")[3] - font_medium.getbbox("Ag")[1] + line_spacing_medium) - line_spacing_medium
-
-    # Abschnitt 3: Häuser + Hypothek (4 Zeilen total)
-    house_content_height = 4 * (
-                font_small.getbbox("Ag")[3] - font_small.getbbox("Ag")[1] + line_spacing_small) - line_spacing_small
-
-    # Gesamte Content-Höhe
-    total_content_height = section1_height + miete_content_height + house_content_height + 2 * separator_height
-
-    # Verfügbaren Platz auf 5 Bereiche verteilen (3 Abschnitte + 2 Trennbereiche)
-    remaining_space = available_height - total_content_height
-    section_spacing = max(15, remaining_space // 5)  # Mindestens 15px Abstand
-
-    current_y = start_y
-
-    # 1. KAUFPREIS ABSCHNITT (vertikal zentriert in seinem Bereich)
-    kaufpreis_section_height = section1_height + section_spacing
-    kaufpreis_center_y = current_y + (kaufpreis_section_height - section1_height) // 2
-
-    kaufpreis_text = f"KAUFPREIS {property_data['kaufpreis']} €"
-    bbox = draw.textbbox((0, 0), kaufpreis_text, font=font_large)
-    text_width = bbox[2] - bbox[0]
-    x = (card_width - text_width) // 2
-    draw.text((x, kaufpreis_center_y), kaufpreis_text, fill='black', font=font_large)
-
-    current_y += kaufpreis_section_height
-
-    # Trennstrich 1
-    draw_separator_line(draw, current_y, card_width, margin, price_column_x)
-    current_y += separator_height + section_spacing
-
-    # 2. MIETEN ABSCHNITT
-    miete_lines = [
-        ("Miete allein", f"{property_data['miete']} €"),
-        ("Miete mit 1 Haus", f"{property_data['miete_1_haus']} €"),
-        ("Miete mit 2 Häusern", f"{property_data['miete_2_haus']} €"),
-        ("Miete mit 3 Häusern", f"{property_data['miete_3_haus']} €"),
-        ("Miete mit 4 Häusern", f"{property_data['miete_4_haus']} €"),
-        ("Miete mit Hotel", f"{property_data['miete_hotel']} €")
-    ]
-
-    bahnhof_lines = [
-        ("Miete allein", f"{property_data['miete']} €"),
-        ("Wenn man 2 Bahnhöfe besitzt", f"{property_data['miete_1_haus']} €"),
-        ("Wenn man 3 Bahnhöfe besitzt", f"{property_data['miete_2_haus']} €"),
-        ("Wenn man 4 Bahnhöfe besitzt", f"{property_data['miete_3_haus']} €")
-    ]
-
-    werk_lines = [
-        "Wenn man Besitzer von",
-        "'" + property_data['name'] + "' ist, so ist",
-        "die Miete 4-mal so hoch, wie Augen",
-        "auf den zwei Würfeln sind"
-    ]
+    return block.font, [(start_y + row * block.line_height, line) for row, line in enumerate(block.lines)]
 
-    if property_data['IstBahnhof'] == 1:
-        miete_lines = bahnhof_lines
 
-    if property_data['IstWerk'] == 1:
-        for value in werk_lines:
-            # Label linksbündig
-            draw.text((margin, current_y), value, fill='black', font=font_medium)
-
-            current_y += font_medium.getbbox("Ag")[3] - font_medium.getbbox("Ag")[1] + line_spacing_medium
-    else:
-        for label, value in miete_lines:
-            # Label linksbündig
-            draw.text((margin, current_y), label, fill='black', font=font_medium)
-
-            # Preis rechtsbündig
-            bbox = draw.textbbox((0, 0), value, font=font_medium)
-            text_width = bbox[2] - bbox[0]
-            draw.text((price_column_x - text_width, current_y), value, fill='black', font=font_medium)
-
-            current_y += font_medium.getbbox("Ag")[3] - font_medium.getbbox("Ag")[1] + line_spacing_medium
-
-    current_y += section_spacing - line_spacing_medium
-
-    # Trennstrich 2
-    draw_separator_line(draw, current_y, card_width, margin, price_column_x)
-    current_y += separator_height + section_spacing
-
-    # 3. HÄUSER UND HYPOTHEK ABSCHNITT
-    house_lines = [
-        ("Häuser kosten je", f"{property_data['hauspreis']} €"),
-        ("Hotels kosten je", f"{property_data['hauspreis']} €"),
-        ("(plus 4 Häuser)", ""),
-        ("Hypothek", f"{property_data['hypothek']} €")
-    ]
-
-    werk_lines_below = [
-        "Wenn man Besitzer beider",
-        "Versorungswerke ist, so ist",
-        "die Miete 10-mal so hoch, wie",
-        "Augen auf den zwei Würfeln sind",
-        "",
-        "Hypothek: " + str(property_data['hypothek']) +  "€"
-    ]
-
-    if not property_data['IstBahnhof'] == 1 and not property_data['IstWerk'] == 1:
-        for label, value in house_lines:
-            # Label linksbündig
-            if label:
-                draw.text((margin, current_y), label, fill='black', font=font_small)
-
-            # Preis rechtsbündig (falls vorhanden)
-            if value:
-                bbox = draw.textbbox((0, 0), value, font=font_small)
-                text_width = bbox[2] - bbox[0]
-                draw.text((price_column_x - text_width, current_y), value, fill='black', font=font_small)
-
-            current_y += font_small.getbbox("Ag")[3] - font_small.getbbox("Ag")[1] + line_spacing_small
+def add_property_name(draw, name, card_width, color_bar_height):
+    """
+    Fügt den Grundstücksnamen im farbigen Balken hinzu
+    """
+    font_name, name_lines = property_name_lines(name, card_width, color_bar_height)
 
-    if property_data['IstWerk'] == 1:
-        for value in werk_lines_below:
-            # Label linksbündig
-            if value:
-                draw.text((margin, current_y), value, fill='black', font=font_medium)
+    # Namen zeichnen (weiß auf farbigem Hintergrund)
+    for current_y, line in name_lines:
+        bbox = draw.textbbox((0, 0), line, font=font_name)
+        text_width = bbox[2] - bbox[0]
+        x = (card_width - text_width) // 2
+        draw.text((x, current_y), line, fill='white', font=font_name)
 
-            current_y += font_small.getbbox("Ag")[3] - font_small.getbbox("Ag")[1] + line_spacing_small
 
 def draw_separator_line(draw, y_position, card_width, left_margin, right_margin):
     """
@@ -418,6 +722,8 @@ def create_sample_property_excel(filename="besitzkarten.xlsx"):
         ]
     }
 
+    import pandas as pd
+
     df = pd.DataFrame(sample_data)
     df.to_excel(filename, index=False)
     print(f"📄 Beispiel-Excel-Datei '{filename}' erstellt!")
@@ -427,8 +733,20 @@ def create_sample_property_excel(filename="besitzkarten.xlsx"):
 
 # Hauptfunktion
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Erstellt Grundstückskarten aus besitzkarten.xlsx")
+    parser.add_argument("--jobs", "-j", type=int, default=1, help="Anzahl paralleler Prozesse (0 = alle Kerne)")
+    parser.add_argument("--force", action="store_true", help="Alle Karten neu zeichnen")
+    parser.add_argument("--format", choices=("raster",) + VECTOR_FORMATS, default="raster",
+                        help="Ausgabeformat: raster (PNG/WebP laut Profil) oder vektoriell svg/pdf")
+    parser.add_argument("--profile", choices=tuple(PROFILES), default=DEFAULT_PROFILE,
+                        help="Kodierprofil: print (verlustfrei), web (Palette), webp, thumb (Vorschau)")
+    add_instrumentation_arguments(parser)
+    args = parser.parse_args()
+
     # Besitzkarten aus Excel erstellen
-    create_property_cards_from_excel()
-    print("📁 Die Besitzkarten findest du im Ordner 'property_cards'")
-    print("🏠 Format: Hochformat mit vertikal zentriertem Kaufpreis")
-    print("📐 Spalten sind vertikal ausgerichtet")
\ No newline at end of file
+    with instrumented(args):
+        create_property_cards_from_excel(jobs=args.jobs, force=args.force, output_format=args.format,
+                                         profile=args.profile)
+        progress("📁 Die Besitzkarten findest du im Ordner 'property_cards'")
+        progress("🏠 Format: Hochformat mit vertikal zentriertem Kaufpreis")
+        progress("📐 Spalten sind vertikal ausgerichtet")
@@ -0,0 +1,108 @@
+import json
+import os
+from functools import lru_cache
+
+
+DEFAULT_LAYOUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "board_layouts", "classic.json")
+
+# Seiten des Bretts: Achse, entlang der 'anchor' läuft
+SIDE_AXES = {
+    "top": "x",
+    "bottom": "x",
+    "left": "y",
+    "right": "y",
+}
+
+
+class FieldSlot:
+    """
+    Ein beschriftetes Feld des Bretts in Pixelkoordinaten der Vorlage
+
+    length ist die größte Textlänge entlang der Seite in Pixel (None = unbegrenzt).
+    """
+
+    __slots__ = ("index", "side", "x", "y", "rotation", "length")
+
+    def __init__(self, index, side, x, y, rotation, length=None):
+        self.index = index
+        self.side = side
+        self.x = x
+        self.y = y
+        self.rotation = rotation
+        self.length = length
+
+    def __repr__(self):
+        return (f"FieldSlot(index={self.index}, side={self.side!r}, x={self.x}, y={self.y}, "
+                f"rotation={self.rotation}, length={self.length})")
+
+
+def load_layout(path=DEFAULT_LAYOUT):
+    """
+    Liest eine Layout-Datei (gecacht, bis sich die Datei ändert)
+
+    Aufbau:
+        sides:  pro Seite 'offset' (relative Lage der Beschriftungsreihe), 'rotation' und optional
+                'label_width' (relative Länge, die ein Name entlang der Seite einnehmen darf)
+        fields: pro Feld 'index' (Zeile in grundstuecke.xlsx), 'side', 'anchor' (relative Lage
+                entlang der Seite) und optional 'rotation' / 'label_width' als Abweichung von der Seite
+        track:  optional der Spielweg für balance.py: 'start_side' (Seite nach dem Startfeld, gezogen
+                wird im Uhrzeigersinn), 'fields_per_side', 'first_anchor' / 'last_anchor' (Lage des
+                ersten und letzten Felds einer Seite), 'jail' / 'go_to_jail' (Feldnummern) und 'corners'
+    """
+    return _load_layout(os.path.abspath(path), os.stat(path).st_mtime_ns)
+
+
+@lru_cache(maxsize=16)
+def _load_layout(path, mtime_ns):
+    with open(path, encoding="utf-8") as f:
+        layout = json.load(f)
+
+    sides = layout.get("sides", {})
+    for position, field in enumerate(layout.get("fields", [])):
+        side = field.get("side")
+        if side not in SIDE_AXES or side not in sides:
+            raise ValueError(f"{path}: Feld {position} hat eine unbekannte Seite '{side}'")
+        if not 0 <= field.get("anchor", -1) <= 1:
+            raise ValueError(f"{path}: Feld {position} braucht einen 'anchor' zwischen 0 und 1")
+
+    return layout
+
+
+def compile_layout(layout_path, width, height):
+    """
+    Rechnet ein Layout einmal pro Vorlagenauflösung in Pixelkoordinaten um
+
+    Returns:
+        tuple: FieldSlot je Feld in der Reihenfolge der Layout-Datei
+    """
+    layout_path = os.path.abspath(layout_path)
+    return _compile_layout(layout_path, os.stat(layout_path).st_mtime_ns, width, height)
+
+
+@lru_cache(maxsize=32)
+def _compile_layout(layout_path, mtime_ns, width, height):
+    layout = _load_layout(layout_path, mtime_ns)
+    sides = layout["sides"]
+
+    slots = []
+    for field in layout["fields"]:
+        side = sides[field["side"]]
+        if SIDE_AXES[field["side"]] == "x":
+            x_rel, y_rel = field["anchor"], side["offset"]
+            side_length = width
+        else:
+            x_rel, y_rel = side["offset"], field["anchor"]
+            side_length = height
+
+        label_width = field.get("label_width", side.get("label_width"))
+
+        slots.append(FieldSlot(
+            index=int(field["index"]),
+            side=field["side"],
+            x=int(x_rel * width),
+            y=int(y_rel * height),
+            rotation=int(field.get("rotation", side["rotation"])) % 360,
+            length=int(label_width * side_length) if label_width else None,
+        ))
+
+    return tuple(slots)
@@ -0,0 +1,238 @@
+import argparse
+import re
+from collections import namedtuple
+
+import numpy as np
+
+from workbooks import EVENT_SCHEMA, as_workbook, load_cached, load_workbook
+
+
+# Bei Änderungen an den Regeln oder am Tabellenformat erhöhen (verwirft den Cache)
+ACTIONS_VERSION = 2
+
+# Aktionsarten (NONE = keine Wirkung oder nicht erkannt)
+NONE, PAY, RECEIVE, RECEIVE_FROM_EACH, PAY_TO_EACH, MOVE_TO, MOVE_BY, JAIL, GET_OUT_OF_JAIL, SKIP_TURNS = range(10)
+
+ACTION_NAMES = {
+    NONE: "none",
+    PAY: "pay",
+    RECEIVE: "receive",
+    RECEIVE_FROM_EACH: "receive_from_each",
+    PAY_TO_EACH: "pay_to_each",
+    MOVE_TO: "move_to",
+    MOVE_BY: "move_by",
+    JAIL: "jail",
+    GET_OUT_OF_JAIL: "get_out_of_jail",
+    SKIP_TURNS: "skip_turns",
+}
+
+# Werte der Spalte 'Typ': englische Namen wie oben oder deutsche Kurzformen
+ACTION_TYPES = {
+    **{name: kind for kind, name in ACTION_NAMES.items()},
+    "keine": NONE,
+    "zahlen": PAY,
+    "erhalten": RECEIVE,
+    "von_jedem": RECEIVE_FROM_EACH,
+    "an_jeden": PAY_TO_EACH,
+    "gehe_zu": MOVE_TO,
+    "felder": MOVE_BY,
+    "gefängnis": JAIL,
+    "häfn": JAIL,
+    "freikarte": GET_OUT_OF_JAIL,
+    "aussetzen": SKIP_TURNS,
+}
+
+# Eine Karte: amount in € (PAY... immer positiv), steps für MOVE_BY (negativ = zurück) und SKIP_TURNS
+CardAction = namedtuple("CardAction", ["kind", "amount", "target", "steps"])
+
+# Regeln für den Fließtext der Spalte 'Aktion', in dieser Reihenfolge geprüft
+GET_OUT_PATTERN = re.compile(r"aus dem (gefängnis|häfn)|\bfreikarte\b", re.I)
+JAIL_PATTERN = re.compile(r"\b(ins gefängnis|in den häfn|ins häfn)\b", re.I)
+STEPS_PATTERN = re.compile(r"(\d+)\s+feld(?:er)?\s+(vor|zurück)", re.I)
+MOVE_TO_PATTERN = re.compile(r"\b(?:rücke|gehe|ziehe)\s+(?:(?:vor|zurück)\s+)?(?:bis\s+)?(?:zum|zur|zu|auf|nach)\s+"
+                             r"(.+?)[.!]*$", re.I)
+SKIP_PATTERN = re.compile(r"(?:setze\s+(\d+)\s+runden?\s+aus|(\d+)\s+runden?\s+aussetzen)", re.I)
+AMOUNT_PATTERN = re.compile(r"(\d[\d.]*)\s*€")
+EACH_PATTERN = re.compile(r"\bjede[mnrs]?\b", re.I)
+PAY_PATTERN = re.compile(r"\bzahl", re.I)
+RECEIVE_PATTERN = re.compile(r"\b(bekomm|erhalt|erhält|kassier|gewinn|schenkt|steckst|ehrt|belohn)", re.I)
+
+
+class ActionTable:
+    """
+    Kompilierte Aktionen aller Ereigniskarten als Spalten-Arrays
+
+    kinds, amounts und steps sind NumPy-Arrays, targets die Zielnamen (MOVE_TO), index die
+    Zeilennummern der Arbeitsmappe und problems (Zeile, Meldung) je nicht verstandener Karte.
+    Leere Zeilen sind nicht enthalten.
+    """
+
+    def __init__(self, kinds, amounts, steps, targets, index, problems):
+        self.kinds = kinds
+        self.amounts = amounts
+        self.steps = steps
+        self.targets = targets
+        self.index = index
+        self.problems = problems
+
+    def __len__(self):
+        return len(self.index)
+
+    def __getitem__(self, position):
+        return CardAction(int(self.kinds[position]), int(self.amounts[position]), self.targets[position],
+                          int(self.steps[position]))
+
+    def kind_name(self, position):
+        return ACTION_NAMES[int(self.kinds[position])]
+
+    def counts(self):
+        """
+        Anzahl Karten je Aktionsart
+        """
+        counts = np.bincount(self.kinds, minlength=len(ACTION_NAMES))
+        return {ACTION_NAMES[kind]: int(count) for kind, count in enumerate(counts) if count}
+
+    def cash_deltas(self):
+        """
+        Geldänderung des ziehenden Spielers je Karte ohne die Beträge von/an jeden Mitspieler
+        """
+        return np.select([self.kinds == PAY, self.kinds == RECEIVE], [-self.amounts, self.amounts], 0)
+
+    def resolve_targets(self, names):
+        """
+        Ordnet die Ziele der MOVE_TO-Karten Feldern zu
+
+        Alle Wörter des Feldnamens müssen im Ziel vorkommen ('KH/RK Horn' → 'KH Horn'); bei
+        mehreren Treffern gewinnt der längste Name.
+
+        Args:
+            names (list): Feldname je Feldnummer
+
+        Returns:
+            tuple: (ndarray Feldnummer je Karte, -1 ohne Ziel; Liste (Zeile, Ziel) nicht gefundener Ziele)
+        """
+        words = [set(re.findall(r"\w+", name.casefold())) for name in names]
+        positions = np.full(len(self), -1, dtype=np.int64)
+        unresolved = []
+        for position in np.flatnonzero(self.kinds == MOVE_TO):
+            wanted = set(re.findall(r"\w+", self.targets[position].casefold()))
+            matches = [field for field, name_words in enumerate(words) if name_words and name_words <= wanted]
+            if matches:
+                positions[position] = max(matches, key=lambda field: len(words[field]))
+            else:
+                unresolved.append((self.index[position], self.targets[position]))
+        return positions, unresolved
+
+
+def parse_action(text):
+    """
+    Übersetzt den Fließtext einer Aktion in eine CardAction
+
+    Returns:
+        CardAction oder None, wenn der Text nicht verstanden wird
+    """
+    text = text.strip()
+    if GET_OUT_PATTERN.search(text):
+        return CardAction(GET_OUT_OF_JAIL, 0, "", 0)
+    if JAIL_PATTERN.search(text):
+        return CardAction(JAIL, 0, "", 0)
+
+    steps = STEPS_PATTERN.search(text)
+    if steps:
+        return CardAction(MOVE_BY, 0, "", int(steps.group(1)) * (1 if steps.group(2).lower() == "vor" else -1))
+    target = MOVE_TO_PATTERN.search(text)
+    if target:
+        return CardAction(MOVE_TO, 0, target.group(1).strip(), 0)
+    skip = SKIP_PATTERN.search(text)
+    if skip:
+        return CardAction(SKIP_TURNS, 0, "", int(skip.group(1) or skip.group(2)))
+
+    amount = AMOUNT_PATTERN.search(text)
+    if amount:
+        value = int(amount.group(1).replace(".", ""))
+        each = bool(EACH_PATTERN.search(text))
+        if PAY_PATTERN.search(text):
+            return CardAction(PAY_TO_EACH if each else PAY, value, "", 0)
+        if RECEIVE_PATTERN.search(text):
+            return CardAction(RECEIVE_FROM_EACH if each else RECEIVE, value, "", 0)
+    return None
+
+
+def structured_action(record):
+    """
+    Aktion aus den Spalten Typ/Betrag/Ziel (Betrag sind bei 'felder' die Schritte, bei 'aussetzen' die Runden)
+
+    Raises:
+        ValueError: Bei unbekanntem Typ
+    """
+    kind = ACTION_TYPES.get(record.action_type.strip().casefold().replace(" ", "_"))
+    if kind is None:
+        raise ValueError(f"Unbekannter Typ '{record.action_type}' (erlaubt: {', '.join(ACTION_NAMES.values())})")
+    if kind in (MOVE_BY, SKIP_TURNS):
+        return CardAction(kind, 0, "", record.amount)
+    return CardAction(kind, abs(record.amount), record.target.strip(), 0)
+
+
+def compile_actions(workbook):
+    """
+    Kompiliert alle Karten einer Arbeitsmappe (LoadedWorkbook oder DataFrame)
+
+    Die Spalten Typ/Betrag/Ziel haben Vorrang, sonst wird der Text der Aktion gelesen.
+
+    Returns:
+        ActionTable
+    """
+    actions, index, problems = [], [], []
+    for row, record in as_workbook(workbook, EVENT_SCHEMA).rows():
+        if not record.text and not record.action:
+            continue
+        try:
+            action = structured_action(record) if record.action_type else parse_action(record.action)
+        except ValueError as e:
+            action = None
+            problems.append((row, str(e)))
+        else:
+            if action is None:
+                problems.append((row, f"Aktion nicht verstanden: '{record.action}'"))
+            elif action.kind == MOVE_TO and not action.target:
+                problems.append((row, "Ziel fehlt"))
+        actions.append(action or CardAction(NONE, 0, "", 0))
+        index.append(row)
+
+    return ActionTable(np.array([action.kind for action in actions], dtype=np.int8),
+                       np.array([action.amount for action in actions], dtype=np.int64),
+                       np.array([action.steps for action in actions], dtype=np.int64),
+                       [action.target for action in actions], index, problems)
+
+
+def load_action_table(path="ereignis_gemeinschaft.xlsx", use_cache=True):
+    """
+    Aktionstabelle einer Arbeitsmappe, gecacht neben der Datei wie der Inhalt selbst
+
+    Returns:
+        ActionTable
+    """
+    return load_cached(path, "actions", ACTIONS_VERSION,
+                       lambda: compile_actions(load_workbook(path, EVENT_SCHEMA, use_cache)), use_cache,
+                       counter="actions")
+
+
+# Hauptfunktion
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Übersetzt die Aktionen der Ereigniskarten in eine Aktionstabelle")
+    parser.add_argument("excel_file", nargs="?", default="ereignis_gemeinschaft.xlsx", help="Ereigniskarten")
+    parser.add_argument("--no-cache", action="store_true", help="Cache ignorieren und neu kompilieren")
+    args = parser.parse_args()
+
+    # Über das Modul laden, sonst würde die Tabelle als __main__.ActionTable gecacht
+    import card_actions
+
+    table = card_actions.load_action_table(args.excel_file, use_cache=not args.no_cache)
+    for position in range(len(table)):
+        action = table[position]
+        detail = action.target or (f"{action.amount} €" if action.amount else f"{action.steps:+d}" if action.steps
+                                   else "")
+        print(f"   Zeile {table.index[position] + 2:3d} {table.kind_name(position):<18} {detail}")
+    print(f"\n📋 {len(table)} Karten: " + ", ".join(f"{name} {count}" for name, count in table.counts().items()))
+    for row, message in table.problems:
+        print(f"⚠️ Zeile {row + 2}: {message}")
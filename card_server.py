@@ -0,0 +1,286 @@
+import argparse
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from board_layout import DEFAULT_LAYOUT
+from encoder import DEFAULT_PROFILE, PROFILES, format_bytes
+from render import board_bytes, event_card_bytes, event_row, property_card_bytes, property_row
+from vector import VECTOR_FORMATS
+from workbooks import BOARD_SCHEMA, EVENT_SCHEMA, PROPERTY_SCHEMA, load_workbook
+
+
+class LRUByteCache:
+    """
+    LRU-Cache für kodierte Karten, begrenzt über die Summe der Bytes
+
+    Schlüssel beginnen mit dem Pfad der Quelldatei, sodass sich alle Einträge einer
+    geänderten Arbeitsmappe gezielt verwerfen lassen.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, data, mime_type):
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old[0])
+            self._entries[key] = (data, mime_type)
+            self.size += len(data)
+            while self.size > self.max_bytes:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def invalidate(self, source):
+        """
+        Verwirft alle Einträge, die aus der Quelldatei source erzeugt wurden
+
+        Returns:
+            int: Anzahl verworfener Einträge
+        """
+        with self._lock:
+            keys = [key for key in self._entries if key[0] == source]
+            for key in keys:
+                self.size -= len(self._entries.pop(key)[0])
+            return len(keys)
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._entries), 'bytes': self.size,
+                'max_bytes': self.max_bytes}
+
+
+class CardLibrary:
+    """
+    Rendert Karten und Brett auf Anfrage und hält die Ergebnisse im LRU-Cache
+
+    Vor jeder Anfrage wird per os.stat geprüft, ob sich die zugehörige Arbeitsmappe (bzw.
+    beim Brett auch Vorlage oder Layout) geändert hat; nur dann wird neu geladen und der
+    Cache dieser Quelle verworfen.
+    """
+
+    def __init__(self, property_file="besitzkarten.xlsx", event_file="ereignis_gemeinschaft.xlsx",
+                 board_file="grundstuecke.xlsx", template_path="dkt_template.png", layout=DEFAULT_LAYOUT,
+                 font_size=32, cache=None):
+        self.sources = {
+            "property": (property_file, PROPERTY_SCHEMA),
+            "event": (event_file, EVENT_SCHEMA),
+            "board": (board_file, BOARD_SCHEMA),
+        }
+        self.template_path = template_path
+        self.layout = layout
+        self.font_size = font_size
+        self.cache = cache if cache is not None else LRUByteCache()
+        self._workbooks = {}
+        self._signatures = {}
+        self._labeler = None
+        self._lock = threading.Lock()
+
+    def get(self, kind, key="", output_format="raster", profile=DEFAULT_PROFILE):
+        """
+        Liefert eine kodierte Karte (kind 'property' / 'event') oder das Brett (kind 'board')
+
+        Returns:
+            tuple: (Bytes, MIME-Typ)
+
+        Raises:
+            KeyError: Unbekannte Art oder Karte
+            ValueError: Unbekanntes Format oder Profil
+        """
+        if kind not in self.sources:
+            raise KeyError(f"Unbekannte Kartenart: {kind}")
+        if kind == "board":
+            output_format = "raster"
+
+        path, _ = self.sources[kind]
+        workbook, signature = self._fresh_workbook(kind)
+
+        # Mit der Signatur im Schlüssel kann ein Render, das noch die alte Arbeitsmappe gelesen
+        # hat, nach invalidate() nichts Veraltetes mehr unter dem aktuellen Schlüssel ablegen
+        cache_key = (path, kind, str(key).casefold(), output_format, profile, signature)
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        if kind == "property":
+            data, mime_type = property_card_bytes(property_row(workbook, key), output_format, profile)
+        elif kind == "event":
+            text, action = event_row(workbook, key)
+            data, mime_type = event_card_bytes(text, action, output_format, profile)
+        else:
+            with self._lock:
+                data, mime_type = board_bytes(workbook, profile, font_size=self.font_size,
+                                              labeler=self._board_labeler(workbook))
+
+        self.cache.put(cache_key, data, mime_type)
+        return data, mime_type
+
+    def index(self):
+        """
+        Übersicht aller Karten (Nummer und Name) je Art
+        """
+        listing = {}
+        for kind in ("property", "event"):
+            workbook, _ = self._fresh_workbook(kind)
+            if kind == "property":
+                listing[kind] = [{'number': index + 1, 'name': record.name} for index, record in workbook.rows()
+                                 if record.name]
+            else:
+                listing[kind] = [{'number': index + 1, 'text': record.text} for index, record in workbook.rows()
+                                 if record.text or record.action]
+        return listing
+
+    def _fresh_workbook(self, kind):
+        path, schema = self.sources[kind]
+        watched = [path] + ([self.template_path, self.layout] if kind == "board" else [])
+        signature = tuple(self._signature(watched_path) for watched_path in watched)
+
+        with self._lock:
+            previous = self._signatures.get(kind)
+            if previous != signature:
+                self._workbooks[kind] = load_workbook(path, schema)
+                self._signatures[kind] = signature
+                if kind == "board" and self._labeler is not None:
+                    if previous is not None and previous[1:] == signature[1:]:
+                        # Nur die Arbeitsmappe geändert: geänderte Felder werden beim nächsten Rendern neu gesetzt
+                        self._labeler.update(self._workbooks[kind])
+                    else:
+                        self._labeler = None
+                dropped = self.cache.invalidate(path)
+                if dropped:
+                    print(f"♻️ {path} geändert: {dropped} Einträge verworfen")
+            return self._workbooks[kind], signature
+
+    def _board_labeler(self, workbook):
+        # Vorlage nur einmal dekodieren, bis sich Vorlage oder Layout ändern
+        if self._labeler is None:
+            from script import FixedPricePositionLabeler
+
+            self._labeler = FixedPricePositionLabeler(self.template_path, df=workbook, layout=self.layout)
+        return self._labeler
+
+    @staticmethod
+    def _signature(path):
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+
+
+class CardRequestHandler(BaseHTTPRequestHandler):
+    """
+    GET /                          Übersicht (JSON)
+    GET /property/<Nummer|Name>    Grundstückskarte
+    GET /event/<Nummer>            Ereigniskarte
+    GET /board                     Beschriftetes Brett
+    GET /stats                     Cache-Statistik (JSON)
+
+    Query-Parameter: format=raster|svg|pdf, profile=print|web|webp|thumb
+    """
+
+    library = None
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        parts = [unquote(part) for part in url.path.split("/") if part]
+        query = parse_qs(url.query)
+        output_format = query.get("format", ["raster"])[0]
+        profile = query.get("profile", [DEFAULT_PROFILE])[0]
+
+        start = time.perf_counter()
+        try:
+            if not parts:
+                self._send_json(self.library.index())
+                return
+            if parts == ["stats"]:
+                self._send_json(self.library.cache.stats())
+                return
+
+            kind = parts[0]
+            key = parts[1] if len(parts) > 1 else ""
+            data, mime_type = self.library.get(kind, key, output_format, profile)
+        except KeyError as e:
+            self._send_error(404, str(e).strip("'\""))
+            return
+        except ValueError as e:
+            self._send_error(400, str(e))
+            return
+        except Exception as e:
+            self._send_error(500, f"{type(e).__name__}: {e}")
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", mime_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("Server-Timing", f"render;dur={(time.perf_counter() - start) * 1000:.3f}")
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_json(self, payload):
+        data = json.dumps(payload, ensure_ascii=False, indent=2).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_error(self, status, message):
+        data = json.dumps({'error': message}, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+
+def serve(host="127.0.0.1", port=8765, library=None, quiet=False):
+    """
+    Startet den Kartenserver (blockiert bis Strg+C)
+    """
+    handler = type("BoundCardRequestHandler", (CardRequestHandler,), {'library': library or CardLibrary()})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.quiet = quiet
+    print(f"🌐 Kartenserver läuft auf http://{host}:{server.server_port}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        stats = handler.library.cache.stats()
+        print(f"🗂️ Cache: {stats['hits']} Treffer, {stats['misses']} gerendert, {format_bytes(stats['bytes'])}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Lokaler Server, der Karten und Brett bei Bedarf rendert")
+    parser.add_argument("--host", default="127.0.0.1", help="Adresse (Standard: nur lokal)")
+    parser.add_argument("--port", type=int, default=8765, help="Port")
+    parser.add_argument("--cache-mb", type=float, default=64, help="Größe des Bild-Caches in MB")
+    parser.add_argument("--quiet", action="store_true", help="Keine Zeile pro Anfrage ausgeben")
+    args = parser.parse_args()
+
+    print(f"🎨 Formate: raster, {', '.join(VECTOR_FORMATS)} - Profile: {', '.join(PROFILES)}")
+    serve(args.host, args.port, CardLibrary(cache=LRUByteCache(int(args.cache_mb * 1024 * 1024))), args.quiet)
@@ -0,0 +1,356 @@
+import argparse
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from board_layout import DEFAULT_LAYOUT
+from encoder import DEFAULT_PROFILE, PROFILES, format_bytes
+from instrumentation import add_instrumentation_arguments, instrumented, metrics, progress
+from manifest import BuildResult
+from parallel import resolve_jobs
+from vector import VECTOR_FORMATS
+from workbooks import BOARD_SCHEMA, EVENT_SCHEMA, PROPERTY_SCHEMA, load_workbook
+
+
+# Build-Ziele in der Reihenfolge, in der 'all' sie erstellt
+TARGETS = ("board", "property", "event")
+
+# Standard-Quellen und -Ziele je Build-Ziel
+DEFAULTS = {
+    "board": {"excel_file": "grundstuecke.xlsx", "template": "dkt_template.png",
+              "output": "output/dkt_beschriftet.png", "font_size": 32, "layout": DEFAULT_LAYOUT},
+    "property": {"excel_file": "besitzkarten.xlsx", "output": "output/property_cards"},
+    "event": {"excel_file": "ereignis_gemeinschaft.xlsx", "output": "output/dkt_cards"},
+}
+
+
+class BuildContext:
+    """
+    Gemeinsame Ressourcen aller Build-Ziele eines Laufs
+
+    Excel-Dateien werden nur einmal gelesen, Schriften liegen im gemeinsamen Register
+    (fonts.registry) und alle Ziele teilen sich einen Prozess-Pool.
+    """
+
+    def __init__(self, jobs=1, force=False, output_format="raster", profile=DEFAULT_PROFILE):
+        self.jobs = resolve_jobs(jobs)
+        self.force = force
+        self.output_format = output_format
+        self.profile = profile
+        self._workbooks = {}
+        self._executor = None
+
+    def workbook(self, path, schema):
+        """
+        Liefert den Inhalt einer Arbeitsmappe (einmal pro Lauf gelesen, sonst aus dem Cache)
+        """
+        key = (path, schema.name)
+        if key not in self._workbooks:
+            self._workbooks[key] = load_workbook(path, schema)
+        return self._workbooks[key]
+
+    @property
+    def executor(self):
+        """
+        Gemeinsamer Prozess-Pool (None bei jobs=1)
+        """
+        if self._executor is None and self.jobs > 1:
+            self._executor = ProcessPoolExecutor(max_workers=self.jobs)
+        return self._executor
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def build_board(context, options=None):
+    """
+    Beschriftet das Brett (ohne Vorschau)
+    """
+    from script import FixedPricePositionLabeler
+
+    options = {**DEFAULTS["board"], **(options or {})}
+    labeler = FixedPricePositionLabeler(options["template"], df=context.workbook(options["excel_file"], BOARD_SCHEMA),
+                                        layout=options["layout"])
+    labeler.label_board_fixed_prices(options["output"], options["font_size"], profile=context.profile)
+
+    result = BuildResult("board")
+    result.add_encoded(labeler.encoded)
+    progress(f"✅ DKT-Brett gespeichert als: {labeler.encoded}")
+    return result
+
+
+def build_property(context, options=None):
+    """
+    Erstellt die Grundstückskarten
+    """
+    from besitzkarten import build_property_cards
+
+    options = {**DEFAULTS["property"], **(options or {})}
+    return build_property_cards(context.workbook(options["excel_file"], PROPERTY_SCHEMA), options["output"],
+                                jobs=context.jobs, force=context.force, executor=context.executor,
+                                output_format=context.output_format, profile=context.profile)
+
+
+def build_event(context, options=None):
+    """
+    Erstellt die Ereignis-/Gemeinschaftskarten
+    """
+    from ereignis_gemeinschaft import build_dkt_cards
+
+    options = {**DEFAULTS["event"], **(options or {})}
+    return build_dkt_cards(context.workbook(options["excel_file"], EVENT_SCHEMA), options["output"], jobs=context.jobs,
+                           force=context.force, executor=context.executor, output_format=context.output_format,
+                           profile=context.profile)
+
+
+BUILDERS = {
+    "board": build_board,
+    "property": build_property,
+    "event": build_event,
+}
+
+
+def expand_targets(targets):
+    """
+    Löst 'all' auf und entfernt doppelte Ziele (Reihenfolge bleibt erhalten)
+    """
+    expanded = []
+    for target in targets or ["all"]:
+        for name in (TARGETS if target == "all" else [target]):
+            if name not in expanded:
+                expanded.append(name)
+    return expanded
+
+
+def build(targets, jobs=1, force=False, context=None, output_format="raster", profile=DEFAULT_PROFILE):
+    """
+    Erstellt die angegebenen Ziele in einem Prozess
+
+    Fehler eines Ziels werden im BuildResult festgehalten, die übrigen Ziele laufen weiter.
+
+    Returns:
+        list: BuildResult je Ziel
+    """
+    own_context = context is None
+    if own_context:
+        context = BuildContext(jobs, force, output_format, profile)
+
+    results = []
+    try:
+        for target in expand_targets(targets):
+            progress(f"\n🔨 Ziel '{target}'")
+            try:
+                with metrics.span("target", target=target):
+                    results.append(BUILDERS[target](context))
+            except Exception as e:
+                result = BuildResult(target)
+                result.errors.append((None, f"{type(e).__name__}: {e}"))
+                results.append(result)
+                print(f"❌ Ziel '{target}' fehlgeschlagen: {e}")
+    finally:
+        if own_context:
+            context.close()
+
+    return results
+
+
+def export(archive_path, targets=("all",), output_format="raster", profile=DEFAULT_PROFILE):
+    """
+    Rendert die Ziele direkt in ein Archiv (Aufbau wie output/: Brett in der Wurzel,
+    Karten in property_cards/ und dkt_cards/)
+
+    Returns:
+        ArchiveSink: mit entries und bytes
+    """
+    from archive import iter_board, write_archive
+    from besitzkarten import iter_property_cards
+    from ereignis_gemeinschaft import iter_dkt_cards
+
+    sources = {
+        "board": lambda: ("", iter_board(DEFAULTS["board"]["excel_file"], DEFAULTS["board"]["template"],
+                                         DEFAULTS["board"]["layout"], DEFAULTS["board"]["font_size"])),
+        "property": lambda: ("property_cards", iter_property_cards(DEFAULTS["property"]["excel_file"],
+                                                                   output_format=output_format)),
+        "event": lambda: ("dkt_cards", iter_dkt_cards(DEFAULTS["event"]["excel_file"], output_format=output_format)),
+    }
+    return write_archive((sources[target]() for target in expand_targets(targets)), archive_path, profile)
+
+
+def preflight(targets):
+    """
+    Prüft die Arbeitsmappen der Ziele vor dem Rendern und gibt den Bericht aus
+
+    Returns:
+        PreflightReport
+    """
+    from preflight import run_preflight
+
+    board = DEFAULTS["board"]
+    files = {target: DEFAULTS[target]["excel_file"] for target in TARGETS}
+    report = run_preflight(expand_targets(targets), files, board["template"], board["layout"], board["font_size"])
+    print(report.format())
+    return report
+
+
+def main(argv=None):
+    # watch importiert dkt, daher erst hier
+    from watch import POLL_INTERVAL
+
+    parser = argparse.ArgumentParser(prog="dkt", description="DKT-Brett und Kartendecks erstellen")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = commands.add_parser("build", help="Brett und/oder Karten rendern")
+    build_parser.add_argument("targets", nargs="*", default=["all"],
+                              help=f"Build-Ziele: {', '.join(TARGETS)} oder all (Standard: all)")
+    build_parser.add_argument("--jobs", "-j", type=int, default=1, help="Anzahl paralleler Prozesse (0 = alle Kerne)")
+    build_parser.add_argument("--force", action="store_true", help="Alle Karten neu zeichnen")
+    build_parser.add_argument("--format", choices=("raster",) + VECTOR_FORMATS, default="raster",
+                              help="Format der Karten: raster (PNG/WebP laut Profil) oder vektoriell svg/pdf "
+                                   "(Brett bleibt Raster)")
+    build_parser.add_argument("--profile", choices=tuple(PROFILES), default=DEFAULT_PROFILE,
+                              help="Kodierprofil für Brett und Rasterkarten: print (verlustfrei), web (Palette), "
+                                   "webp, thumb (Vorschau)")
+    build_parser.add_argument("--no-preflight", action="store_true",
+                              help="Arbeitsmappen vor dem Rendern nicht prüfen")
+    add_instrumentation_arguments(build_parser)
+
+    check_parser = commands.add_parser("check",
+                                       help="Arbeitsmappen prüfen (Schema, Zahlen, Textmaße), ohne zu rendern")
+    check_parser.add_argument("targets", nargs="*", default=["all"],
+                              help=f"Ziele: {', '.join(TARGETS)} oder all (Standard: all)")
+
+    balance_parser = commands.add_parser("balance", help="Trefferwahrscheinlichkeiten und Mietertrag je Feld berechnen")
+    balance_parser.add_argument("--jail-turns", type=int, default=3, help="Würfe auf einen Pasch im Häfn")
+    balance_parser.add_argument("--csv", default=None, help="Ertragstabelle zusätzlich als CSV speichern")
+
+    simulate_parser = commands.add_parser("simulate", help="Viele Partien simulieren (ROI, Spiellänge, Pleiten)")
+    simulate_parser.add_argument("--games", "-n", type=int, default=10000, help="Anzahl Spiele")
+    simulate_parser.add_argument("--players", "-p", type=int, default=4, help="Spieler je Spiel")
+    simulate_parser.add_argument("--jobs", "-j", type=int, default=1,
+                                 help="Anzahl paralleler Prozesse (0 = alle Kerne)")
+    simulate_parser.add_argument("--seed", type=int, default=0, help="Startwert des Zufallsgenerators")
+    simulate_parser.add_argument("--csv", default=None, help="Statistik je Grundstück als CSV speichern")
+
+    watch_parser = commands.add_parser("watch",
+                                       help="Arbeitsmappen beobachten und nur geänderte Karten/Felder neu zeichnen")
+    watch_parser.add_argument("targets", nargs="*", default=["all"],
+                              help=f"Ziele: {', '.join(TARGETS)} oder all (Standard: all)")
+    watch_parser.add_argument("--format", choices=("raster",) + VECTOR_FORMATS, default="raster",
+                              help="Format der Karten (Brett bleibt Raster)")
+    watch_parser.add_argument("--profile", choices=tuple(PROFILES), default=DEFAULT_PROFILE,
+                              help="Kodierprofil für Brett und Rasterkarten")
+    watch_parser.add_argument("--interval", type=float, default=POLL_INTERVAL, help="Abfrageintervall in Sekunden")
+
+    export_parser = commands.add_parser("export",
+                                        help="Karten direkt in ein ZIP-/TAR-Archiv rendern (ohne Zwischendateien)")
+    export_parser.add_argument("archive", help="Zielarchiv: .zip, .tar, .tar.gz oder .tgz")
+    export_parser.add_argument("targets", nargs="*", default=["all"],
+                               help=f"Inhalte: {', '.join(TARGETS)} oder all (Standard: all)")
+    export_parser.add_argument("--format", choices=("raster",) + VECTOR_FORMATS, default="raster",
+                               help="Format der Karten (Brett bleibt Raster)")
+    export_parser.add_argument("--profile", choices=tuple(PROFILES), default=DEFAULT_PROFILE,
+                               help="Kodierprofil für Brett und Rasterkarten")
+    add_instrumentation_arguments(export_parser)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        unknown = [target for target in args.targets if target not in TARGETS + ("all",)]
+        if unknown:
+            parser.error(f"Unbekannte Build-Ziele: {unknown}")
+
+        if not args.no_preflight and not preflight(args.targets).ok:
+            print("❌ Vorabprüfung fehlgeschlagen, es wird nichts gerendert (--no-preflight überspringt sie)")
+            return 1
+
+        with instrumented(args):
+            results = build(args.targets, jobs=args.jobs, force=args.force, output_format=args.format,
+                            profile=args.profile)
+
+        failed = [result for result in results if not result.ok]
+        for result in failed:
+            print(f"❌ {result.target}: {len(result.errors)} Fehler")
+        return 1 if failed else 0
+
+    if args.command == "check":
+        unknown = [target for target in args.targets if target not in TARGETS + ("all",)]
+        if unknown:
+            parser.error(f"Unbekannte Ziele: {unknown}")
+        return 0 if preflight(args.targets).ok else 1
+
+    if args.command == "balance":
+        from balance import analyze, print_report
+
+        try:
+            track, frequency, in_jail, yields, unresolved = analyze(
+                DEFAULTS["board"]["excel_file"], DEFAULTS["property"]["excel_file"], DEFAULTS["event"]["excel_file"],
+                DEFAULTS["board"]["layout"], args.jail_turns)
+        except (OSError, ValueError) as e:
+            print(f"❌ Analyse fehlgeschlagen: {e}")
+            return 1
+        print_report(track, frequency, in_jail, yields)
+        for row, target in unresolved:
+            print(f"⚠️ Zeile {row + 2}: Kartenziel '{target}' nicht auf dem Brett, Karte gilt als ohne Bewegung")
+        if args.csv:
+            yields.write_csv(args.csv)
+            print(f"💾 Ertragstabelle gespeichert: {args.csv}")
+        return 0
+
+    if args.command == "simulate":
+        from simulation import load_game_board, print_report as print_simulation, simulate
+
+        try:
+            board = load_game_board(DEFAULTS["board"]["excel_file"], DEFAULTS["property"]["excel_file"],
+                                    DEFAULTS["event"]["excel_file"], DEFAULTS["board"]["layout"])
+        except (OSError, ValueError) as e:
+            print(f"❌ Simulation fehlgeschlagen: {e}")
+            return 1
+        start = time.perf_counter()
+        try:
+            outcome = simulate(board, args.games, args.players, args.jobs, seed=args.seed)
+        except (RuntimeError, ValueError) as e:
+            print(f"❌ Simulation fehlgeschlagen: {e}")
+            return 1
+        print_simulation(outcome, board, time.perf_counter() - start)
+        if args.csv:
+            outcome.write_csv(args.csv, board)
+            print(f"💾 Statistik gespeichert: {args.csv}")
+        return 0
+
+    if args.command == "watch":
+        unknown = [target for target in args.targets if target not in TARGETS + ("all",)]
+        if unknown:
+            parser.error(f"Unbekannte Ziele: {unknown}")
+
+        from watch import watch
+
+        watch(args.targets, args.format, args.profile, args.interval)
+        return 0
+
+    if args.command == "export":
+        unknown = [target for target in args.targets if target not in TARGETS + ("all",)]
+        if unknown:
+            parser.error(f"Unbekannte Inhalte: {unknown}")
+
+        with instrumented(args):
+            try:
+                sink = export(args.archive, args.targets, output_format=args.format, profile=args.profile)
+            except (OSError, ValueError) as e:
+                print(f"❌ Export fehlgeschlagen: {e}")
+                return 1
+            progress(f"✅ {sink.entries} Einträge ({format_bytes(sink.bytes)}) in {args.archive} geschrieben")
+        return 0
+
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
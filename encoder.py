@@ -0,0 +1,221 @@
+import io
+import os
+import time
+
+from PIL import Image
+
+from instrumentation import metrics
+from vector import VECTOR_FORMATS
+
+
+class OutputProfile:
+    """
+    Kodierprofil für Rasterausgaben (Karten und Brett)
+
+    Args:
+        name (str): Name des Profils
+        image_format (str): Pillow-Format ('PNG' oder 'WEBP')
+        extension (str): Dateiendung ohne Punkt
+        compress_level (int): zlib-Stufe für PNG (0-9)
+        quality (int): Qualität für WebP (None = verlustfrei)
+        colors (int): Auf so viele Palettenfarben reduzieren (None = RGB behalten)
+        scale (float): Verkleinerungsfaktor (1.0 = volle 300 dpi)
+        method (int): WebP-Aufwand (0 = schnell, 6 = klein)
+    """
+
+    def __init__(self, name, image_format="PNG", extension="png", compress_level=6, quality=None, colors=None,
+                 scale=1.0, method=4):
+        self.name = name
+        self.image_format = image_format
+        self.extension = extension
+        self.compress_level = compress_level
+        self.quality = quality
+        self.colors = colors
+        self.scale = scale
+        self.method = method
+
+    def prepare(self, img):
+        """
+        Skaliert und reduziert die Farben gemäß Profil
+        """
+        if self.scale != 1.0:
+            size = (max(1, round(img.width * self.scale)), max(1, round(img.height * self.scale)))
+            img = img.resize(size, Image.Resampling.LANCZOS)
+
+        if self.colors:
+            return img.convert('RGB').quantize(self.colors, method=Image.Quantize.FASTOCTREE, dither=Image.Dither.NONE)
+        if self.image_format == "PNG":
+            # Verlustfrei: Palette nur, wenn das Bild ohnehin höchstens 256 Farben hat
+            if img.mode == 'RGB' and img.getcolors(256) is not None:
+                return to_exact_palette(img)
+        return img
+
+    def save_options(self):
+        dpi = round(300 * self.scale)
+        if self.image_format == "WEBP":
+            if self.quality is None:
+                return {'lossless': True, 'method': self.method}
+            return {'quality': self.quality, 'method': self.method}
+        return {'compress_level': self.compress_level, 'dpi': (dpi, dpi)}
+
+    def filename(self, path):
+        """
+        Ersetzt die Dateiendung durch die des Profils
+        """
+        return f"{os.path.splitext(path)[0]}.{self.extension}"
+
+    def fingerprint(self):
+        """
+        Kennung der Einstellungen für die Karten-Hashes
+        """
+        return (self.name, self.image_format, self.compress_level, self.quality, self.colors, self.scale, self.method)
+
+
+def to_exact_palette(img):
+    """
+    Wandelt ein RGB-Bild mit höchstens 256 Farben ohne Farbverlust in ein Palettenbild um
+
+    (Image.quantize mit fester Palette rundet über einen Farbwürfel und ist daher nicht exakt.)
+    """
+    import numpy as np
+
+    pixels = np.asarray(img, dtype=np.uint32)
+    keys = (pixels[..., 0] << 16) | (pixels[..., 1] << 8) | pixels[..., 2]
+    colors, indices = np.unique(keys, return_inverse=True)
+
+    paletted = Image.fromarray(indices.reshape(keys.shape).astype(np.uint8), 'P')
+    palette = np.stack([(colors >> 16) & 255, (colors >> 8) & 255, colors & 255], axis=1).astype(np.uint8)
+    paletted.putpalette(palette.tobytes())
+    return paletted
+
+
+PROFILES = {
+    # Verlustfrei für den Druck (Palette nur, wenn keine Farbe verloren geht)
+    "print": OutputProfile("print", compress_level=6),
+    # Kleine PNGs fürs Web: 8-Bit-Palette mit 64 Farben, maximale Kompression
+    "web": OutputProfile("web", colors=64, compress_level=9),
+    # WebP fürs Web: dieselbe 64-Farben-Palette, verlustfrei komprimiert (kleiner als verlustbehaftet)
+    "webp": OutputProfile("webp", image_format="WEBP", extension="webp", colors=64, method=6),
+    # Vorschaubilder mit 75 dpi
+    "thumb": OutputProfile("thumb", image_format="WEBP", extension="webp", quality=75, scale=0.25),
+}
+
+DEFAULT_PROFILE = "print"
+
+
+def get_profile(profile=DEFAULT_PROFILE):
+    """
+    Liefert ein Profil über seinen Namen (OutputProfile-Objekte werden durchgereicht)
+
+    Raises:
+        ValueError: Bei unbekanntem Profilnamen
+    """
+    if isinstance(profile, OutputProfile):
+        return profile
+    try:
+        return PROFILES[profile]
+    except KeyError:
+        raise ValueError(f"Unbekanntes Ausgabeprofil: {profile} (erlaubt: {', '.join(PROFILES)})") from None
+
+
+def output_extension(output_format="raster", profile=DEFAULT_PROFILE):
+    """
+    Dateiendung einer Karte: bei Rasterausgabe laut Profil, sonst 'svg' / 'pdf'
+
+    Raises:
+        ValueError: Bei unbekanntem Format oder Profil
+    """
+    if output_format in VECTOR_FORMATS:
+        return output_format
+    if output_format != "raster":
+        raise ValueError(f"Unbekanntes Ausgabeformat: {output_format} "
+                         f"(erlaubt: raster, {', '.join(VECTOR_FORMATS)})")
+    return get_profile(profile).extension
+
+
+def encoding_fingerprint(output_format="raster", profile=DEFAULT_PROFILE):
+    """
+    Kennung von Format und Profil für die Karten-Hashes (Vektorausgaben ignorieren das Profil)
+    """
+    if output_format in VECTOR_FORMATS:
+        return output_format
+    return get_profile(profile).fingerprint()
+
+
+def encode_image(img, profile=DEFAULT_PROFILE):
+    """
+    Kodiert ein Bild im Speicher
+
+    Returns:
+        tuple: (Bytes, Sekunden)
+    """
+    profile = get_profile(profile)
+    start = time.perf_counter()
+    with metrics.span("encode", profile=profile.name):
+        buffer = io.BytesIO()
+        profile.prepare(img).save(buffer, profile.image_format, **profile.save_options())
+    return buffer.getvalue(), time.perf_counter() - start
+
+
+def save_image(img, filepath, profile=DEFAULT_PROFILE):
+    """
+    Kodiert ein Bild und schreibt es (Endung laut Profil)
+
+    Returns:
+        EncodedFile
+    """
+    profile = get_profile(profile)
+    filepath = profile.filename(filepath)
+    data, seconds = encode_image(img, profile)
+    _write_file(filepath, data)
+    return EncodedFile(filepath, len(data), seconds)
+
+
+def save_vector(canvas, filepath):
+    """
+    Schreibt eine Vektorkarte (SvgCanvas / PdfCanvas)
+
+    Returns:
+        EncodedFile
+    """
+    start = time.perf_counter()
+    with metrics.span("encode", profile=type(canvas).__name__):
+        data = canvas.tobytes()
+    seconds = time.perf_counter() - start
+    _write_file(filepath, data)
+    return EncodedFile(filepath, len(data), seconds)
+
+
+def _write_file(filepath, data):
+    with metrics.span("write"):
+        with open(filepath, 'wb') as f:
+            f.write(data)
+    metrics.count("files.written")
+    metrics.count("bytes.written", len(data))
+
+
+class EncodedFile:
+    """
+    Geschriebene Datei mit Größe in Bytes und Kodierzeit in Sekunden
+    """
+
+    __slots__ = ("path", "bytes", "seconds")
+
+    def __init__(self, path, size, seconds):
+        self.path = path
+        self.bytes = size
+        self.seconds = seconds
+
+    def __str__(self):
+        return f"{self.path} ({format_bytes(self.bytes)}, {self.seconds * 1000:.1f} ms)"
+
+
+def format_bytes(size):
+    """
+    Lesbare Dateigröße (B, KB, MB)
+    """
+    if size < 1024:
+        return f"{size} B"
+    if size < 1024 * 1024:
+        return f"{size / 1024:.1f} KB"
+    return f"{size / (1024 * 1024):.1f} MB"
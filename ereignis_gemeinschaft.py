@@ -1,86 +1,55 @@
-from PIL import Image, ImageDraw, ImageFont
-import textwrap
+from PIL import Image, ImageDraw
+import argparse
 import os
-import pandas as pd
+from functools import lru_cache
 
+from encoder import DEFAULT_PROFILE, PROFILES, encoding_fingerprint, format_bytes, output_extension, save_image, \
+    save_vector
+from fonts import get_font, font_fingerprint, font_stats
+from instrumentation import add_instrumentation_arguments, instrumented, metrics, progress
+from manifest import BuildManifest, BuildResult, card_hash
+from parallel import run_jobs
+from textlayout import fit_size, text_layout
+from vector import VECTOR_FORMATS, create_canvas
+from workbooks import EVENT_SCHEMA, as_workbook, iter_records, load_workbook
 
-def create_dkt_cards_from_excel(excel_file="ereignis_gemeinschaft.xlsx", output_folder="output/dkt_cards"):
+
+# Bei jeder Änderung am Kartenlayout erhöhen, damit alle Karten neu gezeichnet werden
+RENDERER_VERSION = 2
+
+# Kartenabmessungen im Querformat (300 dpi)
+CARD_WIDTH = 1050
+CARD_HEIGHT = 675
+
+
+# Pflichtspalten der Excel-Datei
+REQUIRED_COLUMNS = EVENT_SCHEMA.required_columns
+
+
+def create_dkt_cards_from_excel(excel_file="ereignis_gemeinschaft.xlsx", output_folder="output/dkt_cards", jobs=1,
+                                force=False, output_format="raster", profile=DEFAULT_PROFILE):
     """
     Erstellt dkt-Karten aus Excel-Datei mit abgerundeten äußeren Ecken
 
     Args:
         excel_file (str): Pfad zur Excel-Datei
         output_folder (str): Ordner für die generierten Bilder
+        jobs (int): Anzahl paralleler Prozesse (0 = alle Kerne)
+        force (bool): Alle Karten neu zeichnen, auch wenn sie unverändert sind
+        output_format (str): 'raster' (PNG/WebP laut Profil) oder vektoriell 'svg' / 'pdf'
+        profile (str): Kodierprofil der Rasterausgabe ('print', 'web', 'webp', 'thumb')
+
+    Returns:
+        BuildResult oder None, falls die Excel-Datei nicht gelesen werden konnte
     """
 
     try:
-        # Excel-Datei einlesen
-        df = pd.read_excel(excel_file)
-        print(f"📊 Excel-Datei geladen: {len(df)} Karten gefunden")
-
-        # Überprüfen ob die erforderlichen Spalten vorhanden sind
-        required_columns = ['Text', 'Aktion']
-        missing_columns = [col for col in required_columns if col not in df.columns]
-
-        if missing_columns:
-            print(f"❌ Fehlende Spalten in der Excel-Datei: {missing_columns}")
-            print(f"📋 Verfügbare Spalten: {list(df.columns)}")
-            return
-
-        # Kartenabmessungen im Querformat
-        card_width = 1050
-        card_height = 675
-
-        # Ausgabeordner erstellen
-        if not os.path.exists(output_folder):
-            os.makedirs(output_folder)
-
-        # Für jede Zeile in der Excel-Datei eine Karte erstellen
-        for index, row in df.iterrows():
-            text = str(row['Text']) if pd.notna(row['Text']) else ""
-            action = str(row['Aktion']) if pd.notna(row['Aktion']) else ""
-
-            # Leere Zeilen überspringen
-            if not text and not action:
-                continue
-
-            # Neues Bild mit transparentem Hintergrund erstellen
-            img = Image.new('RGBA', (card_width, card_height), (0, 0, 0, 0))
-
-            # Abgerundete Karte als Basis erstellen
-            card_base = create_rounded_card_base(card_width, card_height)
-            img.paste(card_base, (0, 0))
-
-            draw = ImageDraw.Draw(img)
-
-            # Inneren Rahmen zeichnen
-            border_width = 12
-            border_margin = 40
-            inner_corner_radius = 35
-
-            # Innerer Rahmen (abgerundete Ecken)
-            draw.rounded_rectangle(
-                [border_margin, border_margin,
-                 card_width - border_margin, card_height - border_margin],
-                radius=inner_corner_radius,
-                outline='black',
-                width=border_width
-            )
-
-            # Text hinzufügen
-            add_centered_text_from_excel(draw, text, action, card_width, card_height)
-
-            # In RGB konvertieren für Speicherung
-            final_img = Image.new('RGB', (card_width, card_height), 'white')
-            final_img.paste(img, (0, 0), img)
-
-            # Bild speichern
-            filename = f"dkt_card_{index + 1:02d}.png"
-            filepath = os.path.join(output_folder, filename)
-            final_img.save(filepath, dpi=(300, 300))
-            print(f"Karte {index + 1} erstellt: {filepath}")
-
-        print(f"\n✅ {len(df)} dkt-Karten aus Excel erfolgreich erstellt!")
+        # Excel-Datei einlesen (Schema wird dabei geprüft, bei unveränderter Datei aus dem Cache)
+        workbook = load_workbook(excel_file, EVENT_SCHEMA)
+        progress(f"📊 Excel-Datei geladen: {len(workbook)} Karten gefunden")
+
+        return build_dkt_cards(workbook, output_folder, jobs=jobs, force=force, output_format=output_format,
+                               profile=profile)
 
     except FileNotFoundError:
         print(f"❌ Excel-Datei '{excel_file}' nicht gefunden!")
@@ -90,6 +59,229 @@ def create_dkt_cards_from_excel(excel_file="ereignis_gemeinschaft.xlsx", output_
         print(f"❌ Fehler beim Lesen der Excel-Datei: {e}")
 
 
+def build_dkt_cards(workbook, output_folder="output/dkt_cards", jobs=1, force=False, executor=None,
+                    output_format="raster", profile=DEFAULT_PROFILE):
+    """
+    Erstellt die Ereigniskarten aus einer bereits geladenen Arbeitsmappe
+
+    Args:
+        workbook: LoadedWorkbook (oder DataFrame) mit dem Inhalt von ereignis_gemeinschaft.xlsx
+        output_folder (str): Ordner für die generierten Bilder
+        jobs (int): Anzahl paralleler Prozesse (0 = alle Kerne)
+        force (bool): Alle Karten neu zeichnen, auch wenn sie unverändert sind
+        executor: Optional ein gemeinsamer Prozess-Pool (z. B. von 'dkt build')
+        output_format (str): 'raster' (PNG/WebP laut Profil) oder vektoriell 'svg' / 'pdf'
+        profile (str): Kodierprofil der Rasterausgabe ('print', 'web', 'webp', 'thumb')
+
+    Returns:
+        BuildResult
+
+    Raises:
+        ValueError: Wenn Pflichtspalten fehlen oder Format / Profil unbekannt sind
+    """
+    workbook = as_workbook(workbook, EVENT_SCHEMA)
+    extension = output_extension(output_format, profile)
+
+    # Kartenabmessungen im Querformat
+    card_width = CARD_WIDTH
+    card_height = CARD_HEIGHT
+
+    # Ausgabeordner erstellen
+    if not os.path.exists(output_folder):
+        os.makedirs(output_folder)
+
+    # Aufgaben für jede Zeile in der Excel-Datei sammeln
+    tasks = []
+    for index, record in workbook.rows():
+        text, action = record.text, record.action
+        # Leere Zeilen überspringen
+        if not text and not action:
+            continue
+
+        tasks.append((index, text, action, card_width, card_height, output_folder, output_format, profile))
+
+    # Nur Karten zeichnen, deren Inhalt sich seit dem letzten Lauf geändert hat
+    with metrics.span("plan", cards=len(tasks)):
+        manifest = BuildManifest(output_folder)
+        entries = [(dkt_card_filename(index, extension),
+                    dkt_card_hash(text, action, card_width, card_height, output_format, profile))
+                   for index, text, action, _, _, _, _, _ in tasks]
+        plan = manifest.plan(entries, force=force)
+
+    # Karten erstellen (bei jobs > 1 parallel in einem Prozess-Pool)
+    render_tasks = [tasks[position] for position in plan.render]
+    results, errors = run_jobs(render_dkt_card_file, render_tasks, jobs, executor=executor)
+
+    result = BuildResult("event")
+    for task, encoded in zip(render_tasks, results):
+        if encoded:
+            result.add_encoded(encoded)
+            progress(f"Karte {task[0] + 1} erstellt: {encoded}")
+
+    for position, message in errors:
+        result.errors.append((render_tasks[position][0] + 1, message))
+        print(f"❌ Karte {render_tasks[position][0] + 1} fehlgeschlagen: {message}")
+
+    with metrics.span("finish"):
+        copied = manifest.finish(plan, [plan.render[position] for position, _ in errors])
+    for position in copied:
+        result.copied.append(os.path.join(output_folder, entries[position][0]))
+        progress(f"Karte {tasks[position][0] + 1} kopiert: {entries[position][0]}")
+
+    result.unchanged = len(plan.unchanged)
+    result.stale = len(plan.stale)
+    metrics.count("cards.rendered", len(result.created))
+    metrics.count("cards.copied", len(copied))
+    metrics.count("cards.unchanged", result.unchanged)
+
+    progress(f"\n✅ {len(result.created)} dkt-Karten aus Excel erfolgreich erstellt!")
+    if result.created:
+        progress(f"💾 {format_bytes(result.bytes_written)} geschrieben, "
+                 f"Kodierung {result.encode_seconds * 1000:.0f} ms")
+    progress(f"♻️ {len(copied)} kopiert, {len(plan.unchanged)} unverändert, {len(plan.stale)} veraltete entfernt")
+    if errors:
+        print(f"⚠️ {len(errors)} Karten konnten nicht erstellt werden")
+    stats = font_stats()
+    if stats['misses']:
+        progress(f"🔤 Schriften-Cache: {stats['hits']} Treffer, {stats['misses']} geladen")
+
+    return result
+
+
+def iter_dkt_cards(excel_file="ereignis_gemeinschaft.xlsx", card_width=CARD_WIDTH, card_height=CARD_HEIGHT,
+                   output_format="raster", workbook=None):
+    """
+    Erzeugt die Ereigniskarten nacheinander im Speicher, ohne sie zu speichern
+
+    Ohne workbook werden CSV/JSON-Lines-Dateien blockweise gelesen (siehe iter_property_cards).
+
+    Yields:
+        tuple: (Dateiname, PIL-Bild) bzw. bei 'svg' / 'pdf' (Dateiname, VectorCanvas)
+    """
+    rows = as_workbook(workbook, EVENT_SCHEMA).rows() if workbook is not None else \
+        iter_records(excel_file, EVENT_SCHEMA)
+    for index, record in rows:
+        text, action = record.text, record.action
+        if not text and not action:
+            continue
+        if output_format in VECTOR_FORMATS:
+            yield (dkt_card_filename(index, output_format),
+                   create_dkt_card_vector(text, action, card_width, card_height, output_format))
+        else:
+            yield dkt_card_filename(index), create_dkt_card(text, action, card_width, card_height)
+
+
+def create_dkt_card(text, action, card_width, card_height):
+    """
+    Erstellt eine einzelne Ereignis-/Gemeinschaftskarte
+    """
+    with metrics.span("draw"):
+        img = get_event_template(card_width, card_height).frame.copy()
+        draw = ImageDraw.Draw(img)
+
+        # Text hinzufügen
+        add_centered_text_from_excel(draw, text, action, card_width, card_height)
+
+    return img
+
+
+@lru_cache(maxsize=None)
+def get_event_template(card_width, card_height):
+    """
+    Liefert die vorkompilierte Vorlage für Ereigniskarten (einmal pro Prozess)
+    """
+    return EventCardTemplate(card_width, card_height)
+
+
+class EventCardTemplate:
+    """
+    Vorkompilierte Ereigniskarte: abgerundete Basis und innerer Rahmen werden
+    einmal gezeichnet und als fertiges RGB-Bild für jede Karte kopiert.
+    """
+
+    # Innerer Rahmen
+    border_width = 12
+    border_margin = 40
+    inner_corner_radius = 35
+
+    def __init__(self, card_width, card_height):
+        self.card_width = card_width
+        self.card_height = card_height
+
+        # Neues Bild mit abgerundeter Karte als Basis
+        img = create_rounded_card_base(card_width, card_height)
+        draw = ImageDraw.Draw(img)
+
+        # Innerer Rahmen (abgerundete Ecken)
+        draw.rounded_rectangle(
+            [self.border_margin, self.border_margin,
+             card_width - self.border_margin, card_height - self.border_margin],
+            radius=self.inner_corner_radius,
+            outline='black',
+            width=self.border_width
+        )
+
+        # In RGB konvertieren (transparente Ecken werden weiß)
+        self.frame = Image.new('RGB', (card_width, card_height), 'white')
+        self.frame.paste(img, (0, 0), img)
+
+
+def dkt_card_filename(index, extension="png"):
+    """
+    Deterministischer Dateiname einer Ereigniskarte
+    """
+    return f"dkt_card_{index + 1:02d}.{extension}"
+
+
+def dkt_card_hash(text, action, card_width, card_height, output_format="raster", profile=DEFAULT_PROFILE):
+    """
+    Inhalts-Hash einer Ereigniskarte für inkrementelle Builds
+    """
+    return card_hash(RENDERER_VERSION, text, action, card_width, card_height, font_fingerprint(),
+                     encoding_fingerprint(output_format, profile))
+
+
+def render_dkt_card_file(index, text, action, card_width, card_height, output_folder, output_format="raster",
+                         profile=DEFAULT_PROFILE):
+    """
+    Erstellt eine Ereigniskarte und speichert sie (läuft auch in Worker-Prozessen)
+
+    Returns:
+        EncodedFile: Pfad, Größe in Bytes und Kodierzeit
+    """
+    filepath = os.path.join(output_folder, dkt_card_filename(index, output_extension(output_format, profile)))
+
+    with metrics.span("card", card=index + 1):
+        if output_format in VECTOR_FORMATS:
+            return save_vector(create_dkt_card_vector(text, action, card_width, card_height, output_format),
+                               filepath)
+
+        return save_image(create_dkt_card(text, action, card_width, card_height), filepath, profile)
+
+
+def create_dkt_card_vector(text, action, card_width, card_height, output_format="svg"):
+    """
+    Erstellt eine einzelne Ereigniskarte als Vektorgrafik ('svg' oder 'pdf')
+
+    Returns:
+        VectorCanvas: mit tobytes() / save(filepath)
+    """
+    template = get_event_template(card_width, card_height)
+    canvas = create_canvas(output_format, card_width, card_height)
+
+    # Abgerundete Basis und innerer Rahmen wie in create_rounded_card_base / EventCardTemplate
+    canvas.rounded_rectangle([0, 0, card_width, card_height], radius=50, fill='white', outline='black', width=3)
+    canvas.rounded_rectangle([template.border_margin, template.border_margin,
+                              card_width - template.border_margin, card_height - template.border_margin],
+                             radius=template.inner_corner_radius, outline='black', width=template.border_width)
+
+    with metrics.span("draw"):
+        for y, line, font in event_text_lines(text, action, card_width, card_height):
+            canvas.text((card_width / 2, y), line, font, align='center')
+
+    return canvas
+
+
 def create_rounded_card_base(width, height):
     """
     Erstellt eine abgerundete Kartenbasis mit weißem Hintergrund
@@ -110,62 +302,79 @@ def create_rounded_card_base(width, height):
     return base
 
 
-def add_centered_text_from_excel(draw, description, action, card_width, card_height):
-    """
-    Fügt zentrierten Text aus Excel-Daten mit einheitlichen Schriftgrößen hinzu
+def event_text_blocks(description, action, card_width, card_height, text_padding=28):
     """
+    Setzt Beschreibung (46 px) und Aktion (4 px kleiner) in der größten gemeinsamen Größe,
+    bei der der Block in den inneren Rahmen passt (bis hinunter zu 24 px)
 
-    # Einheitliche Schriftgrößen definieren
-    try:
-        font_text = ImageFont.truetype("arial.ttf", 46)  # Text (Beschreibung)
-        font_action = ImageFont.truetype("arial.ttf", 42)  # Aktion (etwas kleiner)
-    except:
-        font_text = ImageFont.load_default()
-        font_action = ImageFont.load_default()
-
-    # Feste Zeichen pro Zeile für einheitliches Layout
-    text_chars_per_line = 42  # Für Beschreibungstext
-    action_chars_per_line = 35  # Für Aktionstext
-
-    # Beschreibungstext in Zeilen aufteilen
-    desc_lines = textwrap.fill(description, width=text_chars_per_line).split('\n') if description else []
-
-    # Aktionstext in Zeilen aufteilen
-    action_lines = textwrap.fill(action, width=action_chars_per_line).split('\n') if action else []
-
-    # Zeilenhöhen berechnen
-    desc_line_height = font_text.getbbox("Ag")[3] - font_text.getbbox("Ag")[1] + 8
-    action_line_height = font_action.getbbox("Ag")[3] - font_action.getbbox("Ag")[1] + 8
-
-    # Gesamthöhe berechnen
-    total_desc_height = len(desc_lines) * desc_line_height
-    total_action_height = len(action_lines) * action_line_height
-    separator_space = 25 if desc_lines and action_lines else 0  # Etwas mehr Abstand
+    Returns:
+        tuple: (TextBlock der Beschreibung oder None, TextBlock der Aktion oder None,
+                Abstand dazwischen, Gesamthöhe, passt)
+    """
+    template = get_event_template(card_width, card_height)
+    inset = template.border_margin + template.border_width + text_padding
+    max_width = card_width - 2 * inset
+    max_height = card_height - 2 * (template.border_margin + template.border_width + 20)
+
+    def layout(size):
+        # Text (Beschreibung) in size, Aktion etwas kleiner; Leerzeilen-Abstand nur zwischen beiden
+        desc = text_layout.layout(description, get_font(size), max_width, line_spacing=8) if description else None
+        act = text_layout.layout(action, get_font(size - 4), max_width, line_spacing=8) if action else None
+        separator_space = 25 if desc and act else 0  # Etwas mehr Abstand
+        height = (desc.height if desc else 0) + separator_space + (act.height if act else 0)
+        width = max(block.width if block else 0 for block in (desc, act))
+        return desc, act, separator_space, width, height
+
+    def fits(size):
+        _, _, _, width, height = layout(size)
+        return width <= max_width and height <= max_height
+
+    with metrics.span("layout"):
+        size = fit_size(fits, 24, 46)
+        desc, act, separator_space, _, total_height = layout(size or 24)
+    return desc, act, separator_space, total_height, size is not None
+
+
+def event_text_lines(description, action, card_width, card_height, text_padding=28):
+    """
+    Bricht Beschreibung und Aktion nach Pixelbreite um und zentriert den Block vertikal auf der Karte
 
-    total_height = total_desc_height + separator_space + total_action_height
+    Returns:
+        list: (y, Zeile, Schrift) je Textzeile
+    """
+    desc, act, separator_space, total_height, _ = event_text_blocks(description, action, card_width, card_height,
+                                                                    text_padding)
 
     # Startposition für vertikale Zentrierung
     start_y = (card_height - total_height) // 2
 
-    # Beschreibungstext zeichnen (größere Schrift)
+    # Beschreibungstext (größere Schrift)
+    lines = []
     current_y = start_y
-    for line in desc_lines:
-        bbox = draw.textbbox((0, 0), line, font=font_text)
-        text_width = bbox[2] - bbox[0]
-        x = (card_width - text_width) // 2
-        draw.text((x, current_y), line, fill='black', font=font_text)
-        current_y += desc_line_height
+    for line in desc.lines if desc else []:
+        lines.append((current_y, line, desc.font))
+        current_y += desc.line_height
 
     # Abstand zwischen Beschreibung und Aktion
     current_y += separator_space
 
-    # Aktionstext zeichnen (kleinere Schrift)
-    for line in action_lines:
-        bbox = draw.textbbox((0, 0), line, font=font_action)
+    # Aktionstext (kleinere Schrift)
+    for line in act.lines if act else []:
+        lines.append((current_y, line, act.font))
+        current_y += act.line_height
+
+    return lines
+
+
+def add_centered_text_from_excel(draw, description, action, card_width, card_height):
+    """
+    Fügt zentrierten Text aus Excel-Daten mit einheitlichen Schriftgrößen hinzu
+    """
+    for current_y, line, font in event_text_lines(description, action, card_width, card_height):
+        bbox = draw.textbbox((0, 0), line, font=font)
         text_width = bbox[2] - bbox[0]
         x = (card_width - text_width) // 2
-        draw.text((x, current_y), line, fill='black', font=font_action)
-        current_y += action_line_height
+        draw.text((x, current_y), line, fill='black', font=font)
 
 
 def create_sample_excel(filename="ereignis_gemeinschaft.xlsx"):
@@ -210,6 +419,8 @@ def create_sample_excel(filename="ereignis_gemeinschaft.xlsx"):
         ]
     }
 
+    import pandas as pd
+
     df = pd.DataFrame(sample_data)
     df.to_excel(filename, index=False)
     print(f"📄 Beispiel-Excel-Datei '{filename}' erstellt!")
@@ -218,7 +429,20 @@ def create_sample_excel(filename="ereignis_gemeinschaft.xlsx"):
 
 # Hauptfunktion
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Erstellt Ereignis-/Gemeinschaftskarten aus "
+                                                 "ereignis_gemeinschaft.xlsx")
+    parser.add_argument("--jobs", "-j", type=int, default=1, help="Anzahl paralleler Prozesse (0 = alle Kerne)")
+    parser.add_argument("--force", action="store_true", help="Alle Karten neu zeichnen")
+    parser.add_argument("--format", choices=("raster",) + VECTOR_FORMATS, default="raster",
+                        help="Ausgabeformat: raster (PNG/WebP laut Profil) oder vektoriell svg/pdf")
+    parser.add_argument("--profile", choices=tuple(PROFILES), default=DEFAULT_PROFILE,
+                        help="Kodierprofil: print (verlustfrei), web (Palette), webp, thumb (Vorschau)")
+    add_instrumentation_arguments(parser)
+    args = parser.parse_args()
+
     # Karten aus Excel erstellen
-    create_dkt_cards_from_excel()
-    print("📁 Die Karten findest du im Ordner 'dkt_cards'")
-    print("🎯 Format: Querformat mit einheitlichen Schriftgrößen")
\ No newline at end of file
+    with instrumented(args):
+        create_dkt_cards_from_excel(jobs=args.jobs, force=args.force, output_format=args.format,
+                                    profile=args.profile)
+        progress("📁 Die Karten findest du im Ordner 'dkt_cards'")
+        progress("🎯 Format: Querformat mit einheitlichen Schriftgrößen")
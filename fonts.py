@@ -0,0 +1,146 @@
+import os
+
+import PIL
+from PIL import ImageFont
+
+from instrumentation import metrics
+
+
+# Reihenfolge der Suchpfade für eine Schriftart
+SYSTEM_FONT_DIRS = [
+    "",  # Direkt über den Namen (aktueller Ordner / FreeType-Suchpfad)
+    "/System/Library/Fonts/",
+    "/Library/Fonts/",
+    "C:/Windows/Fonts/",
+    "/usr/share/fonts/truetype/msttcorefonts/",
+]
+
+# Kennung für die mit Pillow ausgelieferte Standardschrift
+BUNDLED_FONT = "<pillow-default>"
+
+
+class FontRegistry:
+    """
+    Lädt jede Kombination aus Schriftart und Größe nur einmal und merkt sich,
+    welcher Pfad der Fallback-Kette (arial.ttf → Systempfad → mitgelieferte Schrift)
+    tatsächlich funktioniert hat.
+    """
+
+    def __init__(self, search_dirs=None):
+        self.search_dirs = list(search_dirs) if search_dirs is not None else list(SYSTEM_FONT_DIRS)
+        self._fonts = {}
+        self._resolved_paths = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, size, face="arial.ttf"):
+        """
+        Liefert die Schrift in der gewünschten Größe (aus dem Cache, falls schon geladen)
+
+        Args:
+            size (int): Schriftgröße in Pixel
+            face (str): Dateiname der TrueType-Schrift
+        """
+        key = (face, size)
+        font = self._fonts.get(key)
+        if font is not None:
+            self.hits += 1
+            return font
+
+        self.misses += 1
+        with metrics.span("font_load", face=face, size=size):
+            font = self._load(face, size)
+        self._fonts[key] = font
+        return font
+
+    def resolve(self, face):
+        """
+        Gibt den Pfad zurück, unter dem die Schrift gefunden wurde (oder BUNDLED_FONT)
+        """
+        if face not in self._resolved_paths:
+            self._load(face, 12)
+        return self._resolved_paths[face]
+
+    def fingerprint(self, face="arial.ttf"):
+        """
+        Kennung der tatsächlich verwendeten Schriftdatei (Pfad, Größe, Änderungszeit),
+        damit sich ein Schriftwechsel in den Karten-Hashes niederschlägt
+
+        Die mitgelieferte Schrift ändert sich mit Pillow, daher zählt dort dessen Version.
+        """
+        path = self.resolve(face)
+        if path == BUNDLED_FONT:
+            return f"{BUNDLED_FONT}:{PIL.__version__}"
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return path
+        return f"{path}:{stat.st_size}:{int(stat.st_mtime)}"
+
+    def _load(self, face, size):
+        path = self._resolved_paths.get(face)
+        if path is not None:
+            return self._open(path, size)
+
+        for directory in self.search_dirs:
+            candidate = directory + face
+            try:
+                font = ImageFont.truetype(candidate, size)
+            except OSError:
+                continue
+            self._resolved_paths[face] = candidate
+            return font
+
+        self._resolved_paths[face] = BUNDLED_FONT
+        return self._open(BUNDLED_FONT, size)
+
+    def _open(self, path, size):
+        if path != BUNDLED_FONT:
+            return ImageFont.truetype(path, size)
+        try:
+            return ImageFont.load_default(size)
+        except TypeError:
+            # Ältere Pillow-Versionen kennen keine skalierbare Standardschrift
+            return ImageFont.load_default()
+
+    def stats(self):
+        """
+        Liefert Cache-Treffer, Fehlgriffe und die aufgelösten Schriftpfade
+        """
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'loaded': len(self._fonts),
+            'resolved': dict(self._resolved_paths),
+        }
+
+    def clear(self):
+        self._fonts.clear()
+        self._resolved_paths.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+# Gemeinsames Register für alle Generatoren
+registry = FontRegistry()
+
+
+def get_font(size, face="arial.ttf"):
+    """
+    Kurzform für registry.get(size, face)
+    """
+    return registry.get(size, face)
+
+
+def font_fingerprint(face="arial.ttf"):
+    """
+    Kurzform für registry.fingerprint(face)
+    """
+    return registry.fingerprint(face)
+
+
+def font_stats():
+    """
+    Kurzform für registry.stats()
+    """
+    return registry.stats()
@@ -0,0 +1,296 @@
+import argparse
+import os
+
+from PIL import Image, ImageDraw
+
+
+# Bogengrößen in Millimeter (Hochformat)
+SHEET_SIZES_MM = {
+    'A4': (210, 297),
+    'A3': (297, 420),
+}
+
+
+def mm_to_px(mm, dpi=300):
+    return int(round(mm / 25.4 * dpi))
+
+
+class SheetLayout:
+    """
+    Raster für gleich große Karten auf einem Druckbogen
+
+    Alle Karten werden in die Ausrichtung der Rasterzelle gedreht (Querformat-Ereigniskarten
+    neben Hochformat-Grundstückskarten). Die Bogenausrichtung wird so gewählt, dass möglichst
+    viele Karten auf einen Bogen passen.
+    """
+
+    def __init__(self, sheet='A4', card_size=(675, 1050), dpi=300, bleed_mm=3, gutter_mm=0, margin_mm=6):
+        if sheet not in SHEET_SIZES_MM:
+            raise ValueError(f"Unbekanntes Bogenformat '{sheet}', erlaubt: {sorted(SHEET_SIZES_MM)}")
+
+        self.dpi = dpi
+        self.bleed = mm_to_px(bleed_mm, dpi)
+        self.gutter = mm_to_px(gutter_mm, dpi)
+        self.margin = mm_to_px(margin_mm, dpi)
+
+        # Zelle immer im Hochformat, Querformat-Karten werden gedreht
+        self.card_width, self.card_height = sorted(card_size)
+        self.cell_width = self.card_width + 2 * self.bleed
+        self.cell_height = self.card_height + 2 * self.bleed
+
+        width_mm, height_mm = SHEET_SIZES_MM[sheet]
+        portrait = (mm_to_px(width_mm, dpi), mm_to_px(height_mm, dpi))
+        landscape = portrait[::-1]
+        self.sheet_width, self.sheet_height = max((portrait, landscape), key=self._capacity)
+        self.columns, self.rows = self._grid(self.sheet_width, self.sheet_height)
+
+        if self.columns < 1 or self.rows < 1:
+            raise ValueError(f"Karten mit {card_size} px passen nicht auf einen {sheet}-Bogen")
+
+        # Raster auf dem Bogen zentrieren
+        grid_width = self.columns * self.cell_width + (self.columns - 1) * self.gutter
+        grid_height = self.rows * self.cell_height + (self.rows - 1) * self.gutter
+        self.origin_x = (self.sheet_width - grid_width) // 2
+        self.origin_y = (self.sheet_height - grid_height) // 2
+
+    def _grid(self, sheet_width, sheet_height):
+        usable_width = sheet_width - 2 * self.margin + self.gutter
+        usable_height = sheet_height - 2 * self.margin + self.gutter
+        return (usable_width // (self.cell_width + self.gutter),
+                usable_height // (self.cell_height + self.gutter))
+
+    def _capacity(self, sheet_size):
+        columns, rows = self._grid(*sheet_size)
+        return max(columns, 0) * max(rows, 0)
+
+    @property
+    def cards_per_sheet(self):
+        return self.columns * self.rows
+
+    def trim_box(self, slot):
+        """
+        Schnittkante (ohne Beschnitt) der Karte an Position slot als (links, oben, rechts, unten)
+        """
+        column = slot % self.columns
+        row = slot // self.columns
+        left = self.origin_x + column * (self.cell_width + self.gutter) + self.bleed
+        top = self.origin_y + row * (self.cell_height + self.gutter) + self.bleed
+        return left, top, left + self.card_width, top + self.card_height
+
+
+def add_bleed(card, bleed, mode='white'):
+    """
+    Erweitert eine Karte um den Beschnitt
+
+    Args:
+        card: PIL-Bild der Karte
+        bleed (int): Beschnitt je Seite in Pixel
+        mode (str): 'white' (Papierweiß, passend zu den abgerundeten Karten) oder
+                    'edge' (Randpixel werden nach außen verlängert)
+    """
+    if bleed <= 0:
+        return card
+
+    width, height = card.size
+    result = Image.new('RGB', (width + 2 * bleed, height + 2 * bleed), 'white')
+    result.paste(card, (bleed, bleed))
+
+    if mode == 'white':
+        return result
+
+    # Ränder
+    result.paste(card.crop((0, 0, width, 1)).resize((width, bleed)), (bleed, 0))
+    result.paste(card.crop((0, height - 1, width, height)).resize((width, bleed)), (bleed, height + bleed))
+    result.paste(card.crop((0, 0, 1, height)).resize((bleed, height)), (0, bleed))
+    result.paste(card.crop((width - 1, 0, width, height)).resize((bleed, height)), (width + bleed, bleed))
+
+    # Ecken
+    for x, y, source in [(0, 0, (0, 0)), (width + bleed, 0, (width - 1, 0)), (0, height + bleed, (0, height - 1)),
+                         (width + bleed, height + bleed, (width - 1, height - 1))]:
+        result.paste(card.getpixel(source), (x, y, x + bleed, y + bleed))
+
+    return result
+
+
+def draw_cut_marks(draw, layout, used_slots, mark_length=None, color='black'):
+    """
+    Zeichnet Schnittmarken im Bogenrand an allen Schnittkanten der belegten Spalten und Zeilen
+    """
+    mark_length = mark_length or layout.margin // 2
+    gap = mm_to_px(1, layout.dpi)  # Abstand der Marken zum Beschnitt
+    used_columns = sorted({slot % layout.columns for slot in range(used_slots)})
+    used_rows = sorted({slot // layout.columns for slot in range(used_slots)})
+
+    first = layout.trim_box(0)
+    last = layout.trim_box(layout.cards_per_sheet - 1)
+    grid_top = first[1] - layout.bleed
+    grid_bottom = last[3] + layout.bleed
+    grid_left = first[0] - layout.bleed
+    grid_right = last[2] + layout.bleed
+
+    for column in used_columns:
+        left, _, right, _ = layout.trim_box(column)
+        for x in (left, right):
+            draw.line([x, grid_top - gap - mark_length, x, grid_top - gap], fill=color, width=2)
+            draw.line([x, grid_bottom + gap, x, grid_bottom + gap + mark_length],
+                      fill=color, width=2)
+
+    for row in used_rows:
+        _, top, _, bottom = layout.trim_box(row * layout.columns)
+        for y in (top, bottom):
+            draw.line([grid_left - gap - mark_length, y, grid_left - gap, y], fill=color, width=2)
+            draw.line([grid_right + gap, y, grid_right + gap + mark_length, y],
+                      fill=color, width=2)
+
+
+def iter_card_files(folders):
+    """
+    Liefert die Rasterkarten (PNG/WebP) der angegebenen Ordner in sortierter Reihenfolge
+    """
+    for folder in folders:
+        for filename in sorted(os.listdir(folder)):
+            if filename.lower().endswith(('.png', '.webp')):
+                yield os.path.join(folder, filename)
+
+
+def check_card_files(paths, card_size=(675, 1050)):
+    """
+    Prüft vor dem Setzen die Größe aller Kartendateien (nur der Dateikopf wird gelesen)
+
+    Raises:
+        ValueError: Wenn eine Karte nicht in Druckgröße vorliegt (z. B. mit --profile thumb gebaut)
+    """
+    for path in paths:
+        with Image.open(path) as card:
+            size = card.size
+        if sorted(size) != sorted(card_size):
+            raise ValueError(f"'{path}' hat {size[0]}x{size[1]} px statt Druckgröße {card_size[0]}x{card_size[1]} "
+                             f"(oder gedreht). Karten mit 'dkt build --profile print' neu erstellen oder "
+                             f"--from-excel verwenden")
+
+
+def impose_cards(cards, output_pdf, sheet='A4', dpi=300, bleed_mm=3, gutter_mm=0, margin_mm=6, rotate=True,
+                 cut_marks=True, card_size=(675, 1050), quality=95, bleed_mode='white'):
+    """
+    Setzt Karten auf Druckbögen und schreibt sie Bogen für Bogen in ein mehrseitiges PDF
+
+    Es liegt immer nur ein Bogen und eine Karte im Speicher, unabhängig von der Deckgröße.
+
+    Args:
+        cards (iterable): PIL-Bilder, Dateipfade oder (Dateiname, Bild)-Paare der Renderer
+        output_pdf (str): Pfad der PDF-Datei
+        sheet (str): Bogenformat ('A4' oder 'A3')
+        dpi (int): Auflösung der Karten und des Bogens
+        bleed_mm (float): Beschnitt je Seite
+        gutter_mm (float): Abstand zwischen den Karten
+        margin_mm (float): Mindest-Bogenrand (enthält die Schnittmarken)
+        rotate (bool): Karten in die Ausrichtung der Rasterzelle drehen
+        cut_marks (bool): Schnittmarken zeichnen
+        card_size (tuple): Kartengröße in Pixel (Ausrichtung egal)
+        quality (int): JPEG-Qualität der Bögen im PDF
+        bleed_mode (str): Füllung des Beschnitts, siehe add_bleed
+
+    Returns:
+        tuple: (Anzahl Bögen, Anzahl Karten)
+    """
+    layout = SheetLayout(sheet, card_size, dpi, bleed_mm, gutter_mm, margin_mm)
+
+    output_dir = os.path.dirname(output_pdf)
+    if output_dir and not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+
+    pages = 0
+    total = 0
+    page = None
+    slot = 0
+
+    def flush():
+        nonlocal pages, page, slot
+        if cut_marks:
+            draw_cut_marks(ImageDraw.Draw(page), layout, slot)
+        page.save(output_pdf, 'PDF', resolution=dpi, append=pages > 0, quality=quality)
+        pages += 1
+        page = None
+        slot = 0
+
+    for card in cards:
+        if isinstance(card, tuple):
+            card = card[1]
+        if isinstance(card, str):
+            with Image.open(card) as opened:
+                card = opened.convert('RGB')
+        elif card.mode != 'RGB':
+            card = card.convert('RGB')
+
+        if card.width > card.height:
+            if not rotate:
+                raise ValueError("Querformat-Karte gefunden, aber rotate=False")
+            card = card.transpose(Image.Transpose.ROTATE_90)
+
+        if card.size != (layout.card_width, layout.card_height):
+            raise ValueError(f"Kartengröße {card.size} passt nicht zum Raster "
+                             f"{(layout.card_width, layout.card_height)}")
+
+        if page is None:
+            page = Image.new('RGB', (layout.sheet_width, layout.sheet_height), 'white')
+
+        left, top, _, _ = layout.trim_box(slot)
+        page.paste(add_bleed(card, layout.bleed, bleed_mode), (left - layout.bleed, top - layout.bleed))
+        slot += 1
+        total += 1
+
+        if slot == layout.cards_per_sheet:
+            flush()
+
+    if page is not None:
+        flush()
+
+    return pages, total
+
+
+def create_print_sheets(folders=("output/property_cards", "output/dkt_cards"), output_pdf="output/druckboegen.pdf",
+                        from_excel=False, **options):
+    """
+    Erstellt Druckbögen aus den gerenderten Kartenordnern oder direkt aus den Excel-Dateien
+    """
+    try:
+        if from_excel:
+            from besitzkarten import iter_property_cards
+            from ereignis_gemeinschaft import iter_dkt_cards
+
+            def cards():
+                yield from iter_property_cards()
+                yield from iter_dkt_cards()
+
+            source = cards()
+        else:
+            source = list(iter_card_files(folders))
+            check_card_files(source, options.get('card_size', (675, 1050)))
+
+        pages, total = impose_cards(source, output_pdf, **options)
+        print(f"✅ {total} Karten auf {pages} Bögen gesetzt: {output_pdf}")
+        return pages, total
+
+    except Exception as e:
+        print(f"❌ Fehler beim Erstellen der Druckbögen: {e}")
+        return None
+
+
+# Hauptfunktion
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Setzt Karten mit Beschnitt und Schnittmarken auf Druckbögen (PDF)")
+    parser.add_argument("folders", nargs="*", default=["output/property_cards", "output/dkt_cards"],
+                        help="Ordner mit gerenderten Karten")
+    parser.add_argument("--output", "-o", default="output/druckboegen.pdf", help="Ziel-PDF")
+    parser.add_argument("--sheet", choices=sorted(SHEET_SIZES_MM), default="A4", help="Bogenformat")
+    parser.add_argument("--dpi", type=int, default=300)
+    parser.add_argument("--bleed", type=float, default=3, help="Beschnitt in mm")
+    parser.add_argument("--gutter", type=float, default=0, help="Abstand zwischen Karten in mm")
+    parser.add_argument("--bleed-mode", choices=["white", "edge"], default="white", help="Füllung des Beschnitts")
+    parser.add_argument("--no-cut-marks", action="store_true", help="Keine Schnittmarken zeichnen")
+    parser.add_argument("--from-excel", action="store_true", help="Karten direkt aus den Excel-Dateien rendern")
+    args = parser.parse_args()
+
+    create_print_sheets(args.folders, args.output, from_excel=args.from_excel, sheet=args.sheet, dpi=args.dpi,
+                        bleed_mm=args.bleed, gutter_mm=args.gutter, cut_marks=not args.no_cut_marks,
+                        bleed_mode=args.bleed_mode)
@@ -0,0 +1,384 @@
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def current_rss_mb():
+    """
+    Aktueller Arbeitsspeicher des Prozesses in MB (None, falls nicht ermittelbar)
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * resource.getpagesize() / (1024 * 1024)
+    except (OSError, ValueError, AttributeError, IndexError):
+        return None
+
+
+def peak_rss_mb():
+    """
+    Höchster Arbeitsspeicher des Prozesses seit dem Start in MB (None, falls nicht ermittelbar)
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux liefert KB, macOS Bytes
+    if sys.platform == "darwin":
+        return peak / (1024 * 1024)
+    return peak / 1024
+
+
+def process_uptime():
+    """
+    Sekunden seit dem Start des Prozesses (Linux, sonst None) - für Kaltstart-Messungen
+    """
+    try:
+        with open("/proc/self/stat") as f:
+            # Feld 22 (starttime) steht nach dem in Klammern gesetzten Prozessnamen
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return uptime - start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+class StageTimer:
+    """
+    Misst Laufzeit und Speicher einzelner Verarbeitungsschritte
+
+    Ist die Aufzeichnung (metrics) aktiv, wird jeder Schritt zusätzlich als Span
+    '<prefix>.<Schritt>' erfasst.
+    """
+
+    def __init__(self, prefix=None):
+        self.prefix = prefix
+        self.stages = []
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        peak_before = peak_rss_mb()
+        try:
+            with metrics.span(f"{self.prefix}.{name}" if self.prefix else name):
+                yield
+        finally:
+            peak_after = peak_rss_mb()
+            self.stages.append({
+                'stage': name,
+                'seconds': time.perf_counter() - start,
+                'rss_mb': current_rss_mb(),
+                'peak_mb': peak_after,
+                'peak_growth_mb': (peak_after - peak_before) if peak_after is not None else None,
+            })
+
+    def totals(self):
+        """
+        Fasst mehrfach gemessene Schritte zusammen (Summe der Zeit, höchster Speicherzuwachs)
+
+        Returns:
+            dict: Schritt → {'seconds', 'calls', 'peak_mb', 'peak_growth_mb'} in Reihenfolge des ersten Auftretens
+        """
+        totals = {}
+        for entry in self.stages:
+            total = totals.setdefault(entry['stage'], {'seconds': 0.0, 'calls': 0, 'peak_mb': None,
+                                                       'peak_growth_mb': None})
+            total['seconds'] += entry['seconds']
+            total['calls'] += 1
+            for key in ('peak_mb', 'peak_growth_mb'):
+                if entry[key] is not None:
+                    total[key] = max(entry[key], total[key] if total[key] is not None else entry[key])
+        return totals
+
+    def report(self):
+        """
+        Tabellarische Übersicht aller gemessenen Schritte
+        """
+        lines = []
+        for entry in self.stages:
+            line = f"   • {entry['stage']:<12} {entry['seconds'] * 1000:8.1f} ms"
+            if entry['peak_mb'] is not None:
+                line += f"   Spitze {entry['peak_mb']:7.1f} MB (+{entry['peak_growth_mb']:.1f} MB)"
+            lines.append(line)
+        return "\n".join(lines)
+
+
+class Metrics:
+    """
+    Sammelt Zeitspannen (Spans) und Zähler eines Laufs für Auswertung und Export
+
+    Standardmäßig ausgeschaltet: span() liefert dann einen leeren Kontext und count()
+    kehrt sofort zurück, sodass die Messpunkte im Kartencode nichts kosten.
+    Worker-Prozesse zeichnen über traced_call auf, die Spans werden im Hauptprozess
+    mit merge() zusammengeführt.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.quiet = False
+        self.trace_memory = False
+        self.events = []
+        self.counters = {}
+
+    def configure(self, enabled=None, quiet=None, trace_memory=None):
+        if enabled is not None:
+            self.enabled = enabled
+        if quiet is not None:
+            self.quiet = quiet
+        if trace_memory is not None:
+            self.trace_memory = trace_memory
+
+    def options(self):
+        """
+        Einstellungen zum Weiterreichen an Worker-Prozesse
+        """
+        return {'enabled': self.enabled, 'quiet': self.quiet, 'trace_memory': self.trace_memory}
+
+    def span(self, name, /, **args):
+        """
+        Misst einen Abschnitt: with metrics.span("encode", card=3): ...
+
+        args landen unverändert im Export (z. B. Kartennummer und Name).
+        """
+        if not self.enabled:
+            return _NO_SPAN
+        return self._span(name, args)
+
+    @contextmanager
+    def _span(self, name, args):
+        traced = self.trace_memory and _tracemalloc_active()
+        if traced:
+            import tracemalloc
+
+            memory_before = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            event = {'name': name, 'start': start, 'seconds': time.perf_counter() - start, 'pid': os.getpid(),
+                     'tid': threading.get_ident()}
+            if traced:
+                # Netto-Zuwachs der von Python verwalteten Objekte während des Spans
+                args = {**args, 'alloc_kb': round((tracemalloc.get_traced_memory()[0] - memory_before) / 1024, 1)}
+            if args:
+                event['args'] = args
+            self.events.append(event)
+
+    def count(self, name, value=1):
+        """
+        Erhöht einen Zähler (z. B. 'cards.rendered', 'bytes.written')
+        """
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def merge(self, events, counters):
+        """
+        Übernimmt Spans und Zähler aus einem Worker-Prozess
+        """
+        self.events.extend(events)
+        for name, value in counters.items():
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def reset(self):
+        self.events = []
+        self.counters = {}
+
+    def totals(self):
+        """
+        Summen je Span-Name (verschachtelte Spans zählen in beiden Namen)
+
+        Returns:
+            dict: Name → {'seconds', 'calls', 'max_seconds'} in Reihenfolge des ersten Auftretens
+        """
+        totals = {}
+        for event in self.events:
+            total = totals.setdefault(event['name'], {'seconds': 0.0, 'calls': 0, 'max_seconds': 0.0})
+            total['seconds'] += event['seconds']
+            total['calls'] += 1
+            total['max_seconds'] = max(total['max_seconds'], event['seconds'])
+        return totals
+
+    def slowest(self, name, limit=5):
+        """
+        Die langsamsten Spans eines Namens (z. B. 'card' für die langsamsten Karten)
+        """
+        matching = [event for event in self.events if event['name'] == name]
+        return sorted(matching, key=lambda event: event['seconds'], reverse=True)[:limit]
+
+    def report(self, limit=5):
+        """
+        Übersicht je Schritt, Zähler und die langsamsten Karten
+        """
+        lines = []
+        for name, total in self.totals().items():
+            mean = total['seconds'] / total['calls']
+            lines.append(f"   • {name:<16} {total['seconds'] * 1000:9.1f} ms  {total['calls']:6d}×  "
+                         f"Ø {mean * 1000:7.2f} ms  max {total['max_seconds'] * 1000:7.2f} ms")
+        for name, value in self.counters.items():
+            lines.append(f"   # {name:<16} {value}")
+        slow = self.slowest("card", limit)
+        if slow:
+            lines.append("   Langsamste Karten:")
+            for event in slow:
+                details = ", ".join(f"{key}={value}" for key, value in event.get('args', {}).items())
+                lines.append(f"     {event['seconds'] * 1000:8.1f} ms  {details}")
+        return "\n".join(lines)
+
+    def write_jsonl(self, path):
+        """
+        Exportiert eine Zeile JSON je Span bzw. Zähler (Zeiten in ms ab Beginn des Laufs)
+        """
+        origin = self._origin()
+        with open(path, "w", encoding="utf-8") as f:
+            for event in sorted(self.events, key=lambda event: event['start']):
+                record = {'type': 'span', 'name': event['name'], 'start_ms': round((event['start'] - origin) * 1000, 3),
+                          'ms': round(event['seconds'] * 1000, 3), 'pid': event['pid'], 'tid': event['tid']}
+                if 'args' in event:
+                    record['args'] = event['args']
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            for name, value in self.counters.items():
+                f.write(json.dumps({'type': 'counter', 'name': name, 'value': value}, ensure_ascii=False) + "\n")
+
+    def write_chrome_trace(self, path):
+        """
+        Exportiert im Chrome-Trace-Format (chrome://tracing, ui.perfetto.dev)
+        """
+        origin = self._origin()
+        trace_events = []
+        end = 0
+        for event in self.events:
+            ts = (event['start'] - origin) * 1e6
+            trace_events.append({'name': event['name'], 'ph': 'X', 'ts': round(ts, 1),
+                                 'dur': round(event['seconds'] * 1e6, 1), 'pid': event['pid'], 'tid': event['tid'],
+                                 'args': event.get('args', {})})
+            end = max(end, ts + event['seconds'] * 1e6)
+        for name, value in self.counters.items():
+            trace_events.append({'name': name, 'ph': 'C', 'ts': round(end, 1), 'pid': os.getpid(),
+                                 'args': {'value': value}})
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({'traceEvents': trace_events, 'displayTimeUnit': 'ms'}, f, ensure_ascii=False)
+
+    def export(self, path):
+        """
+        Schreibt den Trace: .jsonl als JSON-Lines, sonst im Chrome-Trace-Format
+        """
+        if path.endswith(".jsonl"):
+            self.write_jsonl(path)
+        else:
+            self.write_chrome_trace(path)
+
+    def _origin(self):
+        return min((event['start'] for event in self.events), default=0.0)
+
+
+_NO_SPAN = nullcontext()
+
+
+def _tracemalloc_active():
+    import tracemalloc
+
+    return tracemalloc.is_tracing()
+
+
+# Gemeinsame Aufzeichnung des Prozesses
+metrics = Metrics()
+
+
+def progress(message):
+    """
+    Fortschrittsmeldung, die im stillen Modus (--quiet) unterdrückt wird
+    """
+    if not metrics.quiet:
+        print(message)
+
+
+def traced_call(func, task, options):
+    """
+    Führt func(*task) in einem Worker-Prozess mit Aufzeichnung aus
+
+    Returns:
+        tuple: (Ergebnis, Spans, Zähler)
+    """
+    metrics.configure(**options)
+    metrics.reset()
+    if metrics.trace_memory and not _tracemalloc_active():
+        import tracemalloc
+
+        tracemalloc.start()
+    result = func(*task)
+    return result, metrics.events, metrics.counters
+
+
+def add_instrumentation_arguments(parser):
+    """
+    Gemeinsame Kommandozeilenoptionen für Messung, Profiling und stillen Modus
+    """
+    group = parser.add_argument_group("Messung")
+    group.add_argument("--quiet", "-q", action="store_true", help="Keine Meldung pro Karte, nur Fehler und Warnungen")
+    group.add_argument("--metrics", action="store_true", help="Laufzeit je Schritt und langsamste Karten ausgeben")
+    group.add_argument("--trace", metavar="DATEI",
+                       help="Spans exportieren: .jsonl als JSON-Lines, sonst Chrome-Trace (chrome://tracing)")
+    group.add_argument("--cprofile", metavar="DATEI", help="cProfile des Hauptprozesses in DATEI speichern (pstats)")
+    group.add_argument("--tracemalloc", action="store_true",
+                       help="Speicherallokationen je Span messen und die größten Verursacher ausgeben")
+    return group
+
+
+@contextmanager
+def instrumented(args):
+    """
+    Aktiviert Aufzeichnung und Profiling laut Kommandozeile und gibt am Ende Bericht und Exporte aus
+
+    args ist das Ergebnis von parse_args() eines Parsers mit add_instrumentation_arguments.
+    """
+    metrics.reset()
+    metrics.configure(enabled=bool(args.metrics or args.trace or args.tracemalloc), quiet=args.quiet,
+                      trace_memory=args.tracemalloc)
+
+    profiler = None
+    if args.cprofile:
+        import cProfile
+
+        profiler = cProfile.Profile()
+    if args.tracemalloc:
+        import tracemalloc
+
+        tracemalloc.start()
+
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield metrics
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(args.cprofile)
+            print(f"🔬 cProfile gespeichert: {args.cprofile} (python -m pstats {args.cprofile}; "
+                  f"Worker-Prozesse nur mit --jobs 1 enthalten)")
+
+        if args.tracemalloc:
+            import tracemalloc
+
+            snapshot = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(f"🧠 tracemalloc: Spitze {peak / (1024 * 1024):.1f} MB, größte Verursacher:")
+            for stat in snapshot.statistics("lineno")[:10]:
+                print(f"   • {stat.size / 1024:9.1f} KB  {stat.traceback}")
+
+        if args.metrics or args.tracemalloc:
+            print("⏱️ Laufzeit je Schritt:")
+            print(metrics.report())
+        if args.trace:
+            metrics.export(args.trace)
+            print(f"🧭 Trace mit {len(metrics.events)} Spans gespeichert: {args.trace}")
+
+        metrics.configure(enabled=False, quiet=False, trace_memory=False)
@@ -0,0 +1,83 @@
+import threading
+from collections import OrderedDict
+
+from PIL import Image, ImageDraw
+
+from instrumentation import metrics
+
+
+# Verlustfreie Drehungen für rechte Winkel (gegen den Uhrzeigersinn, wie Image.rotate)
+TRANSPOSE_FOR_ROTATION = {
+    90: Image.Transpose.ROTATE_90,
+    180: Image.Transpose.ROTATE_180,
+    270: Image.Transpose.ROTATE_270,
+}
+
+
+class LabelRasterizer:
+    """
+    Rastert gedrehte Beschriftungen in genau passender Größe und merkt sich die Ergebnisse
+
+    Die Arbeitsfläche wird aus der Textbox berechnet (kein fester Hilfscanvas, keine
+    abgeschnittenen langen Namen), 90/180/270 Grad werden verlustfrei transponiert.
+    Fertige Bitmaps werden pro (Text, Schrift, Farbe, Drehung) zwischengespeichert, sodass
+    beim erneuten Beschriften nur geänderte Texte neu gerastert werden. Der Cache ist
+    threadsicher, sodass parallel gerenderte Ausgaben eines Bretts ihn teilen können.
+    """
+
+    def __init__(self, padding=5, max_entries=4096):
+        self.padding = padding
+        self.max_entries = max_entries
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, text, font, color, rotation=0):
+        """
+        Liefert das RGBA-Bild eines Textes (nicht verändern, wird geteilt)
+        """
+        # Die Schrift selbst wird im Wert gehalten, damit ihre id() nicht wiederverwendet wird
+        key = (text, id(font), tuple(color) if isinstance(color, list) else color, rotation % 360)
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        metrics.count("labels.rasterized")
+        image = self._rasterize(text, font, color, rotation % 360)
+        with self._lock:
+            self._cache[key] = (font, image)
+            if len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return image
+
+    def _rasterize(self, text, font, color, rotation):
+        padding = self.padding
+        left, top, right, bottom = font.getbbox(text, anchor="mm")
+
+        text_img = Image.new('RGBA', (right - left + 2 * padding, bottom - top + 2 * padding), (255, 255, 255, 0))
+        draw = ImageDraw.Draw(text_img)
+        draw.text((padding - left, padding - top), text, fill=color, font=font, anchor="mm")
+
+        if rotation in TRANSPOSE_FOR_ROTATION:
+            return text_img.transpose(TRANSPOSE_FOR_ROTATION[rotation])
+        if rotation != 0:
+            return text_img.rotate(rotation, expand=True)
+        return text_img
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'cached': len(self._cache)}
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+# Gemeinsamer Cache für alle Brett-Beschriftungen eines Prozesses
+rasterizer = LabelRasterizer()
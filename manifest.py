@@ -0,0 +1,182 @@
+import hashlib
+import json
+import os
+import shutil
+
+
+MANIFEST_NAME = ".manifest.json"
+
+# Präfix für Kopierquellen, die während eines Builds überschrieben werden
+STAGED_PREFIX = ".staged-"
+
+
+def card_hash(*parts):
+    """
+    Inhalts-Hash einer Karte über alle Werte, die das Bild beeinflussen
+    (Zeilenwerte, Kartengröße, Schriften, Renderer-Version)
+    """
+    payload = json.dumps(parts, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class BuildPlan:
+    """
+    Ergebnis von BuildManifest.plan: was neu gezeichnet, kopiert oder gelöscht wird
+    """
+
+    def __init__(self, entries):
+        self.entries = entries
+        self.render = []      # Positionen, die gezeichnet werden müssen
+        self.copies = []      # (Quell-Position oder None, Quelldatei, Ziel-Position)
+        self.unchanged = []   # Positionen, deren Datei aktuell ist
+        self.stale = []       # Dateien gelöschter Zeilen
+        self.staged = []      # Beiseitegelegte Kopierquellen (löscht finish)
+
+
+class BuildResult:
+    """
+    Zusammenfassung eines Builds für Aufrufer wie 'dkt build'
+    """
+
+    def __init__(self, target):
+        self.target = target
+        self.created = []    # Pfade neu gezeichneter Karten
+        self.copied = []     # Pfade kopierter Karten
+        self.unchanged = 0
+        self.stale = 0
+        self.errors = []     # (Kartennummer, Fehlermeldung)
+        self.bytes_written = 0
+        self.encode_seconds = 0.0
+
+    def add_encoded(self, encoded):
+        """
+        Verbucht eine geschriebene Datei (EncodedFile) als neu erstellt
+        """
+        self.created.append(encoded.path)
+        self.bytes_written += encoded.bytes
+        self.encode_seconds += encoded.seconds
+
+    @property
+    def ok(self):
+        return not self.errors
+
+
+class BuildManifest:
+    """
+    Merkt sich pro Ausgabeordner den Inhalts-Hash jeder erzeugten Karte,
+    damit bei einem erneuten Lauf nur geänderte Karten gezeichnet werden.
+    """
+
+    def __init__(self, output_folder, name=MANIFEST_NAME):
+        self.output_folder = output_folder
+        self.path = os.path.join(output_folder, name)
+        self.cards = {}
+
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    self.cards = json.load(f).get("cards", {})
+            except (OSError, ValueError):
+                # Beschädigtes Manifest: alles neu erstellen
+                self.cards = {}
+
+    def is_current(self, filename, digest):
+        return (self.cards.get(filename) == digest
+                and os.path.exists(os.path.join(self.output_folder, filename)))
+
+    def plan(self, entries, force=False):
+        """
+        Plant einen Build
+
+        Aktuelle Dateien, die in diesem Lauf überschrieben werden, dienen trotzdem als
+        Kopierquelle: sie werden hier beiseitegelegt, damit nach dem Löschen oder Einfügen
+        einer Zeile die verschobenen Karten kopiert statt neu gezeichnet werden.
+
+        Args:
+            entries (list): Liste von (Dateiname, Hash) in Kartenreihenfolge
+            force (bool): Alle Karten neu zeichnen
+
+        Returns:
+            BuildPlan
+        """
+        plan = BuildPlan(entries)
+
+        wanted = {filename: digest for filename, digest in entries}
+
+        # Aktuelle Dateien nach Hash, damit gleiche Karten nur kopiert werden
+        # (bevorzugt Dateien, die in diesem Lauf nicht überschrieben werden)
+        current_by_digest = {}
+        if not force:
+            kept_first = sorted(self.cards.items(), key=lambda item: wanted.get(item[0], item[1]) != item[1])
+            for filename, digest in kept_first:
+                if os.path.exists(os.path.join(self.output_folder, filename)):
+                    current_by_digest.setdefault(digest, filename)
+
+        rendered_by_digest = {}
+        for position, (filename, digest) in enumerate(entries):
+            if not force and self.is_current(filename, digest):
+                plan.unchanged.append(position)
+            elif digest in rendered_by_digest:
+                source = rendered_by_digest[digest]
+                plan.copies.append((source, entries[source][0], position))
+            elif digest in current_by_digest:
+                plan.copies.append((None, current_by_digest[digest], position))
+            else:
+                rendered_by_digest[digest] = position
+                plan.render.append(position)
+
+        plan.stale = sorted(filename for filename in self.cards if filename not in wanted)
+
+        overwritten = {entries[position][0] for position in plan.render}
+        overwritten.update(entries[position][0] for _, _, position in plan.copies)
+        staged = {}
+        for number, (source_position, source_file, position) in enumerate(plan.copies):
+            if source_position is not None or source_file not in overwritten:
+                continue
+            if source_file not in staged:
+                staged[source_file] = STAGED_PREFIX + source_file
+                shutil.copyfile(os.path.join(self.output_folder, source_file),
+                                os.path.join(self.output_folder, staged[source_file]))
+            plan.copies[number] = (None, staged[source_file], position)
+        plan.staged = list(staged.values())
+        return plan
+
+    def finish(self, plan, failed=()):
+        """
+        Kopiert identische Karten, löscht veraltete Dateien und speichert das Manifest
+
+        Args:
+            plan (BuildPlan): Der ausgeführte Plan
+            failed (iterable): Positionen, deren Erstellung fehlgeschlagen ist
+
+        Returns:
+            list: Positionen, die kopiert wurden
+        """
+        failed = set(failed)
+        copied = []
+
+        for source_position, source_file, position in plan.copies:
+            if source_position in failed:
+                failed.add(position)
+                continue
+            target_file = plan.entries[position][0]
+            shutil.copyfile(os.path.join(self.output_folder, source_file),
+                            os.path.join(self.output_folder, target_file))
+            copied.append(position)
+
+        for filename in plan.stale + plan.staged:
+            filepath = os.path.join(self.output_folder, filename)
+            if os.path.exists(filepath):
+                os.remove(filepath)
+
+        self.cards = {filename: digest
+                      for position, (filename, digest) in enumerate(plan.entries)
+                      if position not in failed}
+        self.save()
+        return copied
+
+    def save(self):
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"cards": self.cards}, f, indent=1, sort_keys=True, ensure_ascii=False)
+        os.replace(temp_path, self.path)
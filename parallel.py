@@ -0,0 +1,72 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from instrumentation import metrics, traced_call
+
+
+def resolve_jobs(jobs):
+    """
+    Wandelt die --jobs-Angabe in eine Anzahl Prozesse um (0 oder None = alle Kerne)
+    """
+    if not jobs:
+        return os.cpu_count() or 1
+    return max(1, int(jobs))
+
+
+def run_jobs(func, tasks, jobs=1, executor=None):
+    """
+    Führt func(*task) für jede Aufgabe aus, bei jobs > 1 in einem Prozess-Pool
+
+    Fehler einzelner Aufgaben brechen den Lauf nicht ab, sondern werden gesammelt.
+    Die Ergebnisse kommen immer in der Reihenfolge der Aufgaben zurück. Ist die Aufzeichnung
+    aktiv (instrumentation.metrics), werden die Spans der Worker übernommen.
+
+    Args:
+        func: Funktion auf Modulebene (muss für den Pool picklebar sein)
+        tasks (list): Liste von Argument-Tupeln
+        jobs (int): Anzahl paralleler Prozesse
+        executor: Optional ein bereits laufender Pool, der wiederverwendet wird (auch ein
+            ThreadPoolExecutor, wenn die Aufgaben Speicher im Prozess teilen sollen)
+
+    Returns:
+        tuple: (results, errors) - results enthält None für fehlgeschlagene Aufgaben,
+               errors ist eine Liste von (Position, Fehlermeldung)
+    """
+    tasks = list(tasks)
+    results = [None] * len(tasks)
+    errors = []
+
+    if executor is None and (resolve_jobs(jobs) == 1 or len(tasks) <= 1):
+        for position, task in enumerate(tasks):
+            try:
+                results[position] = func(*task)
+            except Exception as e:
+                errors.append((position, f"{type(e).__name__}: {e}"))
+        return results, errors
+
+    own_executor = executor is None
+    if own_executor:
+        executor = ProcessPoolExecutor(max_workers=min(resolve_jobs(jobs), len(tasks)))
+
+    try:
+        # Threads zeichnen direkt in die gemeinsame Aufzeichnung, nur Prozesse brauchen traced_call
+        traced = metrics.enabled and isinstance(executor, ProcessPoolExecutor)
+        if traced:
+            options = metrics.options()
+            futures = [executor.submit(traced_call, func, task, options) for task in tasks]
+        else:
+            futures = [executor.submit(func, *task) for task in tasks]
+        for position, future in enumerate(futures):
+            try:
+                result = future.result()
+                if traced:
+                    result, events, counters = result
+                    metrics.merge(events, counters)
+                results[position] = result
+            except Exception as e:
+                errors.append((position, f"{type(e).__name__}: {e}"))
+    finally:
+        if own_executor:
+            executor.shutdown()
+
+    return results, errors
@@ -0,0 +1,358 @@
+import argparse
+import os
+import sys
+import time
+from collections import namedtuple
+
+from board_layout import DEFAULT_LAYOUT, compile_layout
+from fonts import BUNDLED_FONT, registry
+from instrumentation import metrics
+from workbooks import BOARD_SCHEMA, EVENT_SCHEMA, PROPERTY_SCHEMA, convert_frame, read_frame
+
+
+# Ein Befund der Vorabprüfung; row ist die Datenzeile (0-basiert), None für die ganze Datei
+PreflightIssue = namedtuple("PreflightIssue", ["level", "source", "row", "column", "message"])
+
+# Spalten, die je Kartenart größer als 0 sein müssen (Bahnhöfe haben keine Häuser, Werke keine Mietstaffel)
+POSITIVE_COLUMNS = {
+    'strasse': ['Kaufpreis', 'Miete', 'Miete_1_Haus', 'Miete_2_Haus', 'Miete_3_Haus', 'Miete_4_Haus', 'Miete_Hotel',
+                'Hauspreis', 'Hypothek'],
+    'bahnhof': ['Kaufpreis', 'Miete', 'Miete_1_Haus', 'Miete_2_Haus', 'Miete_3_Haus'],
+    'werk': ['Kaufpreis', 'Hypothek'],
+}
+
+# Standarddateien je Ziel (wie in dkt.DEFAULTS)
+DEFAULT_FILES = {
+    "board": "grundstuecke.xlsx",
+    "property": "besitzkarten.xlsx",
+    "event": "ereignis_gemeinschaft.xlsx",
+}
+
+
+class PreflightReport:
+    """
+    Sammelt Fehler (Deck muss korrigiert werden) und Warnungen aller geprüften Arbeitsmappen
+    """
+
+    def __init__(self):
+        self.issues = []
+        self.rows = 0
+        self.seconds = 0.0
+
+    def error(self, source, message, row=None, column=None):
+        self.issues.append(PreflightIssue("error", source, row, column, message))
+
+    def warning(self, source, message, row=None, column=None):
+        self.issues.append(PreflightIssue("warning", source, row, column, message))
+
+    @property
+    def errors(self):
+        return [issue for issue in self.issues if issue.level == "error"]
+
+    @property
+    def warnings(self):
+        return [issue for issue in self.issues if issue.level == "warning"]
+
+    @property
+    def ok(self):
+        return not self.errors
+
+    def format(self, limit=50):
+        """
+        Bericht mit einer Zeile je Befund (Fehler zuerst, Zeilennummern wie in Excel inkl. Kopfzeile)
+        """
+        lines = [f"🔎 Vorabprüfung: {len(self.errors)} Fehler, {len(self.warnings)} Warnungen "
+                 f"({self.rows} Zeilen in {self.seconds * 1000:.0f} ms)"]
+        ordered = self.errors + self.warnings
+        for issue in ordered[:limit]:
+            location = os.path.basename(issue.source)
+            if issue.row is not None:
+                location += f" Zeile {issue.row + 2}"
+            if issue.column:
+                location += f", {issue.column}"
+            lines.append(f"   {'❌' if issue.level == 'error' else '⚠️'} {location}: {issue.message}")
+        if len(ordered) > limit:
+            lines.append(f"   … und {len(ordered) - limit} weitere")
+        return "\n".join(lines)
+
+
+def check_columns(df, schema, source, report, announce_optional=True):
+    """
+    Pflicht- und optionale Spalten, unbekannte Spalten (Tippfehler)
+
+    Mit announce_optional=False bleiben fehlende optionale Spalten ohne Warnung (z.B. die
+    strukturierten Aktionsspalten der Ereigniskarten, die nur ergänzend genutzt werden).
+
+    Returns:
+        bool: False, wenn Pflichtspalten fehlen (dann wird nicht weiter geprüft)
+    """
+    missing = schema.missing_columns(df.columns)
+    for name in missing:
+        report.error(source, f"Pflichtspalte '{name}' fehlt (vorhanden: {list(df.columns)})")
+
+    known = {column.name for column in schema.columns}
+    for column in schema.columns:
+        if announce_optional and not column.required and column.name not in df.columns:
+            report.warning(source, f"Optionale Spalte '{column.name}' fehlt, überall wird {column.default!r} "
+                                   f"angenommen")
+    for name in df.columns:
+        if name not in known and not str(name).startswith("Unnamed"):
+            report.warning(source, f"Unbekannte Spalte '{name}' wird ignoriert")
+    return not missing
+
+
+def check_numbers(df, schema, source, report, signed=()):
+    """
+    Prüft alle Zahlenspalten vektorisiert: keine Texte, keine Nachkommastellen, nicht negativ
+    (außer den Spalten in signed)
+
+    Returns:
+        dict: Spaltenname → numerische Series (ungültige Werte als NaN)
+    """
+    import numpy as np
+    import pandas as pd
+
+    numbers = {}
+    for column in schema.columns:
+        if column.kind != 'int' or column.name not in df.columns:
+            continue
+        raw = df[column.name]
+        values = pd.to_numeric(raw, errors='coerce')
+        numbers[column.name] = values
+
+        for row in np.flatnonzero((raw.notna() & values.isna()).to_numpy()):
+            report.error(source, f"'{raw.iloc[row]}' ist keine Zahl", row, column.name)
+        for row in np.flatnonzero((values.notna() & (values % 1 != 0)).to_numpy()):
+            report.warning(source, f"{values.iloc[row]} wird auf {int(values.iloc[row])} abgeschnitten", row,
+                           column.name)
+        if column.name in signed:
+            continue
+        for row in np.flatnonzero((values < 0).to_numpy()):
+            report.error(source, f"{values.iloc[row]:g} ist negativ", row, column.name)
+    return numbers
+
+
+def check_font(report):
+    if registry.resolve("arial.ttf") == BUNDLED_FONT:
+        report.warning("Schriften", "arial.ttf nicht gefunden, gemessen (und gezeichnet) wird mit der "
+                                    "Pillow-Standardschrift")
+
+
+def check_property_workbook(path, report):
+    """
+    Schema, Zahlen, Farben und Kartenarten der Grundstückskarten; danach jeden Text gegen seine Box messen
+    """
+    import numpy as np
+    from PIL import ImageColor
+
+    from besitzkarten import CARD_HEIGHT, CARD_WIDTH, get_property_template, property_card_kind
+
+    df = read_frame(path)
+    report.rows += len(df)
+    if not check_columns(df, PROPERTY_SCHEMA, path, report):
+        return
+    numbers = check_numbers(df, PROPERTY_SCHEMA, path, report)
+
+    names = df['Name'].astype(object).where(df['Name'].notna(), "").astype(str).str.strip()
+    for row in np.flatnonzero((names == "").to_numpy()):
+        report.warning(path, "Name ist leer, die Zeile wird übersprungen", row, 'Name')
+    duplicated = names.duplicated(keep='first') & (names != "")
+    for row in np.flatnonzero(duplicated.to_numpy()):
+        report.warning(path, f"'{names.iloc[row]}' kommt mehrfach vor", row, 'Name')
+
+    # Kartenart wie property_card_kind: Werk vor Bahnhof, nur der Wert 1 zählt
+    flags = {}
+    for flag in ('IstBahnhof', 'IstWerk'):
+        values = numbers.get(flag)
+        if values is None:
+            flags[flag] = np.zeros(len(df), dtype=bool)
+            continue
+        for row in np.flatnonzero((values.notna() & ~values.isin([0, 1])).to_numpy()):
+            report.warning(path, f"{values.iloc[row]:g} ist weder 0 noch 1, gilt als 0", row, flag)
+        flags[flag] = (values == 1).to_numpy()
+    werk, bahnhof = flags['IstWerk'], flags['IstBahnhof']
+    for row in np.flatnonzero(werk & bahnhof):
+        report.warning(path, "Werk und Bahnhof zugleich, die Karte wird als Werk gezeichnet", row, 'IstWerk')
+
+    kinds = np.where(werk, 'werk', np.where(bahnhof, 'bahnhof', 'strasse'))
+    active = (names != "").to_numpy()
+    for kind, columns in POSITIVE_COLUMNS.items():
+        rows_of_kind = active & (kinds == kind)
+        for column in columns:
+            values = numbers[column]
+            for row in np.flatnonzero(rows_of_kind & values.isna().to_numpy() & df[column].isna().to_numpy()):
+                report.error(path, f"fehlt ({kind})", row, column)
+            # Negative Werte wurden bereits in check_numbers gemeldet
+            for row in np.flatnonzero(rows_of_kind & (values == 0).to_numpy()):
+                report.error(path, f"muss größer als 0 sein ({kind})", row, column)
+
+    colors = df['Farbe'].astype(object).where(df['Farbe'].notna(), None)
+    for color in colors.dropna().unique():
+        try:
+            ImageColor.getrgb(str(color))
+        except ValueError:
+            for row in np.flatnonzero((colors == color).to_numpy()):
+                report.error(path, f"'{color}' ist keine gültige Farbe (#RRGGBB oder Farbname)", row, 'Farbe')
+
+    # Texte messen: ungültige Zahlen wurden schon gemeldet und gelten hier als Standardwert
+    cleaned = df.assign(**{name: values.where(values.notna(), None) for name, values in numbers.items()})
+    with metrics.span("preflight.measure", file=os.path.basename(path)):
+        for index, record in convert_frame(cleaned, PROPERTY_SCHEMA, source=path).rows():
+            property_data = record._asdict()
+            if not property_data['name']:
+                continue
+            template = get_property_template(property_card_kind(property_data), CARD_WIDTH, CARD_HEIGHT)
+            for column, message in template.overflows(property_data):
+                report.error(path, message, index, column)
+
+
+def check_event_workbook(path, report):
+    """
+    Schema der Ereigniskarten, Maß jedes Textes im inneren Rahmen und Verständlichkeit jeder Aktion
+    """
+    from card_actions import compile_actions
+    from ereignis_gemeinschaft import CARD_HEIGHT, CARD_WIDTH, event_text_blocks
+
+    df = read_frame(path)
+    report.rows += len(df)
+    if not check_columns(df, EVENT_SCHEMA, path, report, announce_optional=False):
+        return
+    # Betrag ist bei 'felder' negativ, wenn es zurück geht
+    numbers = check_numbers(df, EVENT_SCHEMA, path, report, signed=('Betrag',))
+    cleaned = df.assign(**{name: values.where(values.notna(), None) for name, values in numbers.items()})
+    workbook = convert_frame(cleaned, EVENT_SCHEMA, source=path)
+
+    for index, message in compile_actions(workbook).problems:
+        report.warning(path, f"{message}, die Karte gilt als ohne Wirkung", index, 'Aktion')
+
+    empty = 0
+    with metrics.span("preflight.measure", file=os.path.basename(path)):
+        for index, record in workbook.rows():
+            text, action = record.text, record.action
+            if not text and not action:
+                empty += 1
+                continue
+            if not event_text_blocks(text, action, CARD_WIDTH, CARD_HEIGHT)[4]:
+                report.error(path, "Text und Aktion passen auch in 24 px nicht in den Rahmen", index, 'Text')
+    if empty:
+        report.warning(path, f"{empty} leere Zeilen werden übersprungen")
+
+
+def check_board_workbook(path, report, template_path="dkt_template.png", layout=DEFAULT_LAYOUT, font_size=32):
+    """
+    Schema und Preise des Bretts, Zeilenzahl gegen das Layout und jeder Name gegen seine Feldbreite
+    """
+    import numpy as np
+    from PIL import Image
+
+    from script import build_price_string, fit_board_name
+    from textlayout import measure_text
+    from fonts import get_font
+
+    df = read_frame(path)
+    report.rows += len(df)
+    if not check_columns(df, BOARD_SCHEMA, path, report):
+        return
+    numbers = check_numbers(df, BOARD_SCHEMA, path, report)
+
+    try:
+        # Nur der Dateikopf wird gelesen, die Vorlage wird nicht dekodiert
+        with Image.open(template_path) as template:
+            width, height = template.size
+        slots = compile_layout(layout, width, height)
+    except (OSError, ValueError) as e:
+        report.error(template_path, f"Vorlage oder Layout nicht lesbar: {e}")
+        return
+
+    missing = sorted(slot.index for slot in slots if slot.index >= len(df))
+    if missing:
+        report.error(path, f"Das Layout braucht {max(missing) + 1} Zeilen, die Datei hat {len(df)} "
+                           f"(fehlende Felder: {missing})")
+
+    prices = numbers['Preis']
+    used = np.zeros(len(df), dtype=bool)
+    used[[slot.index for slot in slots if slot.index < len(df)]] = True
+    for row in np.flatnonzero(used & (prices.isna() | (prices <= 0)).to_numpy()):
+        report.error(path, f"Preis muss größer als 0 sein, ist {df['Preis'].iloc[row]}", row, 'Preis')
+
+    cleaned = df.assign(Preis=prices.where(prices.notna(), None))
+    workbook = convert_frame(cleaned, BOARD_SCHEMA, source=path)
+    font_price = get_font(font_size - 6)
+    with metrics.span("preflight.measure", file=os.path.basename(path)):
+        for slot in slots:
+            if slot.index >= len(workbook):
+                continue
+            name = workbook['Name'][slot.index]
+            if not name:
+                report.warning(path, "Name ist leer, das Feld bleibt unbeschriftet", slot.index, 'Name')
+                continue
+            if not slot.length:
+                continue
+            block = fit_board_name(name, font_size, slot.length)
+            if not block.fits:
+                report.warning(path, f"'{name}' ist auch in {block.font.size} px {block.width:.0f} px breit, das Feld "
+                                     f"hat {slot.length} px und die Beschriftung ragt in die Nachbarfelder",
+                               slot.index, 'Name')
+            price = build_price_string(workbook['Preis'][slot.index])
+            price_width = measure_text(price, font_price)
+            if price_width > slot.length:
+                report.warning(path, f"Preis '{price}' ist {price_width:.0f} px breit, das Feld hat {slot.length} px",
+                               slot.index, 'Preis')
+
+
+def run_preflight(targets=("board", "property", "event"), files=None, template_path="dkt_template.png",
+                  layout=DEFAULT_LAYOUT, font_size=32):
+    """
+    Prüft alle angegebenen Arbeitsmappen, bevor irgendetwas gezeichnet wird
+
+    Args:
+        targets (iterable): 'board', 'property' und/oder 'event'
+        files (dict): Abweichende Dateien je Ziel (Standard: DEFAULT_FILES)
+
+    Returns:
+        PreflightReport
+    """
+    files = {**DEFAULT_FILES, **(files or {})}
+    checks = {
+        "board": lambda path, report: check_board_workbook(path, report, template_path, layout, font_size),
+        "property": check_property_workbook,
+        "event": check_event_workbook,
+    }
+
+    report = PreflightReport()
+    start = time.perf_counter()
+    with metrics.span("preflight"):
+        check_font(report)
+        for target in targets:
+            path = files[target]
+            try:
+                checks[target](path, report)
+            except FileNotFoundError:
+                report.error(path, "Datei nicht gefunden")
+            except (OSError, ValueError) as e:
+                report.error(path, f"Datei nicht lesbar: {e}")
+    report.seconds = time.perf_counter() - start
+    return report
+
+
+# Hauptfunktion
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prüft alle Arbeitsmappen vor dem Rendern "
+                                                 "(Schema, Zahlen, Textmaße)")
+    parser.add_argument("targets", nargs="*", default=list(DEFAULT_FILES), help="board, property und/oder event")
+    parser.add_argument("--board", default=DEFAULT_FILES["board"], help="Grundstücke des Bretts")
+    parser.add_argument("--property", default=DEFAULT_FILES["property"], help="Grundstückskarten")
+    parser.add_argument("--event", default=DEFAULT_FILES["event"], help="Ereigniskarten")
+    parser.add_argument("--template", default="dkt_template.png", help="Brettvorlage")
+    parser.add_argument("--layout", default=DEFAULT_LAYOUT, help="Layout-Datei des Bretts")
+    parser.add_argument("--limit", type=int, default=50, help="Höchstens so viele Befunde ausgeben")
+    args = parser.parse_args()
+
+    unknown = [target for target in args.targets if target not in DEFAULT_FILES]
+    if unknown:
+        parser.error(f"Unbekannte Ziele: {unknown}")
+
+    preflight_report = run_preflight(args.targets, {"board": args.board, "property": args.property,
+                                                    "event": args.event}, args.template, args.layout)
+    print(preflight_report.format(args.limit))
+    sys.exit(0 if preflight_report.ok else 1)
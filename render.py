@@ -0,0 +1,151 @@
+from besitzkarten import CARD_HEIGHT as PROPERTY_CARD_HEIGHT, CARD_WIDTH as PROPERTY_CARD_WIDTH, \
+    create_property_card, create_property_card_vector
+from board_layout import DEFAULT_LAYOUT
+from encoder import DEFAULT_PROFILE, encode_image, output_extension
+from ereignis_gemeinschaft import CARD_HEIGHT as EVENT_CARD_HEIGHT, CARD_WIDTH as EVENT_CARD_WIDTH, \
+    create_dkt_card, create_dkt_card_vector
+from vector import VECTOR_FORMATS
+from workbooks import BOARD_SCHEMA, EVENT_SCHEMA, PROPERTY_SCHEMA, as_workbook
+
+
+# MIME-Typen je Dateiendung
+CONTENT_TYPES = {
+    "png": "image/png",
+    "webp": "image/webp",
+    "svg": "image/svg+xml",
+    "pdf": "application/pdf",
+}
+
+
+def find_row(workbook, key, name_column=None):
+    """
+    Sucht eine Zeile über die Kartennummer (1-basiert wie in den Dateinamen) oder den Namen
+
+    Namen werden ohne Groß-/Kleinschreibung verglichen, '_' steht für ein Leerzeichen.
+
+    Returns:
+        tuple: (Zeilennummer 0-basiert, Datensatz)
+
+    Raises:
+        KeyError: Wenn keine Zeile passt
+    """
+    text = str(key).strip()
+    if text.isdigit():
+        number = int(text)
+        for index, record in workbook.rows():
+            if index + 1 == number:
+                return index, record
+        raise KeyError(f"Keine Karte Nummer {number} (1-{len(workbook)})")
+
+    if name_column is None:
+        raise KeyError(f"Karten dieser Art haben keinen Namen, bitte die Nummer angeben: {key}")
+
+    wanted = text.replace("_", " ").casefold()
+    for index, record in workbook.rows():
+        if str(getattr(record, name_column)).casefold() == wanted:
+            return index, record
+    raise KeyError(f"Keine Karte mit dem Namen '{key}'")
+
+
+def property_card_image(property_data, card_width=PROPERTY_CARD_WIDTH, card_height=PROPERTY_CARD_HEIGHT):
+    """
+    Grundstückskarte einer Zeile als PIL-Bild (Datensatz oder dict)
+    """
+    return create_property_card(_as_dict(property_data), card_width, card_height)
+
+
+def property_card_bytes(property_data, output_format="raster", profile=DEFAULT_PROFILE,
+                        card_width=PROPERTY_CARD_WIDTH, card_height=PROPERTY_CARD_HEIGHT):
+    """
+    Grundstückskarte einer Zeile als kodierte Datei im Speicher
+
+    Returns:
+        tuple: (Bytes, MIME-Typ)
+    """
+    # Format vor dem Zeichnen prüfen, ungültige Anfragen kosten so keine Karte
+    mime = content_type(output_format, profile)
+    property_data = _as_dict(property_data)
+    if output_format in VECTOR_FORMATS:
+        canvas = create_property_card_vector(property_data, card_width, card_height, output_format)
+        return canvas.tobytes(), mime
+    return encode_image(property_card_image(property_data, card_width, card_height), profile)[0], mime
+
+
+def event_card_image(text, action, card_width=EVENT_CARD_WIDTH, card_height=EVENT_CARD_HEIGHT):
+    """
+    Ereigniskarte als PIL-Bild
+    """
+    return create_dkt_card(text, action, card_width, card_height)
+
+
+def event_card_bytes(text, action, output_format="raster", profile=DEFAULT_PROFILE, card_width=EVENT_CARD_WIDTH,
+                     card_height=EVENT_CARD_HEIGHT):
+    """
+    Ereigniskarte als kodierte Datei im Speicher
+
+    Returns:
+        tuple: (Bytes, MIME-Typ)
+    """
+    mime = content_type(output_format, profile)
+    if output_format in VECTOR_FORMATS:
+        canvas = create_dkt_card_vector(text, action, card_width, card_height, output_format)
+        return canvas.tobytes(), mime
+    return encode_image(event_card_image(text, action, card_width, card_height), profile)[0], mime
+
+
+def board_image(workbook, template_path="dkt_template.png", layout=DEFAULT_LAYOUT, font_size=32, labeler=None):
+    """
+    Beschriftetes Brett als PIL-Bild, ohne es zu speichern
+
+    Args:
+        workbook: LoadedWorkbook (oder DataFrame) mit dem Inhalt von grundstuecke.xlsx
+        labeler: Optional ein vorhandener FixedPricePositionLabeler (Vorlage bereits dekodiert,
+            nur geänderte Felder werden neu gesetzt; das Bild gehört dann dem Labeler)
+    """
+    if labeler is None:
+        from script import FixedPricePositionLabeler
+
+        labeler = FixedPricePositionLabeler(template_path, df=as_workbook(workbook, BOARD_SCHEMA), layout=layout)
+    return labeler.render(font_size)
+
+
+def board_bytes(workbook, profile=DEFAULT_PROFILE, template_path="dkt_template.png", layout=DEFAULT_LAYOUT,
+                font_size=32, labeler=None):
+    """
+    Beschriftetes Brett als kodierte Datei im Speicher
+
+    Returns:
+        tuple: (Bytes, MIME-Typ)
+    """
+    return _encode(board_image(workbook, template_path, layout, font_size, labeler), "raster", profile)
+
+
+def content_type(output_format="raster", profile=DEFAULT_PROFILE):
+    """
+    MIME-Typ einer Ausgabe
+    """
+    return CONTENT_TYPES[output_extension(output_format, profile)]
+
+
+def property_row(workbook, key):
+    """
+    Datensatz einer Grundstückskarte über Nummer oder Namen
+    """
+    return find_row(as_workbook(workbook, PROPERTY_SCHEMA), key, "name")[1]
+
+
+def event_row(workbook, key):
+    """
+    (Text, Aktion) einer Ereigniskarte über die Nummer
+    """
+    record = find_row(as_workbook(workbook, EVENT_SCHEMA), key)[1]
+    return record.text, record.action
+
+
+def _encode(img, output_format, profile):
+    data, _ = encode_image(img, profile)
+    return data, content_type(output_format, profile)
+
+
+def _as_dict(property_data):
+    return property_data._asdict() if hasattr(property_data, "_asdict") else dict(property_data)
@@ -1,8 +1,27 @@
-import cv2
-import numpy as np
-import pandas as pd
-from PIL import Image, ImageDraw, ImageFont
-import matplotlib.pyplot as plt
+import time
+
+_IMPORT_START = time.perf_counter()
+
+import argparse
+import copy
+import os
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+from board_layout import DEFAULT_LAYOUT, compile_layout
+from encoder import DEFAULT_PROFILE, PROFILES, format_bytes, get_profile, save_image
+from fonts import get_font, font_stats
+from instrumentation import StageTimer, add_instrumentation_arguments, instrumented, metrics, process_uptime, progress
+from labels import rasterizer
+from parallel import resolve_jobs, run_jobs
+from textlayout import fit_text
+from workbooks import BOARD_SCHEMA, load_editions, load_workbook
+
+# pandas (über workbooks) und matplotlib werden erst in den Codepfaden geladen, die sie brauchen
+IMPORT_SECONDS = time.perf_counter() - _IMPORT_START
 
 
 def build_price_string(number):
@@ -10,186 +29,391 @@ def build_price_string(number):
 
 
 class FixedPricePositionLabeler:
-    def __init__(self, template_path):
+    def __init__(self, template_path, labels=None, df=None, excel_file='grundstuecke.xlsx', layout=DEFAULT_LAYOUT):
+        """
+        Args:
+            template_path (str): Pfad zur Brettvorlage
+            labels: Optional ein eigener LabelRasterizer (Standard: gemeinsamer Cache)
+            df: Optional bereits geladene Grundstücke (LoadedWorkbook oder DataFrame, sonst aus excel_file)
+            excel_file (str): Excel-Datei mit Name und Preis der Felder
+            layout (str): Layout-Datei mit Feldindex, Seite, Lage und Drehung (siehe board_layout.py)
+        """
         self.template_path = template_path
-        self.image = cv2.imread(template_path)
-        self.image_rgb = cv2.cvtColor(self.image, cv2.COLOR_BGR2RGB)
-        self.height, self.width = self.image.shape[:2]
-        
-        y_oben_x_links = 0.045
-        x_rechts_y_unten = 0.955
-
-        template_str = "{template}"
-
-        df = pd.read_excel('grundstuecke.xlsx')
-
-        # Korrekte Reihenfolge
-        self.all_properties = [
-            # OBERE Reihe (braun/blau) - von links nach rechts
-            {"name": df.Name[0], "price": build_price_string(df.Preis[0]), "x": 0.174, "y": y_oben_x_links, "rotation": 180},
-            {"name": df.Name[1], "price": build_price_string(df.Preis[1]), "x": 0.34, "y": y_oben_x_links, "rotation": 180},
-            {"name": df.Name[28], "price": build_price_string(df.Preis[28]), "x": 0.421, "y": y_oben_x_links, "rotation": 180},
-            {"name": df.Name[22], "price": build_price_string(df.Preis[22]), "x": 0.502, "y": y_oben_x_links, "rotation": 180},
-            {"name": df.Name[2], "price": build_price_string(df.Preis[2]), "x": 0.585, "y": y_oben_x_links, "rotation": 180},
-            {"name": df.Name[3], "price": build_price_string(df.Preis[3]), "x": 0.747, "y": y_oben_x_links, "rotation": 180},
-            {"name": df.Name[4], "price": build_price_string(df.Preis[4]), "x": 0.826, "y": y_oben_x_links, "rotation": 180},
-
-            # RECHTE Seite - Seestraße oben → Berliner Straße unten
-            {"name": df.Name[5], "price": build_price_string(df.Preis[5]), "x": x_rechts_y_unten, "y": 0.175, "rotation": 90},
-            {"name": df.Name[26], "price": build_price_string(df.Preis[26]), "x": x_rechts_y_unten, "y": 0.259, "rotation": 90},
-            {"name": df.Name[6], "price": build_price_string(df.Preis[6]), "x": x_rechts_y_unten, "y": 0.34, "rotation": 90},
-            {"name": df.Name[7], "price": build_price_string(df.Preis[7]), "x": x_rechts_y_unten, "y": 0.422, "rotation": 90},
-            {"name": df.Name[23], "price": build_price_string(df.Preis[23]), "x": x_rechts_y_unten, "y": 0.505, "rotation": 90},
-            {"name": df.Name[8], "price": build_price_string(df.Preis[8]), "x": x_rechts_y_unten, "y": 0.586, "rotation": 90},
-            {"name": df.Name[9], "price": build_price_string(df.Preis[9]), "x": x_rechts_y_unten, "y": 0.75, "rotation": 90},
-            {"name": df.Name[10], "price": build_price_string(df.Preis[10]), "x": x_rechts_y_unten, "y": 0.83, "rotation": 90},
-
-            # UNTERE Reihe (gelb/rot) - von links nach rechts
-            {"name": df.Name[16], "price": build_price_string(df.Preis[16]), "x": 0.172, "y": x_rechts_y_unten, "rotation": 0},
-            {"name": df.Name[27], "price": build_price_string(df.Preis[27]), "x": 0.25, "y": x_rechts_y_unten, "rotation": 0},
-            {"name": df.Name[15], "price": build_price_string(df.Preis[15]), "x": 0.333, "y": x_rechts_y_unten, "rotation": 0},
-            {"name": df.Name[14], "price": build_price_string(df.Preis[14]), "x": 0.414, "y": x_rechts_y_unten, "rotation": 0},
-            {"name": df.Name[24], "price": build_price_string(df.Preis[24]), "x": 0.495, "y": x_rechts_y_unten, "rotation": 0},
-            {"name": df.Name[13], "price": build_price_string(df.Preis[13]), "x": 0.578, "y": x_rechts_y_unten, "rotation": 0},
-            {"name": df.Name[12], "price": build_price_string(df.Preis[12]), "x": 0.66, "y": x_rechts_y_unten, "rotation": 0},
-            {"name": df.Name[11], "price": build_price_string(df.Preis[11]), "x": 0.823, "y": x_rechts_y_unten, "rotation": 0},
-
-            # LINKE Seite - Schlossallee oben → Rathausplatz unten
-            {"name": df.Name[21], "price": build_price_string(df.Preis[21]), "x": y_oben_x_links, "y": 0.173, "rotation": 270},
-            {"name": df.Name[29], "price": build_price_string(df.Preis[29]), "x": y_oben_x_links, "y": 0.253, "rotation": 270},
-            {"name": df.Name[20], "price": build_price_string(df.Preis[20]), "x": y_oben_x_links, "y": 0.334, "rotation": 270},
-            {"name": df.Name[25], "price": build_price_string(df.Preis[25]), "x": y_oben_x_links, "y": 0.498, "rotation": 270},
-            {"name": df.Name[19], "price": build_price_string(df.Preis[19]), "x": y_oben_x_links, "y": 0.58, "rotation": 270},
-            {"name": df.Name[18], "price": build_price_string(df.Preis[18]), "x": y_oben_x_links, "y": 0.661, "rotation": 270},
-            {"name": df.Name[17], "price": build_price_string(df.Preis[17]), "x": y_oben_x_links, "y": 0.826, "rotation": 270},
-        ]
+        self.encoded = None
+        self.labels = labels if labels is not None else rasterizer
+        self.timer = StageTimer("board")
+
+        # Vorlage einmal dekodieren (Alphakanal wird wie bisher ignoriert)
+        with self.timer.stage("decode"):
+            with Image.open(template_path) as template:
+                self.image = template.convert('RGB')
+        self.width, self.height = self.image.size
+
+        if df is None:
+            with self.timer.stage("excel"):
+                df = load_workbook(excel_file, BOARD_SCHEMA)
+
+        # Feldpositionen aus der Layout-Datei, einmal pro Vorlagenauflösung in Pixel umgerechnet
+        with self.timer.stage("layout"):
+            self.slots = compile_layout(layout, self.width, self.height)
+
+        self.all_properties = self._collect_properties(df)
+
+        # Beschriftetes Brett und gesetzte Felder (Position → (Schlüssel, Platzierung, Box)) für
+        # inkrementelles Neuzeichnen; dirty_rects hält die zuletzt neu komponierten Bereiche
+        self.board = None
+        self._fields = {}
+        self.dirty_rects = []
+
+    def _collect_properties(self, df):
+        names = df['Name']
+        prices = df['Preis']
+
+        properties = []
+        for slot in self.slots:
+            if slot.index >= len(names):
+                raise ValueError(f"Layout verweist auf Feld {slot.index}, "
+                                 f"die Grundstücksliste hat aber nur {len(names)} Einträge")
+            properties.append({
+                "index": slot.index,
+                "name": names[slot.index],
+                "price": build_price_string(prices[slot.index]),
+                "x": slot.x,
+                "y": slot.y,
+                "rotation": slot.rotation,
+                "length": slot.length,
+            })
+        return properties
+
+    def update(self, df):
+        """
+        Übernimmt neue Namen und Preise (LoadedWorkbook oder DataFrame)
+
+        Das nächste render() setzt nur die Felder neu, deren Name oder Preis sich geändert hat.
+
+        Returns:
+            list: Indizes der geänderten Felder
+        """
+        properties = self._collect_properties(df)
+        changed = [new["index"] for old, new in zip(self.all_properties, properties)
+                   if (old["name"], old["price"]) != (new["name"], new["price"])]
+        self.all_properties = properties
+        return changed
+
+    def edition(self, df):
+        """
+        Labeler für eine weitere Ausgabe des Bretts (andere Namen/Preise, gleiche Vorlage)
+
+        Dekodierte Vorlage, Feldpositionen und Beschriftungs-Cache werden geteilt, nur das
+        beschriftete Brett ist eigen.
+        """
+        clone = copy.copy(self)
+        clone.all_properties = self._collect_properties(df)
+        clone.board = None
+        clone._fields = {}
+        clone.dirty_rects = []
+        clone.encoded = None
+        clone.timer = StageTimer("board")
+        return clone
 
     def create_text_with_rotation(self, text, font, color, rotation=0):
-        """Erstellt Text mit Rotation"""
-        temp_size = 400
-        temp_img = Image.new('RGBA', (temp_size, temp_size), (255, 255, 255, 0))
-        temp_draw = ImageDraw.Draw(temp_img)
-
-        temp_draw.text((temp_size // 2, temp_size // 2), text, fill=color, font=font, anchor="mm")
-        bbox = temp_draw.textbbox((temp_size // 2, temp_size // 2), text, font=font, anchor="mm")
-
-        padding = 5
-        text_img = temp_img.crop((bbox[0] - padding, bbox[1] - padding, bbox[2] + padding, bbox[3] + padding))
-
-        if rotation != 0:
-            text_img = text_img.rotate(rotation, expand=True)
-
-        return text_img
+        """Erstellt Text mit Rotation (gecacht, siehe labels.LabelRasterizer)"""
+        return self.labels.render(text, font, color, rotation)
 
     def get_text_color(self, name):
         """Bestimmt Textfarbe"""
         return (0, 0, 0)
 
-    def label_board_fixed_prices(self, output_path, font_size=22):
-        """Beschriftet das Brett mit korrekten Preispositionen"""
-        pil_image = Image.fromarray(self.image_rgb).convert('RGBA')
-
-        # Font laden
-        try:
-            font_name = ImageFont.truetype("arial.ttf", font_size)
-            font_price = ImageFont.truetype("arial.ttf", font_size - 6)
-        except:
-            try:
-                font_name = ImageFont.truetype("/System/Library/Fonts/arial.ttf", font_size)
-                font_price = ImageFont.truetype("/System/Library/Fonts/arial.ttf", font_size - 6)
-            except:
-                font_name = ImageFont.load_default()
-                font_price = ImageFont.load_default()
-
-        overlay = Image.new('RGBA', pil_image.size, (255, 255, 255, 0))
-
-        for prop in self.all_properties:
-            name = prop["name"]
-            price = prop["price"]
-            x_rel = prop["x"]
-            y_rel = prop["y"]
-            rotation = prop["rotation"]
-
-            x = int(x_rel * self.width)
-            y = int(y_rel * self.height)
-
-            name_color = self.get_text_color(name)
-            price_color = (0,0,0)
-
-            name_img = self.create_text_with_rotation(name, font_name, name_color, rotation)
-            price_img = self.create_text_with_rotation(price, font_price, price_color, rotation)
-
-            # Korrekte Preisposition je nach Rotation
-            if rotation == 0:  # UNTEN - Preis unterhalb
-                name_x = x - name_img.width // 2
-                name_y = y - name_img.height // 2 - 8
-                price_x = x - price_img.width // 2
-                price_y = name_y + name_img.height + 3
-
-            elif rotation == 180:  # OBEN - Preis oberhalb (wegen Rotation)
-                name_x = x - name_img.width // 2
-                name_y = y - 8
-                price_x = x - price_img.width // 2
-                price_y = name_y - name_img.height - 3
-
-            elif rotation == 90:  # LINKS - Preis rechts vom Namen
-                name_x = x + 5
-                name_y = y - name_img.height // 2
-                price_x = name_x + name_img.width + 5
-                price_y = y - price_img.height // 2
-
-            elif rotation == 270:  # RECHTS - Preis links vom Namen
-                name_x = x - name_img.width - 5
-                name_y = y - name_img.height // 2
-                price_x = name_x - price_img.width - 5
-                price_y = y - price_img.height // 2
-
-            padding = 2
+    def label_board_fixed_prices(self, output_path, font_size=22, profile=DEFAULT_PROFILE):
+        """
+        Beschriftet das Brett mit korrekten Preispositionen
+
+        Die dekodierte Vorlage wird nur einmal kopiert, die Beschriftung direkt hineinkomponiert
+        und das Ergebnis einmal im gewählten Profil kodiert (Pfad, Größe und Kodierzeit stehen
+        danach in self.encoded, die Endung richtet sich nach dem Profil).
+
+        Returns:
+            PIL.Image: Das beschriftete Brett (RGB)
+        """
+        final_image = self.render(font_size)
+
+        with self.timer.stage("encode"):
+            output_dir = os.path.dirname(output_path)
+            if output_dir and not os.path.exists(output_dir):
+                os.makedirs(output_dir)
+            self.encoded = save_image(final_image, output_path, profile)
+
+        return final_image
+
+    def render(self, font_size=22):
+        """
+        Beschriftet das Brett im Speicher, ohne etwas zu schreiben
+
+        Beim ersten Aufruf wird die Vorlage einmal kopiert, danach werden nur Felder neu
+        komponiert, deren Name, Preis oder Schriftgröße sich geändert hat (siehe update()).
+        Die betroffenen Rechtecke stehen anschließend in self.dirty_rects.
+
+        Returns:
+            PIL.Image: Das beschriftete Brett (RGB, wird weiterverwendet - nicht verändern)
+        """
+        with self.timer.stage("fonts"):
+            font_name = get_font(font_size)
+            font_price = get_font(font_size - 6)
+
+        with self.timer.stage("labels"):
+            changed = {}
+            for position, prop in enumerate(self.all_properties):
+                key = (prop["name"], prop["price"], font_size)
+                field = self._fields.get(position)
+                if field is None or field[0] != key:
+                    placement = self._place_label(prop, font_name, font_price)
+                    changed[position] = (key, placement, placement_box(placement))
+
+        with self.timer.stage("composite"):
+            self._composite(changed)
+
+        return self.board
+
+    def _composite(self, changed):
+        """
+        Komponiert die geänderten Felder direkt in ihre Bereiche auf dem Brett
+
+        Überlappende Felder werden zu Gruppen zusammengefasst und gemeinsam gesetzt, damit das
+        Ergebnis dem Überblenden einer vollflächigen Ebene entspricht. Gruppen, die ein
+        geändertes Feld enthalten oder dessen alte Box berühren, werden aus der Vorlage
+        wiederhergestellt und neu gesetzt, alle übrigen Pixel bleiben unberührt.
+        """
+        if self.board is None:
+            self.board = self.image.copy()
+            old_boxes = []
+        else:
+            old_boxes = [self._fields[position][2] for position in changed if position in self._fields]
+        self._fields.update(changed)
+
+        groups = overlap_groups([self._fields[position][2] for position in range(len(self._fields))])
+        dirty_groups = [group for group in groups
+                        if any(position in changed for position in group)
+                        or any(boxes_overlap(self._fields[position][2], box)
+                               for position in group for box in old_boxes)]
+
+        restore = old_boxes + [self._fields[position][2] for group in dirty_groups for position in group]
+        clipped = (clip_box(box, self.width, self.height) for box in restore)
+        self.dirty_rects = list(dict.fromkeys(box for box in clipped if box))
+        for box in self.dirty_rects:
+            self.board.paste(self.image.crop(box), box[:2])
+
+        for group in dirty_groups:
+            self._composite_group([self._fields[position][1] for position in group])
+        metrics.count("board.fields_composited", sum(len(group) for group in dirty_groups))
+
+    def _composite_group(self, placements):
+        """Setzt die Beschriftungen einer Feldgruppe über eine Ebene in Größe ihrer Box"""
+        left, top, right, bottom = union_box([placement_box(placement) for placement in placements])
+        tile = Image.new('RGBA', (right - left, bottom - top), (255, 255, 255, 0))
+
+        for name_img, (name_x, name_y), price_img, (price_x, price_y) in placements:
+            padding = LABEL_PADDING
 
             # Name mit Hintergrund
             name_bg = Image.new('RGBA',
                                 (name_img.width + 2 * padding, name_img.height + 2 * padding),
                                 (255, 255, 255, 230))
-            overlay.paste(name_bg, (name_x - padding, name_y - padding))
-            overlay.paste(name_img, (name_x, name_y), name_img)
+            tile.paste(name_bg, (name_x - padding - left, name_y - padding - top))
+            tile.paste(name_img, (name_x - left, name_y - top), name_img)
 
             # Preis mit Hintergrund
             price_bg = Image.new('RGBA',
                                  (price_img.width + 2 * padding, price_img.height + 2 * padding),
                                  (255, 255, 255, 210))
-            overlay.paste(price_bg, (price_x - padding, price_y - padding))
-            overlay.paste(price_img, (price_x, price_y), price_img)
+            tile.paste(price_bg, (price_x - padding - left, price_y - padding - top))
+            tile.paste(price_img, (price_x - left, price_y - top), price_img)
+
+        self.board.paste(tile, (left, top), tile)
+
+    def fit_name_font(self, name, font_name, max_length):
+        """
+        Verkleinert die Schrift eines Namens, bis er in die Feldbreite passt (höchstens auf 60 %)
+        """
+        if not max_length:
+            return font_name
+        return fit_board_name(name, font_name.size, max_length).font
+
+    def _place_label(self, prop, font_name, font_price):
+        """
+        Rastert Name und Preis eines Feldes und bestimmt ihre Lage auf dem Brett
+
+        Returns:
+            tuple: (Namensbild, (x, y), Preisbild, (x, y))
+        """
+        x = prop["x"]
+        y = prop["y"]
+        rotation = prop["rotation"]
+
+        name_color = self.get_text_color(prop["name"])
+        price_color = (0,0,0)
+
+        name_img = self.create_text_with_rotation(prop["name"],
+                                                  self.fit_name_font(prop["name"], font_name, prop["length"]),
+                                                  name_color, rotation)
+        price_img = self.create_text_with_rotation(prop["price"], font_price, price_color, rotation)
+
+        # Korrekte Preisposition je nach Rotation
+        if rotation == 0:  # UNTEN - Preis unterhalb
+            name_x = x - name_img.width // 2
+            name_y = y - name_img.height // 2 - 8
+            price_x = x - price_img.width // 2
+            price_y = name_y + name_img.height + 3
+
+        elif rotation == 180:  # OBEN - Preis oberhalb (wegen Rotation)
+            name_x = x - name_img.width // 2
+            name_y = y - 8
+            price_x = x - price_img.width // 2
+            price_y = name_y - name_img.height - 3
+
+        elif rotation == 90:  # LINKS - Preis rechts vom Namen
+            name_x = x + 5
+            name_y = y - name_img.height // 2
+            price_x = name_x + name_img.width + 5
+            price_y = y - price_img.height // 2
+
+        elif rotation == 270:  # RECHTS - Preis links vom Namen
+            name_x = x - name_img.width - 5
+            name_y = y - name_img.height // 2
+            price_x = name_x - price_img.width - 5
+            price_y = y - price_img.height // 2
+
+        return name_img, (name_x, name_y), price_img, (price_x, price_y)
+
+
+def fit_board_name(name, font_size, max_length):
+    """
+    Setzt einen Feldnamen einzeilig in die Feldbreite (Schrift höchstens auf 60 % verkleinert)
+
+    Returns:
+        TextBlock - fits ist False, wenn der Name auch verkleinert noch übersteht
+    """
+    return fit_text(name, max_length, max_size=font_size, min_size=max(8, font_size * 3 // 5), max_lines=1)
+
+
+# Rand des halbtransparenten Hintergrunds um Name und Preis
+LABEL_PADDING = 2
+
+
+def placement_box(placement):
+    """
+    Box (links, oben, rechts, unten) von Name und Preis samt Hintergrund
+    """
+    name_img, (name_x, name_y), price_img, (price_x, price_y) = placement
+    padding = LABEL_PADDING
+    return union_box([
+        (name_x - padding, name_y - padding, name_x + name_img.width + padding, name_y + name_img.height + padding),
+        (price_x - padding, price_y - padding, price_x + price_img.width + padding,
+         price_y + price_img.height + padding),
+    ])
+
+
+def union_box(boxes):
+    return (min(box[0] for box in boxes), min(box[1] for box in boxes),
+            max(box[2] for box in boxes), max(box[3] for box in boxes))
+
+
+def boxes_overlap(a, b):
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+
+def clip_box(box, width, height):
+    """
+    Beschneidet eine Box auf das Bild (None, falls sie ganz außerhalb liegt)
+    """
+    left, top, right, bottom = max(0, box[0]), max(0, box[1]), min(width, box[2]), min(height, box[3])
+    if left >= right or top >= bottom:
+        return None
+    return left, top, right, bottom
+
+
+def overlap_groups(boxes):
+    """
+    Fasst sich überlappende Boxen zu Gruppen zusammen (transitiv)
+
+    Returns:
+        list: Gruppen als aufsteigende Listen von Positionen
+    """
+    parents = list(range(len(boxes)))
 
-        final_image = Image.alpha_composite(pil_image, overlay)
-        final_rgb = final_image.convert('RGB')
+    def root(position):
+        while parents[position] != position:
+            parents[position] = parents[parents[position]]
+            position = parents[position]
+        return position
 
-        final_array = np.array(final_rgb)
-        cv2.imwrite(output_path, cv2.cvtColor(final_array, cv2.COLOR_RGB2BGR))
+    for first in range(len(boxes)):
+        for second in range(first + 1, len(boxes)):
+            if boxes_overlap(boxes[first], boxes[second]):
+                parents[root(second)] = root(first)
 
-        return final_array
+    groups = {}
+    for position in range(len(boxes)):
+        groups.setdefault(root(position), []).append(position)
+    return list(groups.values())
 
 
-def create_fixed_price_position_board(template_path, output_path="output/dkt_beschriftet.png", font_size=24):
+def has_display():
+    """
+    Prüft, ob eine Vorschau angezeigt werden kann (unter Linux nur mit X11/Wayland)
+    """
+    if sys.platform.startswith("linux"):
+        return bool(os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY"))
+    return True
+
+
+def show_preview(labeled_image):
+    """
+    Zeigt das beschriftete Brett in einem matplotlib-Fenster an
+    """
+    import matplotlib.pyplot as plt
+
+    plt.figure(figsize=(16, 16))
+    plt.imshow(labeled_image)
+    plt.title("DKT-Brett - Korrekte Preispositionen", fontsize=18)
+    plt.axis('off')
+    plt.tight_layout()
+    plt.show()
+
+
+def create_fixed_price_position_board(template_path, output_path="output/dkt_beschriftet.png", font_size=24,
+                                      preview=True, excel_file="grundstuecke.xlsx", layout=DEFAULT_LAYOUT,
+                                      profile=DEFAULT_PROFILE):
     """
     Erstellt DKT-Brett mit korrekten Preispositionen
+
+    Args:
+        template_path (str): Pfad zur Brettvorlage
+        output_path (str): Zielpfad des beschrifteten Bretts
+        font_size (int): Schriftgröße der Namen (Preise 6 px kleiner)
+        preview (bool): Vorschau mit matplotlib anzeigen (False = headless, matplotlib wird nie geladen)
+        excel_file (str): Excel-Datei mit Name und Preis der Felder
+        layout (str): Layout-Datei des Bretts (z. B. für eigene Stadt-Editionen)
+        profile (str): Kodierprofil ('print', 'web', 'webp', 'thumb')
     """
     try:
-        labeler = FixedPricePositionLabeler(template_path)
-        labeled_image = labeler.label_board_fixed_prices(output_path, font_size)
-
-        plt.figure(figsize=(16, 16))
-        plt.imshow(labeled_image)
-        plt.title("DKT-Brett - Korrekte Preispositionen", fontsize=18)
-        plt.axis('off')
-        plt.tight_layout()
-        plt.show()
-
-        print(f"✅ DKT-Brett mit korrekten Preispositionen gespeichert als: {output_path}")
-        print("🔧 Preispositionen:")
-        print("   • UNTEN: Preis unterhalb des Namens ✓")
-        print("   • OBEN: Preis oberhalb des Namens (wegen 180° Rotation)")
-        print("   • LINKS: Preis rechts vom Namen")
-        print("   • RECHTS: Preis links vom Namen")
+        labeler = FixedPricePositionLabeler(template_path, excel_file=excel_file, layout=layout)
+        labeled_image = labeler.label_board_fixed_prices(output_path, font_size, profile)
+
+        if preview:
+            show_preview(labeled_image)
+
+        progress(f"✅ DKT-Brett mit korrekten Preispositionen gespeichert als: {labeler.encoded}")
+        stats = font_stats()
+        progress(f"🔤 Schriften-Cache: {stats['hits']} Treffer, {stats['misses']} geladen")
+        stats = labeler.labels.stats()
+        progress(f"🏷️ Beschriftungs-Cache: {stats['hits']} Treffer, {stats['misses']} gerastert")
+        progress("🔧 Preispositionen:")
+        progress("   • UNTEN: Preis unterhalb des Namens ✓")
+        progress("   • OBEN: Preis oberhalb des Namens (wegen 180° Rotation)")
+        progress("   • LINKS: Preis rechts vom Namen")
+        progress("   • RECHTS: Preis links vom Namen")
+        progress("⏱️ Laufzeit und Speicher je Schritt:")
+        progress(labeler.timer.report())
 
         return labeled_image
 
@@ -198,7 +422,139 @@ def create_fixed_price_position_board(template_path, output_path="output/dkt_bes
         return None
 
 
+def render_edition(labeler, output_path, font_size, profile):
+    """
+    Beschriftet und speichert eine Ausgabe (läuft in einem Thread von label_board_editions)
+
+    Returns:
+        EncodedFile
+    """
+    with metrics.span("edition", output=os.path.basename(output_path)):
+        labeler.label_board_fixed_prices(output_path, font_size, profile)
+    # Brett freigeben, sobald es geschrieben ist, damit nur laufende Ausgaben Speicher belegen
+    labeler.board = None
+    return labeler.encoded
+
+
+def edition_filename(name, extension="png"):
+    """
+    Dateiname einer Ausgabe (Sonderzeichen werden ersetzt)
+    """
+    return f"dkt_beschriftet_{re.sub(r'[^0-9A-Za-zÄÖÜäöüß._-]+', '_', name).strip('_') or 'ausgabe'}.{extension}"
+
+
+def label_board_editions(template_path, editions, output_folder="output/editions", font_size=32,
+                         layout=DEFAULT_LAYOUT, profile=DEFAULT_PROFILE, jobs=0):
+    """
+    Beschriftet mehrere Ausgaben des Bretts aus einer einmal dekodierten Vorlage
+
+    Alle Ausgaben teilen Vorlage, Feldpositionen und den Beschriftungs-Cache (gleiche Namen
+    und Preise werden nur einmal gerastert). Kopieren, Komponieren und Kodieren laufen in
+    Threads, da Pillow dabei den GIL freigibt; so bleibt die Vorlage nur einmal im Speicher.
+
+    Args:
+        template_path (str): Pfad zur Brettvorlage
+        editions (list): (Name, LoadedWorkbook/DataFrame) je Ausgabe, siehe workbooks.load_editions
+        output_folder (str): Zielordner, je Ausgabe eine Datei (siehe edition_filename)
+        font_size (int): Schriftgröße der Namen (Preise 6 px kleiner)
+        layout (str): Layout-Datei des Bretts
+        profile (str): Kodierprofil ('print', 'web', 'webp', 'thumb')
+        jobs (int): Anzahl paralleler Threads (0 = alle Kerne)
+
+    Returns:
+        tuple: (Liste von EncodedFile oder None je Ausgabe, Liste von (Name, Fehlermeldung))
+    """
+    if not editions:
+        return [], []
+
+    extension = get_profile(profile).extension
+    base = FixedPricePositionLabeler(template_path, df=editions[0][1], layout=layout)
+    os.makedirs(output_folder, exist_ok=True)
+
+    # Ausgaben mit ungültigen Daten (z. B. zu wenige Zeilen) schlagen einzeln fehl
+    tasks, positions, errors = [], [], []
+    for position, (name, df) in enumerate(editions):
+        try:
+            labeler = base if position == 0 else base.edition(df)
+        except ValueError as e:
+            errors.append((name, str(e)))
+            continue
+        tasks.append((labeler, os.path.join(output_folder, edition_filename(name, extension)), font_size, profile))
+        positions.append(position)
+
+    results = [None] * len(editions)
+    if tasks:
+        with ThreadPoolExecutor(max_workers=min(resolve_jobs(jobs), len(tasks))) as executor:
+            encoded_files, task_errors = run_jobs(render_edition, tasks, executor=executor)
+        for position, encoded in zip(positions, encoded_files):
+            results[position] = encoded
+        errors += [(editions[positions[index]][0], message) for index, message in task_errors]
+
+    return results, errors
+
+
+def create_board_editions(template_path, edition_files, output_folder="output/editions", font_size=32,
+                          layout=DEFAULT_LAYOUT, profile=DEFAULT_PROFILE, jobs=0):
+    """
+    Lädt alle Ausgaben (Dateien bzw. Tabellenblätter) und beschriftet sie in einem Lauf
+
+    Returns:
+        bool: True, wenn alle Ausgaben geschrieben wurden
+    """
+    try:
+        editions = load_editions(edition_files, BOARD_SCHEMA)
+    except (OSError, ValueError) as e:
+        print(f"❌ Fehler beim Lesen der Ausgaben: {e}")
+        return False
+    progress(f"📚 {len(editions)} Ausgaben geladen: {', '.join(name for name, _ in editions)}")
+
+    start = time.perf_counter()
+    results, errors = label_board_editions(template_path, editions, output_folder, font_size, layout, profile, jobs)
+
+    written = [encoded for encoded in results if encoded]
+    for encoded in written:
+        progress(f"✅ {encoded}")
+    for name, message in errors:
+        print(f"❌ Ausgabe '{name}' fehlgeschlagen: {message}")
+
+    progress(f"📦 {len(written)} Ausgaben in {time.perf_counter() - start:.2f} s, "
+             f"{format_bytes(sum(encoded.bytes for encoded in written))} geschrieben")
+    stats = rasterizer.stats()
+    progress(f"🏷️ Beschriftungs-Cache: {stats['hits']} Treffer, {stats['misses']} gerastert")
+    return not errors
+
+
 # Hauptausführung
 if __name__ == "__main__":
-    template_path = "dkt_template.png"
-    result = create_fixed_price_position_board(template_path, "output/dkt_beschriftet.png", 32)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Beschriftet das DKT-Brett mit Namen und Preisen")
+    parser.add_argument("--headless", action="store_true",
+                        help="Ohne Vorschau und ohne matplotlib (für Build-Server)")
+    parser.add_argument("--template", default="dkt_template.png", help="Brettvorlage")
+    parser.add_argument("--excel", default="grundstuecke.xlsx", help="Grundstücke mit Name und Preis")
+    parser.add_argument("--layout", default=DEFAULT_LAYOUT, help="Layout-Datei des Bretts")
+    parser.add_argument("--output", "-o", default="output/dkt_beschriftet.png", help="Zielbild")
+    parser.add_argument("--editions", nargs="+", metavar="DATEI",
+                        help="Mehrere Ausgaben in einem Lauf: je Datei bzw. Tabellenblatt ein Brett "
+                             "(Spalten wie grundstuecke.xlsx)")
+    parser.add_argument("--output-folder", default="output/editions", help="Zielordner der Ausgaben (mit --editions)")
+    parser.add_argument("--jobs", "-j", type=int, default=0,
+                        help="Parallel gerenderte Ausgaben (mit --editions, 0 = alle Kerne)")
+    parser.add_argument("--profile", choices=tuple(PROFILES), default=DEFAULT_PROFILE,
+                        help="Kodierprofil: print (verlustfrei), web (Palette), webp, thumb (Vorschau)")
+    add_instrumentation_arguments(parser)
+    args = parser.parse_args()
+
+    with instrumented(args):
+        # Kaltstart messen: Prozessstart bis hier und Dauer der Modul-Importe
+        uptime = process_uptime()
+        if uptime is not None:
+            progress(f"🚀 Kaltstart: {uptime * 1000:.0f} ms bis main (davon Importe {IMPORT_SECONDS * 1000:.0f} ms)")
+
+        if args.editions:
+            ok = create_board_editions(args.template, args.editions, args.output_folder, 32, layout=args.layout,
+                                       profile=args.profile, jobs=args.jobs)
+            sys.exit(0 if ok else 1)
+
+        result = create_fixed_price_position_board(args.template, args.output, 32,
+                                                   preview=not args.headless and has_display(),
+                                                   excel_file=args.excel, layout=args.layout, profile=args.profile)
\ No newline at end of file
@@ -0,0 +1,438 @@
+import argparse
+import csv
+import math
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from balance import RENT_COLUMNS, WERK_FACTORS, board_track
+from board_layout import DEFAULT_LAYOUT
+from card_actions import GET_OUT_OF_JAIL, JAIL, MOVE_BY, MOVE_TO, PAY_TO_EACH, RECEIVE_FROM_EACH, SKIP_TURNS, \
+    load_action_table
+from instrumentation import metrics, progress
+from parallel import run_jobs
+from workbooks import BOARD_SCHEMA, PROPERTY_SCHEMA, load_workbook
+
+
+# Spielregeln (Startfeld des DKT-Bretts: 200 €)
+STARTING_CASH = 1500
+START_BONUS = 200
+JAIL_FINE = 50
+
+# Feldarten auf dem Spielweg
+FREE, STREET, STATION, WERK, FEE, CARD, GO_TO_JAIL = range(7)
+
+# Alle Spielfeld-Daten als Arrays je Feldnummer (picklebar für den Prozess-Pool)
+GameBoard = namedtuple("GameBoard", [
+    "names",          # Feldname je Feld
+    "kinds",          # Feldart (STREET, STATION, ...)
+    "prices",         # Kaufpreis
+    "house_prices",   # Hauspreis (nur Straßen)
+    "rents",          # (Felder × 6) Mieten je Ausbaustufe bzw. Anzahl Bahnhöfe
+    "groups",         # Farbgruppe je Straße, sonst -1
+    "group_sizes",    # Anzahl Straßen je Farbgruppe
+    "fees",           # Betrag der Zahlfelder
+    "jail",           # Feldnummer des Häfn
+    "card_kinds",     # Aktionsart je Ereigniskarte (card_actions)
+    "card_to",        # Ziel je Ereigniskarte (-1 keines, Anzahl Felder = Häfn)
+    "card_by",        # Schritte je Ereigniskarte
+    "card_cash",      # Geldbetrag des ziehenden Spielers je Ereigniskarte
+    "card_each",      # Betrag je Mitspieler (positiv: von jedem, negativ: an jeden)
+    "card_skip",      # Runden aussetzen
+])
+
+
+def game_board(board_workbook, property_workbook, actions, layout=DEFAULT_LAYOUT):
+    """
+    Baut das Spielfeld aus Brett, Grundstückskarten (Zuordnung der Zeilen wie in balance.rent_yield)
+    und der Aktionstabelle der Ereigniskarten
+
+    Returns:
+        GameBoard
+    """
+    track = board_track(board_workbook, layout)
+    size = track.size
+    kinds = np.full(size, FREE, dtype=np.int8)
+    kinds[track.card_fields] = CARD
+    kinds[track.go_to_jail] = GO_TO_JAIL
+
+    prices = np.zeros(size, dtype=np.int64)
+    house_prices = np.zeros(size, dtype=np.int64)
+    rents = np.zeros((size, len(RENT_COLUMNS)), dtype=np.int64)
+    fees = np.zeros(size, dtype=np.int64)
+    colors = [""] * size
+
+    for position in np.flatnonzero(track.rows >= 0):
+        row = track.rows[position]
+        if row >= len(property_workbook):
+            kinds[position] = FEE
+            fees[position] = board_workbook['Preis'][row]
+            continue
+        if property_workbook['IstWerk'][row] == 1:
+            kinds[position] = WERK
+        elif property_workbook['IstBahnhof'][row] == 1:
+            kinds[position] = STATION
+        else:
+            kinds[position] = STREET
+            colors[position] = property_workbook['Farbe'][row].casefold()
+        prices[position] = property_workbook['Kaufpreis'][row]
+        house_prices[position] = property_workbook['Hauspreis'][row]
+        rents[position] = [property_workbook[column][row] for column in RENT_COLUMNS]
+
+    palette = sorted({color for color in colors if color})
+    groups = np.array([palette.index(color) if color else -1 for color in colors])
+    group_sizes = np.bincount(groups[groups >= 0], minlength=len(palette))
+
+    targets, unresolved = actions.resolve_targets(track.names)
+    for row, target in unresolved:
+        print(f"⚠️ Zeile {row + 2}: Kartenziel '{target}' nicht auf dem Brett, Karte gilt als ohne Bewegung")
+    card_to = np.where(actions.kinds == JAIL, size, np.where(actions.kinds == MOVE_TO, targets, -1))
+    card_by = np.where(actions.kinds == MOVE_BY, actions.steps, 0)
+    card_each = np.select([actions.kinds == RECEIVE_FROM_EACH, actions.kinds == PAY_TO_EACH],
+                          [actions.amounts, -actions.amounts], 0)
+    card_skip = np.where(actions.kinds == SKIP_TURNS, actions.steps, 0)
+
+    return GameBoard(track.names, kinds, prices, house_prices, rents, groups, group_sizes, fees, track.jail,
+                     actions.kinds, card_to, card_by, actions.cash_deltas(), card_each, card_skip)
+
+
+class SimulationResult:
+    """
+    Statistik über viele Spiele: Länge und Ausgang je Spiel, Summen je Feld
+    """
+
+    def __init__(self, turns, finished, winners, bankruptcies, first_bankruptcy, rent, invested, bought, landings,
+                 bankrupt_on, players):
+        self.turns = turns
+        self.finished = finished
+        self.winners = winners
+        self.bankruptcies = bankruptcies
+        self.first_bankruptcy = first_bankruptcy
+        self.rent = rent
+        self.invested = invested
+        self.bought = bought
+        self.landings = landings
+        self.bankrupt_on = bankrupt_on
+        self.players = players
+
+    @property
+    def games(self):
+        return len(self.turns)
+
+    @classmethod
+    def merge(cls, results):
+        """
+        Fasst die Ergebnisse mehrerer Teilläufe zusammen
+        """
+        return cls(*(np.concatenate([getattr(result, name) for result in results])
+                     for name in ("turns", "finished", "winners", "bankruptcies", "first_bankruptcy")),
+                   *(sum(getattr(result, name) for result in results)
+                     for name in ("rent", "invested", "bought", "landings", "bankrupt_on")),
+                   results[0].players)
+
+    def roi(self):
+        """
+        Mieteinnahmen je investiertem Euro (Kaufpreis und Häuser), NaN für nie gekaufte Felder
+        """
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(self.invested > 0, self.rent / self.invested, np.nan)
+
+    def write_csv(self, path, board):
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f, delimiter=";")
+            writer.writerow(["Feld", "Name", "Treffer je Spiel", "Käufe je Spiel", "Miete je Spiel",
+                             "Investiert je Spiel", "ROI", "Pleiten"])
+            roi = self.roi()
+            for position in np.flatnonzero(np.isin(board.kinds, (STREET, STATION, WERK))):
+                writer.writerow([int(position), board.names[position], f"{self.landings[position] / self.games:.3f}",
+                                 f"{self.bought[position] / self.games:.3f}",
+                                 f"{self.rent[position] / self.games:.2f}",
+                                 f"{self.invested[position] / self.games:.2f}",
+                                 "" if np.isnan(roi[position]) else f"{roi[position]:.3f}",
+                                 int(self.bankrupt_on[position])])
+
+
+def simulate_batch(board, games, players=4, seed=0, max_turns=1000, starting_cash=STARTING_CASH, reserve=0,
+                   jail_turns=3):
+    """
+    Spielt games Spiele im Gleichschritt: pro Schritt würfelt in jedem laufenden Spiel der Spieler am Zug
+
+    Der Spielstand liegt in Arrays (Spiele × Spieler bzw. Spiele × Felder). Strategie aller Spieler:
+    kaufen, wenn danach noch reserve € übrig sind, und pro Wurf ein Haus auf die am wenigsten
+    bebaute Straße einer vollständigen Farbgruppe setzen. Wer nicht zahlen kann, ist pleite; seine
+    Grundstücke gehen an die Bank zurück. Eine Freikarte wird sofort eingesetzt, wenn der Spieler
+    in den Häfn müsste; Mitspieler zahlen an den Ziehenden höchstens ihr Guthaben.
+
+    Returns:
+        SimulationResult
+    """
+    rng = np.random.default_rng([seed, games, players])
+    size = len(board.kinds)
+    cards = len(board.card_cash)
+    streets = board.kinds == STREET
+    stations = np.flatnonzero(board.kinds == STATION)
+    werke = np.flatnonzero(board.kinds == WERK)
+    purchasable = np.isin(board.kinds, (STREET, STATION, WERK))
+    group_matrix = np.zeros((size, len(board.group_sizes)), dtype=np.int64)
+    group_matrix[streets, board.groups[streets]] = 1
+    werk_factors = np.array((0,) + WERK_FACTORS)
+
+    position = np.zeros((games, players), dtype=np.int64)
+    cash = np.full((games, players), starting_cash, dtype=np.int64)
+    alive = np.ones((games, players), dtype=bool)
+    # 0 = frei, k = im Häfn beim k-ten Versuch
+    jailed = np.zeros((games, players), dtype=np.int64)
+    free_cards = np.zeros((games, players), dtype=np.int64)
+    skipping = np.zeros((games, players), dtype=np.int64)
+    owner = np.full((games, size), -1, dtype=np.int64)
+    houses = np.zeros((games, size), dtype=np.int64)
+    current = np.zeros(games, dtype=np.int64)
+    doubles = np.zeros(games, dtype=np.int64)
+    turns = np.zeros(games, dtype=np.int64)
+    running = np.ones(games, dtype=bool)
+
+    winners = np.full(games, -1, dtype=np.int64)
+    bankruptcies = np.zeros(games, dtype=np.int64)
+    first_bankruptcy = np.full(games, -1, dtype=np.int64)
+    rent_income = np.zeros(size)
+    invested = np.zeros(size)
+    bought = np.zeros(size)
+    landings = np.zeros(size)
+    bankrupt_on = np.zeros(size)
+
+    with metrics.span("simulate.batch", games=games):
+        while running.any():
+            active = np.flatnonzero(running)
+            player = current[active]
+            count = len(active)
+            rows = np.arange(count)
+
+            first, second = rng.integers(1, 7, count), rng.integers(1, 7, count)
+            roll, double = first + second, first == second
+            where = position[active, player]
+            money = cash[active, player]
+
+            # Aussetzen: der Zug verfällt
+            skip = skipping[active, player]
+            skips = skip > 0
+            skipping[active, player] = np.maximum(skip - 1, 0)
+
+            # Häfn: Pasch befreit, nach jail_turns Fehlversuchen wird gezahlt und gezogen
+            attempt = jailed[active, player]
+            in_jail = (attempt > 0) & ~skips
+            stays = in_jail & ~double & (attempt < jail_turns)
+            money -= np.where(in_jail & ~double & ~stays, JAIL_FINE, 0)
+            jailed[active, player] = np.where(in_jail, np.where(stays, attempt + 1, 0), attempt)
+
+            third_double = ~skips & ~in_jail & double & (doubles[active] == 2)
+            moves = ~skips & ~stays & ~third_double
+
+            target = where + roll
+            money += np.where(moves & (target >= size), START_BONUS, 0)
+            where = np.where(moves, target % size, where)
+
+            sent = third_double.copy()
+            if cards:
+                card = rng.integers(0, cards, count)
+                drawn = moves & (board.kinds[where] == CARD)
+                money += np.where(drawn, board.card_cash[card], 0)
+
+                # Von jedem / an jeden Mitspieler
+                each = np.where(drawn, board.card_each[card], 0)
+                others = alive[active].copy()
+                others[rows, player] = False
+                received = np.minimum(np.maximum(each, 0)[:, None], np.maximum(cash[active], 0)) * others
+                paid_out = np.maximum(-each, 0)[:, None] * others
+                cash[active] += paid_out - received
+                money += received.sum(axis=1) - paid_out.sum(axis=1)
+
+                free_cards[active, player] += drawn & (board.card_kinds[card] == GET_OUT_OF_JAIL)
+                skipping[active, player] += np.where(drawn, board.card_skip[card], 0)
+                card_to, card_by = board.card_to[card], board.card_by[card]
+                sent |= drawn & (card_to == size)
+                jump = drawn & (card_to >= 0) & (card_to < size)
+                money += np.where(jump & (card_to < where), START_BONUS, 0)
+                stepped = where + np.where(drawn & ~jump, card_by, 0)
+                money += np.where(stepped >= size, START_BONUS, 0)
+                where = np.where(jump, card_to, stepped % size)
+            sent |= moves & (board.kinds[where] == GO_TO_JAIL)
+            where = np.where(sent, board.jail, where)
+            freed = sent & (free_cards[active, player] > 0)
+            free_cards[active[freed], player[freed]] -= 1
+            jailed[active[sent & ~freed], player[sent & ~freed]] = 1
+            landed = moves & ~sent
+            np.add.at(landings, where[landed], 1)
+
+            money -= np.where(landed & (board.kinds[where] == FEE), board.fees[where], 0)
+
+            # Grundstück: kaufen oder Miete zahlen
+            holder = owner[active, where]
+            on_property = landed & purchasable[where]
+            buys = on_property & (holder < 0) & (money - board.prices[where] >= reserve)
+            owner[active[buys], where[buys]] = player[buys]
+            money -= np.where(buys, board.prices[where], 0)
+            np.add.at(invested, where[buys], board.prices[where[buys]])
+            np.add.at(bought, where[buys], 1)
+
+            pays = on_property & (holder >= 0) & (holder != player)
+            owned = owner[active]
+            station_count = (owned[:, stations] == holder[:, None]).sum(axis=1)
+            werk_count = (owned[:, werke] == holder[:, None]).sum(axis=1)
+            kind = board.kinds[where]
+            rent = np.select(
+                [kind == STREET, kind == STATION, kind == WERK],
+                [board.rents[where, houses[active, where]],
+                 board.rents[where, np.maximum(station_count - 1, 0)],
+                 werk_factors[np.minimum(werk_count, len(WERK_FACTORS))] * roll],
+                0)
+            rent = np.where(pays, rent, 0)
+            paid = np.minimum(rent, np.maximum(money, 0))
+            money -= rent
+            np.add.at(cash, (active[pays], holder[pays]), paid[pays])
+            np.add.at(rent_income, where[pays], paid[pays])
+
+            # Bauen: ein Haus auf die am wenigsten bebaute Straße einer vollständigen Farbgruppe
+            mine = (owned == player[:, None]) & streets
+            complete = (mine @ group_matrix == board.group_sizes)[:, np.maximum(board.groups, 0)]
+            level = houses[active]
+            affordable = money[:, None] - board.house_prices >= reserve
+            can_build = mine & complete & (level < 5) & affordable & moves[:, None]
+            choice = np.argmin(np.where(can_build, level, 99), axis=1)
+            builds = can_build[rows, choice]
+            houses[active[builds], choice[builds]] += 1
+            money -= np.where(builds, board.house_prices[choice], 0)
+            np.add.at(invested, choice[builds], board.house_prices[choice[builds]])
+
+            position[active, player] = where
+            cash[active, player] = money
+
+            # Pleite: Grundstücke gehen an die Bank zurück
+            broke = money < 0
+            if broke.any():
+                games_broke, players_broke = active[broke], player[broke]
+                alive[games_broke, players_broke] = False
+                released = owner[games_broke] == players_broke[:, None]
+                owner[games_broke] = np.where(released, -1, owner[games_broke])
+                houses[games_broke] = np.where(released, 0, houses[games_broke])
+                np.add.at(bankrupt_on, where[broke], 1)
+                bankruptcies[games_broke] += 1
+                first_bankruptcy[games_broke] = np.where(first_bankruptcy[games_broke] < 0, turns[games_broke],
+                                                         first_bankruptcy[games_broke])
+
+            # Pasch (außer beim Verlassen des Häfn): derselbe Spieler würfelt noch einmal
+            again = double & moves & ~sent & ~in_jail & ~broke
+            doubles[active] = np.where(again, doubles[active] + 1, 0)
+            passing = active[~again]
+            turns[passing] += 1
+            following = current[passing]
+            for offset in range(players - 1, 0, -1):
+                candidate = (current[passing] + offset) % players
+                following = np.where(alive[passing, candidate], candidate, following)
+            current[passing] = following
+
+            remaining = alive[active].sum(axis=1)
+            over = (remaining <= 1) | (turns[active] >= max_turns)
+            winners[active[over & (remaining == 1)]] = np.argmax(alive[active[over & (remaining == 1)]], axis=1)
+            running[active[over]] = False
+
+    metrics.count("simulation.games", games)
+    return SimulationResult(turns, winners >= 0, winners, bankruptcies, first_bankruptcy, rent_income, invested,
+                            bought, landings, bankrupt_on, players)
+
+
+def simulate(board, games=10000, players=4, jobs=1, batch_size=5000, seed=0, **rules):
+    """
+    Verteilt die Spiele in Blöcken zu batch_size auf jobs Prozesse (0 = alle Kerne)
+
+    Die Blöcke und ihre Startwerte hängen nur von games und batch_size ab, sodass derselbe
+    seed mit jeder Anzahl Prozesse dasselbe Ergebnis liefert.
+
+    Weitere Regeln (max_turns, starting_cash, reserve, jail_turns) gehen an simulate_batch.
+
+    Returns:
+        SimulationResult
+    """
+    if games < 1:
+        raise ValueError("games muss mindestens 1 sein")
+    if players < 2:
+        raise ValueError("players muss mindestens 2 sein")
+    shards = max(1, math.ceil(games / batch_size))
+    sizes = [games // shards + (1 if shard < games % shards else 0) for shard in range(shards)]
+    tasks = [(board, size, players, seed * 1000003 + shard, rules.get("max_turns", 1000),
+              rules.get("starting_cash", STARTING_CASH), rules.get("reserve", 0), rules.get("jail_turns", 3))
+             for shard, size in enumerate(sizes) if size]
+    results, errors = run_jobs(simulate_batch, tasks, jobs)
+    if errors:
+        raise RuntimeError(f"Simulation fehlgeschlagen: {errors[0][1]}")
+    return SimulationResult.merge(results)
+
+
+def print_report(result, board, seconds=None):
+    """
+    Spiellänge, Pleiten und ROI je Grundstück
+    """
+    if seconds:
+        print(f"\n🎲 {result.games} Spiele mit {result.players} Spielern in {seconds:.1f} s "
+              f"({result.games / seconds * 60:,.0f} Spiele/min)")
+
+    turns = result.turns[result.finished]
+    print(f"\n⏳ Spiellänge (Züge bis zum Sieger): {result.finished.mean():.1%} der Spiele entschieden")
+    if len(turns):
+        print(f"   Mittel {turns.mean():.0f}, Median {np.median(turns):.0f}, 10-90 % "
+              f"{np.percentile(turns, 10):.0f}-{np.percentile(turns, 90):.0f}")
+
+    first = result.first_bankruptcy[result.first_bankruptcy >= 0]
+    print(f"\n💸 Pleiten: {result.bankruptcies.mean():.2f} je Spiel, erste nach "
+          f"{np.median(first) if len(first) else float('nan'):.0f} Zügen (Median)")
+    if result.finished.any():
+        seats = np.bincount(result.winners[result.finished], minlength=result.players) / result.finished.sum()
+        print("   Siege je Sitzplatz: " + ", ".join(f"{seat + 1}. {share:.1%}" for seat, share in enumerate(seats)))
+    for position in np.argsort(-result.bankrupt_on)[:5]:
+        if result.bankrupt_on[position]:
+            print(f"   {board.names[position]}: {int(result.bankrupt_on[position])} Pleiten")
+
+    print("\n💰 ROI je Grundstück (Miete / investiert), Käufe und Miete je Spiel "
+          "(Rückkäufe nach Pleiten zählen mit)")
+    roi = result.roi()
+    for position in np.flatnonzero(np.isin(board.kinds, (STREET, STATION, WERK))):
+        print(f"   {position:2d} {board.names[position][:18]:<18} ROI {roi[position]:5.2f}  "
+              f"Käufe {result.bought[position] / result.games:4.2f}  "
+              f"Miete {result.rent[position] / result.games:7.1f} €")
+
+
+def load_game_board(board_file="grundstuecke.xlsx", property_file="besitzkarten.xlsx",
+                    event_file="ereignis_gemeinschaft.xlsx", layout=DEFAULT_LAYOUT):
+    return game_board(load_workbook(board_file, BOARD_SCHEMA), load_workbook(property_file, PROPERTY_SCHEMA),
+                      load_action_table(event_file), layout)
+
+
+# Hauptfunktion
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Spielt viele Partien im Gleichschritt und wertet ROI, Spiellänge "
+                                                 "und Pleiten aus")
+    parser.add_argument("--games", "-n", type=int, default=10000, help="Anzahl Spiele")
+    parser.add_argument("--players", "-p", type=int, default=4, help="Spieler je Spiel")
+    parser.add_argument("--jobs", "-j", type=int, default=1, help="Anzahl paralleler Prozesse (0 = alle Kerne)")
+    parser.add_argument("--batch-size", type=int, default=5000, help="Spiele je Block im Gleichschritt")
+    parser.add_argument("--max-turns", type=int, default=1000, help="Abbruch nach so vielen Zügen (unentschieden)")
+    parser.add_argument("--cash", type=int, default=STARTING_CASH, help="Startkapital")
+    parser.add_argument("--reserve", type=int, default=0, help="Rücklage, die beim Kaufen und Bauen bleibt")
+    parser.add_argument("--jail-turns", type=int, default=3, help="Würfe auf einen Pasch im Häfn")
+    parser.add_argument("--seed", type=int, default=0, help="Startwert des Zufallsgenerators")
+    parser.add_argument("--board", default="grundstuecke.xlsx", help="Grundstücke des Bretts")
+    parser.add_argument("--property", default="besitzkarten.xlsx", help="Grundstückskarten")
+    parser.add_argument("--event", default="ereignis_gemeinschaft.xlsx", help="Ereigniskarten")
+    parser.add_argument("--layout", default=DEFAULT_LAYOUT, help="Layout-Datei mit dem Abschnitt 'track'")
+    parser.add_argument("--csv", default=None, help="Statistik je Grundstück als CSV speichern")
+    args = parser.parse_args()
+
+    game = load_game_board(args.board, args.property, args.event, args.layout)
+    start = time.perf_counter()
+    outcome = simulate(game, args.games, args.players, args.jobs, args.batch_size, args.seed,
+                       max_turns=args.max_turns, starting_cash=args.cash, reserve=args.reserve,
+                       jail_turns=args.jail_turns)
+    print_report(outcome, game, time.perf_counter() - start)
+    if args.csv:
+        outcome.write_csv(args.csv, game)
+        progress(f"💾 Statistik gespeichert: {args.csv}")
@@ -0,0 +1,44 @@
+import pytest
+
+from card_actions import GET_OUT_OF_JAIL, JAIL, MOVE_BY, MOVE_TO, PAY, PAY_TO_EACH, RECEIVE, RECEIVE_FROM_EACH, \
+    SKIP_TURNS, CardAction, parse_action, structured_action
+from workbooks import EVENT_SCHEMA
+
+
+# Aktionstexte aus ereignis_gemeinschaft.xlsx und dem Beispiel aus create_sample_excel
+@pytest.mark.parametrize("text, expected", [
+    ("Zahle 20€", CardAction(PAY, 20, "", 0)),
+    ("Zahle 200€ Schmerzensgeld", CardAction(PAY, 200, "", 0)),
+    ("Zahle 50€ an Peter", CardAction(PAY, 50, "", 0)),
+    ("Harald verflucht dich und du musst 30€ Pucki Gutschein zahlen", CardAction(PAY, 30, "", 0)),
+    ("Zahle 1.000€ an die Bank.", CardAction(PAY, 1000, "", 0)),
+    ("Du bekommst 50€", CardAction(RECEIVE, 50, "", 0)),
+    ("Du steckst dir 30€ in die Geldbörse", CardAction(RECEIVE, 30, "", 0)),
+    ("Als Belohnung bekommst du 80€", CardAction(RECEIVE, 80, "", 0)),
+    ("Ricardo ehrt dich mit 20€", CardAction(RECEIVE, 20, "", 0)),
+    ("Erhalte von jedem Mitspieler 200€.", CardAction(RECEIVE_FROM_EACH, 200, "", 0)),
+    ("Zahle jedem Mitspieler 50€", CardAction(PAY_TO_EACH, 50, "", 0)),
+    ("Gehe sofort ins Gefängnis", CardAction(JAIL, 0, "", 0)),
+    ("Du musst sofort ins Gefängnis", CardAction(JAIL, 0, "", 0)),
+    ("Behalte dir diese Karte, sie rettet dich aus dem Gefängnis", CardAction(GET_OUT_OF_JAIL, 0, "", 0)),
+    ("Stefan schenkt dir eine Freikarte / 50€", CardAction(GET_OUT_OF_JAIL, 0, "", 0)),
+    ("Rücke vor zum KH/RK Horn", CardAction(MOVE_TO, 0, "KH/RK Horn", 0)),
+    ("Rücke vor zum Strandbad", CardAction(MOVE_TO, 0, "Strandbad", 0)),
+    ("Gehe 3 Felder zurück", CardAction(MOVE_BY, 0, "", -3)),
+    ("Rücke 2 Felder vor", CardAction(MOVE_BY, 0, "", 2)),
+    ("Du musst 2 Runden aussetzen", CardAction(SKIP_TURNS, 0, "", 2)),
+    ("Setze 1 Runde aus", CardAction(SKIP_TURNS, 0, "", 1)),
+    ("Du hast Dominanz bewiesen und bekommst beim Start doppelten Bonus", None),
+    ("Du bekommst keinen Startbonus", None),
+])
+def test_parse_action(text, expected):
+    assert parse_action(text) == expected
+
+
+def test_structured_action():
+    record = EVENT_SCHEMA.record_type("", "", "Felder", -3, "")
+    assert structured_action(record) == CardAction(MOVE_BY, 0, "", -3)
+    record = EVENT_SCHEMA.record_type("", "", "zahlen", -40, "")
+    assert structured_action(record) == CardAction(PAY, 40, "", 0)
+    with pytest.raises(ValueError):
+        structured_action(EVENT_SCHEMA.record_type("", "", "unbekannt", 0, ""))
@@ -0,0 +1,191 @@
+from collections import namedtuple
+
+from fonts import get_font
+
+
+# Ergebnis eines Textsatzes: Schrift, Zeilen, Zeilenabstand, Ausmaße und ob der Text in die Box passt
+TextBlock = namedtuple("TextBlock", ["font", "lines", "line_height", "width", "height", "fits"])
+
+
+def fit_size(fits, min_size, max_size):
+    """
+    Größte ganzzahlige Größe zwischen min_size und max_size, für die fits(size) gilt
+
+    Binäre Suche (fits muss mit wachsender Größe irgendwann kippen), es wird also nur
+    gemessen, nie probeweise gezeichnet.
+
+    Returns:
+        int oder None, falls selbst min_size nicht passt
+    """
+    if not fits(min_size):
+        return None
+    low, high = min_size, max_size
+    while low < high:
+        middle = (low + high + 1) // 2
+        if fits(middle):
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+class TextLayout:
+    """
+    Misst, bricht um und skaliert Text anhand gecachter Zeichenbreiten
+
+    Pro Schrift wird eine Tabelle der Vorschubbreiten je Zeichen aufgebaut, sodass
+    Wort- und Zeilenbreiten nur noch Summen sind. Umbrochen wird nach Pixelbreite statt
+    nach Zeichenanzahl.
+    """
+
+    def __init__(self, face="arial.ttf"):
+        self.face = face
+        self._advances = {}
+        self._line_heights = {}
+
+    def advances(self, font):
+        """
+        Vorschubbreiten der Schrift (Zeichen → Pixel), wächst bei Bedarf
+        """
+        # Die Schrift selbst wird im Wert gehalten, damit ihre id() nicht wiederverwendet wird
+        entry = self._advances.get(id(font))
+        if entry is None:
+            entry = self._advances[id(font)] = (font, {})
+        return entry[1]
+
+    def measure(self, text, font):
+        """
+        Breite eines einzeiligen Textes in Pixel
+        """
+        advances = self.advances(font)
+        width = 0
+        for char in text:
+            advance = advances.get(char)
+            if advance is None:
+                advance = advances[char] = font.getlength(char)
+            width += advance
+        return width
+
+    def line_height(self, font, spacing=0):
+        """
+        Zeilenabstand wie in den Kartengeneratoren: Höhe von 'Ag' plus Abstand
+        """
+        height = self._line_heights.get(id(font))
+        if height is None:
+            bbox = font.getbbox("Ag")
+            height = bbox[3] - bbox[1]
+            self._line_heights[id(font)] = height
+            self.advances(font)  # hält die Schrift am Leben
+        return height + spacing
+
+    def wrap(self, text, font, max_width):
+        """
+        Bricht Text wortweise nach Pixelbreite um (Zeilenumbrüche im Text bleiben erhalten)
+
+        Wörter, die allein breiter als max_width sind, werden zeichenweise getrennt.
+        """
+        lines = []
+        space = self.measure(" ", font)
+        for paragraph in str(text).split("\n"):
+            line, line_width = "", 0
+            for word in paragraph.split():
+                word_width = self.measure(word, font)
+                if line and line_width + space + word_width <= max_width:
+                    line += " " + word
+                    line_width += space + word_width
+                    continue
+                if line:
+                    lines.append(line)
+                line, line_width = word, word_width
+                while line_width > max_width and len(line) > 1:
+                    head = self._split_word(line, font, max_width)
+                    lines.append(head)
+                    line = line[len(head):]
+                    line_width = self.measure(line, font)
+            if line or not paragraph.strip():
+                lines.append(line)
+        return lines
+
+    def _split_word(self, word, font, max_width):
+        advances = self.advances(font)
+        width = 0
+        for position, char in enumerate(word):
+            width += advances.get(char) or self.measure(char, font)
+            if width > max_width:
+                return word[:max(1, position)]
+        return word
+
+    def layout(self, text, font, max_width=None, line_spacing=0):
+        """
+        Setzt Text in einer festen Schrift (ohne max_width einzeilig je Absatz)
+
+        Returns:
+            TextBlock
+        """
+        lines = self.wrap(text, font, max_width) if max_width else str(text).split("\n")
+        line_height = self.line_height(font, line_spacing)
+        width = max((self.measure(line, font) for line in lines), default=0)
+        return TextBlock(font, lines, line_height, width, len(lines) * line_height,
+                         max_width is None or width <= max_width)
+
+    def fit(self, text, max_width, max_height=None, max_size=48, min_size=12, line_spacing=0, max_lines=None):
+        """
+        Setzt Text in der größten Schriftgröße, die in die Box passt
+
+        Args:
+            text (str): Text (wird nach Pixelbreite umbrochen)
+            max_width (float): Verfügbare Breite in Pixel
+            max_height (float): Verfügbare Höhe in Pixel (None = beliebig)
+            max_size (int): Größte erlaubte Schriftgröße
+            min_size (int): Kleinste erlaubte Schriftgröße
+            line_spacing (int): Zusätzlicher Zeilenabstand
+            max_lines (int): Höchstzahl Zeilen (1 = nie umbrechen)
+
+        Returns:
+            TextBlock - passt der Text nicht einmal in min_size, wird min_size mit fits=False geliefert
+        """
+        def block_for(size):
+            font = get_font(size, self.face)
+            if max_lines == 1:
+                return self.layout(text, font, None, line_spacing)
+            return self.layout(text, font, max_width, line_spacing)
+
+        def fits(size):
+            block = block_for(size)
+            return (block.width <= max_width
+                    and (max_height is None or block.height <= max_height)
+                    and (max_lines is None or len(block.lines) <= max_lines))
+
+        size = fit_size(fits, min_size, max_size)
+        if size is None:
+            return block_for(min_size)._replace(fits=False)
+        return block_for(size)._replace(fits=True)
+
+    def clear(self):
+        self._advances.clear()
+        self._line_heights.clear()
+
+
+# Gemeinsame Breitentabellen für alle Generatoren eines Prozesses
+text_layout = TextLayout()
+
+
+def measure_text(text, font):
+    """
+    Kurzform für text_layout.measure(text, font)
+    """
+    return text_layout.measure(text, font)
+
+
+def wrap_text(text, font, max_width):
+    """
+    Kurzform für text_layout.wrap(text, font, max_width)
+    """
+    return text_layout.wrap(text, font, max_width)
+
+
+def fit_text(text, max_width, max_height=None, max_size=48, min_size=12, line_spacing=0, max_lines=None):
+    """
+    Kurzform für text_layout.fit(...)
+    """
+    return text_layout.fit(text, max_width, max_height, max_size, min_size, line_spacing, max_lines)
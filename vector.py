@@ -0,0 +1,252 @@
+import zlib
+from abc import ABC, abstractmethod
+from xml.sax.saxutils import escape
+
+from PIL import ImageColor
+
+
+# Auflösung, in der alle Kartenlayouts berechnet sind (1 Layout-Pixel = 1/300 Zoll)
+LAYOUT_DPI = 300
+
+# Unterstützte Vektorformate und ihre Dateiendungen
+VECTOR_FORMATS = ("svg", "pdf")
+
+# Schriftfamilie für SVG (Arial, sonst metrisch gleiche Ersatzschriften)
+SVG_FONT_FAMILY = "Arial, Helvetica, 'Liberation Sans', sans-serif"
+
+# Faktor für Viertelkreise als Bézierkurve
+BEZIER_CIRCLE = 0.5523
+
+# Zeichenbreiten von Helvetica (AFM, 1/1000 em) für WinAnsiEncoding, Codes 32-126 und 128-255
+HELVETICA_ASCII_WIDTHS = (
+    278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+    1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+    333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+    556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584,
+)
+HELVETICA_HIGH_WIDTHS = (
+    556, 556, 222, 556, 333, 1000, 556, 556, 333, 1000, 667, 333, 1000, 556, 611, 556,
+    556, 222, 222, 333, 333, 350, 556, 1000, 333, 1000, 500, 333, 944, 556, 500, 667,
+    278, 333, 556, 556, 556, 556, 260, 556, 333, 737, 370, 556, 584, 333, 737, 333,
+    400, 584, 333, 333, 333, 556, 537, 278, 333, 333, 365, 556, 834, 834, 834, 611,
+    667, 667, 667, 667, 667, 667, 1000, 722, 667, 667, 667, 667, 278, 278, 278, 278,
+    722, 722, 778, 778, 778, 778, 778, 584, 778, 722, 722, 722, 722, 667, 667, 611,
+    556, 556, 556, 556, 556, 556, 889, 500, 556, 556, 556, 556, 278, 278, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 584, 611, 556, 556, 556, 556, 500, 556, 500,
+)
+HELVETICA_WIDTHS = (0,) * 32 + HELVETICA_ASCII_WIDTHS + (0,) + HELVETICA_HIGH_WIDTHS
+
+
+def helvetica_length(text, size):
+    """
+    Breite eines Textes in Helvetica wie im PDF gesetzt (cp1252, fremde Zeichen als '?')
+    """
+    return sum(HELVETICA_WIDTHS[code] for code in text.encode("cp1252", errors="replace")) * size / 1000
+
+
+def rgb(color):
+    """
+    Wandelt Farbnamen und Hex-Codes in ein (r, g, b)-Tupel um
+    """
+    if isinstance(color, (tuple, list)):
+        return tuple(color[:3])
+    return ImageColor.getrgb(color)[:3]
+
+
+class VectorCanvas(ABC):
+    """
+    Gemeinsame Zeichenbefehle der Vektor-Ausgabe in Layout-Pixeln (wie ImageDraw)
+
+    Rahmen werden wie bei Pillow nach innen gezeichnet, Text wird über die Oberkante
+    (Anker 'la' von Pillow) positioniert und per align an x ausgerichtet.
+    """
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+
+    @abstractmethod
+    def rounded_rectangle(self, box, radius, fill=None, outline=None, width=1):
+        """Rechteck mit abgerundeten Ecken (radius 0 = eckig), Kontur nach innen"""
+
+    def rectangle(self, box, fill=None):
+        self.rounded_rectangle(box, 0, fill=fill)
+
+    @abstractmethod
+    def line(self, points, fill='black', width=1):
+        """Linie von (x0, y0) nach (x1, y1)"""
+
+    @abstractmethod
+    def text(self, xy, text, font, fill='black', align='left'):
+        """Einzeiliger Text, Oberkante bei y, an x links, mittig oder rechts ausgerichtet"""
+
+    @abstractmethod
+    def tobytes(self):
+        """Fertige Datei als Bytes"""
+
+    def save(self, filepath):
+        with open(filepath, 'wb') as f:
+            f.write(self.tobytes())
+        return filepath
+
+    @staticmethod
+    def _inset(box, outline, width):
+        # Pillow zeichnet die Kontur innerhalb der Box, Vektorstriche liegen mittig auf dem Pfad
+        x0, y0, x1, y1 = box
+        inset = width / 2 if outline is not None else 0
+        return x0 + inset, y0 + inset, x1 - inset, y1 - inset
+
+
+class SvgCanvas(VectorCanvas):
+    """
+    Schreibt eine Karte als SVG (Größe in Millimetern, Koordinaten in Layout-Pixeln)
+    """
+
+    def __init__(self, width, height):
+        super().__init__(width, height)
+        self._elements = []
+
+    def rounded_rectangle(self, box, radius, fill=None, outline=None, width=1):
+        x0, y0, x1, y1 = self._inset(box, outline, width)
+        attributes = f'x="{x0:g}" y="{y0:g}" width="{x1 - x0:g}" height="{y1 - y0:g}"'
+        if radius:
+            attributes += f' rx="{radius:g}"'
+        self._elements.append(f'<rect {attributes} {self._paint(fill, outline, width)}/>')
+
+    def line(self, points, fill='black', width=1):
+        x0, y0, x1, y1 = points
+        self._elements.append(f'<line x1="{x0:g}" y1="{y0:g}" x2="{x1:g}" y2="{y1:g}" '
+                              f'stroke="{self._color(fill)}" stroke-width="{width:g}"/>')
+
+    def text(self, xy, text, font, fill='black', align='left'):
+        x, y = xy
+        ascent = font.getmetrics()[0]
+        anchor = {'left': 'start', 'center': 'middle', 'right': 'end'}[align]
+        self._elements.append(f'<text x="{x:g}" y="{y + ascent:g}" font-size="{font.size}" '
+                              f'text-anchor="{anchor}" fill="{self._color(fill)}">{escape(text)}</text>')
+
+    def tobytes(self):
+        width_mm = self.width * 25.4 / LAYOUT_DPI
+        height_mm = self.height * 25.4 / LAYOUT_DPI
+        header = (f'<svg xmlns="http://www.w3.org/2000/svg" width="{width_mm:.2f}mm" height="{height_mm:.2f}mm" '
+                  f'viewBox="0 0 {self.width} {self.height}" font-family="{SVG_FONT_FAMILY}">')
+        return "\n".join([header, *self._elements, "</svg>\n"]).encode("utf-8")
+
+    def _paint(self, fill, outline, width):
+        paint = f'fill="{self._color(fill)}"' if fill is not None else 'fill="none"'
+        if outline is not None:
+            paint += f' stroke="{self._color(outline)}" stroke-width="{width:g}"'
+        return paint
+
+    @staticmethod
+    def _color(color):
+        return "#{:02X}{:02X}{:02X}".format(*rgb(color))
+
+
+class PdfCanvas(VectorCanvas):
+    """
+    Schreibt eine Karte als einseitiges PDF ohne zusätzliche Bibliotheken
+
+    Text nutzt die PDF-Standardschrift Helvetica (metrisch gleich Arial), daher werden
+    keine Schriftdateien eingebettet. Zentrierte und rechtsbündige Texte werden daher mit
+    den Helvetica-Breiten vermessen, nicht mit der Schrift aus dem Register (die ohne
+    arial.ttf die Pillow-Standardschrift ist).
+    """
+
+    def __init__(self, width, height):
+        super().__init__(width, height)
+        # Layout-Pixel → Punkt, Ursprung oben links wie bei Pillow
+        scale = 72 / LAYOUT_DPI
+        self._ops = [f"{scale:.6f} 0 0 {-scale:.6f} 0 {height * scale:.4f} cm"]
+
+    def rounded_rectangle(self, box, radius, fill=None, outline=None, width=1):
+        x0, y0, x1, y1 = self._inset(box, outline, width)
+        self._ops.append(self._rounded_path(x0, y0, x1, y1, radius))
+        if fill is not None:
+            self._ops.insert(-1, "{:.3f} {:.3f} {:.3f} rg".format(*self._color(fill)))
+        if outline is not None:
+            self._ops.insert(-1, "{:.3f} {:.3f} {:.3f} RG {:g} w".format(*self._color(outline), width))
+        self._ops.append({(True, True): "B", (True, False): "f", (False, True): "S"}[
+            (fill is not None, outline is not None)])
+
+    def line(self, points, fill='black', width=1):
+        x0, y0, x1, y1 = points
+        self._ops.append("{:.3f} {:.3f} {:.3f} RG {:g} w".format(*self._color(fill), width))
+        self._ops.append(f"{x0:g} {y0:g} m {x1:g} {y1:g} l S")
+
+    def text(self, xy, text, font, fill='black', align='left'):
+        x, y = xy
+        if align != 'left':
+            length = helvetica_length(text, font.size)
+            x -= length / 2 if align == 'center' else length
+        baseline = y + font.getmetrics()[0]
+        encoded = text.encode("cp1252", errors="replace")
+        escaped = encoded.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+        self._ops.append("{:.3f} {:.3f} {:.3f} rg".format(*self._color(fill)))
+        # Die y-Achse ist gespiegelt, die Textmatrix dreht sie für die Schrift zurück
+        self._ops.append(f"BT /F1 {font.size} Tf 1 0 0 -1 {x:.2f} {baseline:.2f} Tm (".encode("ascii")
+                         + escaped + b") Tj ET")
+
+    def tobytes(self):
+        content = b"\n".join(op if isinstance(op, bytes) else op.encode("ascii") for op in self._ops)
+        stream = zlib.compress(content, 9)
+        scale = 72 / LAYOUT_DPI
+        objects = [
+            b"<< /Type /Catalog /Pages 2 0 R >>",
+            b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+            (f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {self.width * scale:.2f} {self.height * scale:.2f}] "
+             f"/Resources << /Font << /F1 5 0 R >> >> /Contents 4 0 R >>").encode("ascii"),
+            f"<< /Length {len(stream)} /Filter /FlateDecode >>\nstream\n".encode("ascii") + stream
+            + b"\nendstream",
+            b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+        ]
+
+        output = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        offsets = []
+        for number, body in enumerate(objects, start=1):
+            offsets.append(len(output))
+            output += f"{number} 0 obj\n".encode("ascii") + body + b"\nendobj\n"
+
+        xref = len(output)
+        output += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("ascii")
+        for offset in offsets:
+            output += f"{offset:010d} 00000 n \n".encode("ascii")
+        output += (f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\n"
+                   f"startxref\n{xref}\n%%EOF\n").encode("ascii")
+        return bytes(output)
+
+    @staticmethod
+    def _color(color):
+        return tuple(channel / 255 for channel in rgb(color))
+
+    @staticmethod
+    def _rounded_path(x0, y0, x1, y1, radius):
+        radius = min(radius, (x1 - x0) / 2, (y1 - y0) / 2)
+        if radius <= 0:
+            return f"{x0:g} {y0:g} {x1 - x0:g} {y1 - y0:g} re"
+        k = radius * (1 - BEZIER_CIRCLE)
+        return " ".join([
+            f"{x0 + radius:g} {y0:g} m",
+            f"{x1 - radius:g} {y0:g} l",
+            f"{x1 - k:g} {y0:g} {x1:g} {y0 + k:g} {x1:g} {y0 + radius:g} c",
+            f"{x1:g} {y1 - radius:g} l",
+            f"{x1:g} {y1 - k:g} {x1 - k:g} {y1:g} {x1 - radius:g} {y1:g} c",
+            f"{x0 + radius:g} {y1:g} l",
+            f"{x0 + k:g} {y1:g} {x0:g} {y1 - k:g} {x0:g} {y1 - radius:g} c",
+            f"{x0:g} {y0 + radius:g} l",
+            f"{x0:g} {y0 + k:g} {x0 + k:g} {y0:g} {x0 + radius:g} {y0:g} c",
+            "h",
+        ])
+
+
+def create_canvas(output_format, width, height):
+    """
+    Liefert eine leere Zeichenfläche für 'svg' oder 'pdf'
+    """
+    if output_format == "svg":
+        return SvgCanvas(width, height)
+    if output_format == "pdf":
+        return PdfCanvas(width, height)
+    raise ValueError(f"Unbekanntes Vektorformat: {output_format} (erlaubt: {', '.join(VECTOR_FORMATS)})")
@@ -0,0 +1,218 @@
+import argparse
+import os
+import time
+
+from besitzkarten import CARD_HEIGHT as PROPERTY_CARD_HEIGHT, CARD_WIDTH as PROPERTY_CARD_WIDTH, \
+    property_card_filename, property_card_hash, render_property_card_file
+from dkt import DEFAULTS, TARGETS, expand_targets
+from encoder import DEFAULT_PROFILE, PROFILES, output_extension
+from ereignis_gemeinschaft import CARD_HEIGHT as EVENT_CARD_HEIGHT, CARD_WIDTH as EVENT_CARD_WIDTH, \
+    dkt_card_filename, dkt_card_hash, render_dkt_card_file
+from instrumentation import metrics
+from manifest import BuildManifest
+from vector import VECTOR_FORMATS
+from workbooks import BOARD_SCHEMA, EVENT_SCHEMA, PROPERTY_SCHEMA, load_workbook
+
+
+# Abfrageintervall in Sekunden (os.stat je Datei, kein Parsen)
+POLL_INTERVAL = 0.2
+
+
+def property_entries(workbook, output_folder, output_format="raster", profile=DEFAULT_PROFILE):
+    """
+    Soll-Zustand der Grundstückskarten wie in build_property_cards
+
+    Returns:
+        dict: Zeilennummer → (Dateiname, Hash, Argumente für render_property_card_file)
+    """
+    extension = output_extension(output_format, profile)
+    entries = {}
+    for index, record in workbook.rows():
+        property_data = record._asdict()
+        if not property_data['name']:
+            continue
+        entries[index] = (property_card_filename(index, property_data, extension),
+                          property_card_hash(property_data, PROPERTY_CARD_WIDTH, PROPERTY_CARD_HEIGHT, output_format,
+                                             profile),
+                          (index, property_data, PROPERTY_CARD_WIDTH, PROPERTY_CARD_HEIGHT, output_folder,
+                           output_format, profile))
+    return entries
+
+
+def event_entries(workbook, output_folder, output_format="raster", profile=DEFAULT_PROFILE):
+    """
+    Soll-Zustand der Ereigniskarten wie in build_dkt_cards
+
+    Returns:
+        dict: Zeilennummer → (Dateiname, Hash, Argumente für render_dkt_card_file)
+    """
+    extension = output_extension(output_format, profile)
+    entries = {}
+    for index, record in workbook.rows():
+        text, action = record.text, record.action
+        if not text and not action:
+            continue
+        entries[index] = (dkt_card_filename(index, extension),
+                          dkt_card_hash(text, action, EVENT_CARD_WIDTH, EVENT_CARD_HEIGHT, output_format, profile),
+                          (index, text, action, EVENT_CARD_WIDTH, EVENT_CARD_HEIGHT, output_folder, output_format,
+                           profile))
+    return entries
+
+
+# Schema, Soll-Zustand und Zeichenfunktion je Kartenstapel
+DECKS = {
+    "property": (PROPERTY_SCHEMA, property_entries, render_property_card_file),
+    "event": (EVENT_SCHEMA, event_entries, render_dkt_card_file),
+}
+
+
+class DeckWatcher:
+    """
+    Hält Schriften, Kartenvorlagen und das dekodierte Brett im Speicher und zeichnet nach
+    jedem Speichern einer Arbeitsmappe nur die betroffenen Karten bzw. Brettfelder neu
+
+    Geänderte Dateien werden über Änderungszeit und Größe erkannt. Je Kartenstapel wird der
+    Inhalts-Hash jeder Zeile mit dem Manifest des Ausgabeordners verglichen (BuildManifest.plan:
+    verschobene Karten werden kopiert, nur neue Inhalte gezeichnet), beim Brett setzt
+    FixedPricePositionLabeler.update nur die geänderten Felder neu. Gezeichnet wird im eigenen
+    Prozess, damit die Caches warm bleiben; das Manifest bleibt dabei gültig, ein späteres
+    'dkt build' zeichnet nichts doppelt.
+    """
+
+    def __init__(self, targets=("all",), output_format="raster", profile=DEFAULT_PROFILE, options=None):
+        self.targets = expand_targets(targets)
+        self.output_format = output_format
+        self.profile = profile
+        self.options = {target: {**DEFAULTS[target], **(options or {}).get(target, {})} for target in TARGETS}
+        self._signatures = {}
+        self._labeler = None
+
+    def sources(self, target):
+        """
+        Dateien, deren Änderung das Ziel betrifft (beim Brett auch Vorlage und Layout)
+        """
+        options = self.options[target]
+        if target == "board":
+            return [options["excel_file"], options["template"], options["layout"]]
+        return [options["excel_file"]]
+
+    def poll(self):
+        """
+        Prüft alle Quellen einmal und aktualisiert die Ziele, deren Dateien sich geändert haben
+
+        Returns:
+            list: (Ziel, Liste der neu gezeichneten Dateien, Sekunden) je aktualisiertem Ziel
+        """
+        updates = []
+        for target in self.targets:
+            try:
+                signature = tuple(_signature(path) for path in self.sources(target))
+            except OSError:
+                # Datei wird gerade ersetzt (Speichern über eine temporäre Datei)
+                continue
+            previous = self._signatures.get(target)
+            if signature == previous:
+                continue
+            self._signatures[target] = signature
+            if target == "board" and (previous is None or previous[1:] != signature[1:]):
+                # Vorlage oder Layout geändert: altes Brett sofort verwerfen, auch wenn das Neuladen scheitert
+                self._labeler = None
+
+            start = time.perf_counter()
+            try:
+                with metrics.span("watch", target=target):
+                    if target == "board":
+                        written = self._refresh_board()
+                    else:
+                        written = self._refresh_deck(target)
+            except Exception as e:
+                # Halb gespeicherte oder ungültige Datei: beim nächsten Speichern erneut versuchen
+                print(f"❌ {self.options[target]['excel_file']}: {type(e).__name__}: {e}")
+                continue
+            updates.append((target, written, time.perf_counter() - start))
+        return updates
+
+    def _refresh_deck(self, target):
+        schema, entries_of, render = DECKS[target]
+        options = self.options[target]
+        output_folder = options["output"]
+        os.makedirs(output_folder, exist_ok=True)
+
+        workbook = load_workbook(options["excel_file"], schema)
+        entries = entries_of(workbook, output_folder, self.output_format, self.profile)
+        tasks = list(entries.values())
+
+        # Wie in build_dkt_cards: verschobene oder gleiche Karten werden kopiert statt gezeichnet
+        manifest = BuildManifest(output_folder)
+        plan = manifest.plan([(filename, digest) for filename, digest, _ in tasks])
+
+        written, failed = [], []
+        for position in plan.render:
+            task = tasks[position][2]
+            try:
+                written.append(render(*task).path)
+            except Exception as e:
+                failed.append(position)
+                print(f"❌ Karte {task[0] + 1} fehlgeschlagen: {e}")
+
+        copied = manifest.finish(plan, failed)
+        written += [os.path.join(output_folder, tasks[position][0]) for position in copied]
+        metrics.count("cards.rendered", len(plan.render) - len(failed))
+        metrics.count("cards.copied", len(copied))
+        return written
+
+    def _refresh_board(self):
+        from script import FixedPricePositionLabeler
+
+        options = self.options["board"]
+        workbook = load_workbook(options["excel_file"], BOARD_SCHEMA)
+        if self._labeler is None:
+            self._labeler = FixedPricePositionLabeler(options["template"], df=workbook, layout=options["layout"])
+        elif not self._labeler.update(workbook):
+            return []
+
+        self._labeler.label_board_fixed_prices(options["output"], options["font_size"], profile=self.profile)
+        return [self._labeler.encoded.path]
+
+
+def watch(targets=("all",), output_format="raster", profile=DEFAULT_PROFILE, interval=POLL_INTERVAL,
+          watcher=None):
+    """
+    Beobachtet die Arbeitsmappen, bis Strg+C gedrückt wird
+
+    Beim Start wird einmal abgeglichen (nur fehlende oder veraltete Ausgaben werden gezeichnet).
+    """
+    watcher = watcher or DeckWatcher(targets, output_format, profile)
+    files = sorted({path for target in watcher.targets for path in watcher.sources(target)})
+    print(f"👀 Beobachte {', '.join(files)} (Strg+C beendet)")
+    try:
+        while True:
+            for target, written, seconds in watcher.poll():
+                if written:
+                    print(f"⚡ {target}: {len(written)} neu in {seconds * 1000:.0f} ms")
+                    for path in written:
+                        print(f"   {path}")
+                else:
+                    print(f"✔️ {target}: nichts betroffen ({seconds * 1000:.0f} ms)")
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
+
+
+def _signature(path):
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+# Hauptfunktion
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Zeichnet Karten und Brett nach jedem Speichern der Arbeitsmappen neu")
+    parser.add_argument("targets", nargs="*", default=["all"],
+                        help=f"Ziele: {', '.join(TARGETS)} oder all (Standard: all)")
+    parser.add_argument("--format", choices=("raster",) + VECTOR_FORMATS, default="raster",
+                        help="Format der Karten (Brett bleibt Raster)")
+    parser.add_argument("--profile", choices=tuple(PROFILES), default=DEFAULT_PROFILE, help="Kodierprofil")
+    parser.add_argument("--interval", type=float, default=POLL_INTERVAL, help="Abfrageintervall in Sekunden")
+    args = parser.parse_args()
+
+    watch(args.targets, args.format, args.profile, args.interval)
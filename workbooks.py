@@ -0,0 +1,346 @@
+import hashlib
+import os
+import pickle
+from collections import namedtuple
+
+from instrumentation import metrics
+
+
+# Bei Änderungen am Cache-Format oder an der Konvertierung erhöhen
+CACHE_VERSION = 2
+CACHE_FOLDER = ".dkt_cache"
+
+
+class Column:
+    """
+    Eine Spalte des Schemas: Name in der Datei, Typ, Standardwert und Feldname im Datensatz
+    """
+
+    def __init__(self, name, kind, default, required=True, field=None):
+        self.name = name
+        self.kind = kind  # 'str' oder 'int'
+        self.default = default
+        self.required = required
+        self.field = field or name
+
+
+class Schema:
+    """
+    Spalten einer Arbeitsmappe und der daraus erzeugte Datensatztyp
+    """
+
+    def __init__(self, name, columns, version=1):
+        self.name = name
+        self.columns = columns
+        self.version = version
+        self.record_type = namedtuple(f"{name.capitalize()}Record", [column.field for column in columns])
+
+    @property
+    def required_columns(self):
+        return [column.name for column in self.columns if column.required]
+
+    def missing_columns(self, available):
+        available = set(available)
+        return [name for name in self.required_columns if name not in available]
+
+
+PROPERTY_SCHEMA = Schema("property", [
+    Column('Name', 'str', "", field='name'),
+    Column('Farbe', 'str', "#0066CC", field='color'),
+    Column('Kaufpreis', 'int', 0, field='kaufpreis'),
+    Column('Miete', 'int', 0, field='miete'),
+    Column('Miete_1_Haus', 'int', 0, field='miete_1_haus'),
+    Column('Miete_2_Haus', 'int', 0, field='miete_2_haus'),
+    Column('Miete_3_Haus', 'int', 0, field='miete_3_haus'),
+    Column('Miete_4_Haus', 'int', 0, field='miete_4_haus'),
+    Column('Miete_Hotel', 'int', 0, field='miete_hotel'),
+    Column('Hauspreis', 'int', 0, field='hauspreis'),
+    Column('Hypothek', 'int', 0, field='hypothek'),
+    Column('IstBahnhof', 'int', 0, required=False),
+    Column('IstWerk', 'int', 0, required=False),
+])
+
+# Typ/Betrag/Ziel beschreiben die Aktion optional strukturiert (siehe card_actions.py)
+EVENT_SCHEMA = Schema("event", [
+    Column('Text', 'str', "", field='text'),
+    Column('Aktion', 'str', "", field='action'),
+    Column('Typ', 'str', "", required=False, field='action_type'),
+    Column('Betrag', 'int', 0, required=False, field='amount'),
+    Column('Ziel', 'str', "", required=False, field='target'),
+], version=2)
+
+BOARD_SCHEMA = Schema("board", [
+    Column('Name', 'str', ""),
+    Column('Preis', 'int', 0),
+    Column('Farbe', 'str', "", required=False),
+    Column('Titel', 'str', "", required=False),
+])
+
+
+class LoadedWorkbook:
+    """
+    Spaltenweise konvertierter Inhalt einer Arbeitsmappe
+
+    columns enthält pro Spalte eine Liste mit Python-Werten (str/int), records die daraus
+    erzeugten Datensätze, index die ursprünglichen Zeilennummern (0-basiert).
+    """
+
+    def __init__(self, schema, columns, index, source=None):
+        self.schema = schema
+        self.columns = columns
+        self.index = index
+        self.source = source
+        self._records = None
+
+    @property
+    def records(self):
+        if self._records is None:
+            fields = [self.columns[column.name] for column in self.schema.columns]
+            self._records = [self.schema.record_type(*values) for values in zip(*fields)]
+        return self._records
+
+    def rows(self):
+        """
+        Liefert (Zeilennummer, Datensatz)-Paare
+        """
+        return zip(self.index, self.records)
+
+    def __getitem__(self, column_name):
+        return self.columns[column_name]
+
+    def __len__(self):
+        return len(self.index)
+
+    def __getstate__(self):
+        # Datensätze nicht mitspeichern, sie werden bei Bedarf neu erzeugt
+        return {'schema': self.schema.name, 'columns': self.columns, 'index': self.index, 'source': self.source}
+
+    def __setstate__(self, state):
+        self.schema = SCHEMAS[state['schema']]
+        self.columns = state['columns']
+        self.index = state['index']
+        self.source = state['source']
+        self._records = None
+
+
+SCHEMAS = {schema.name: schema for schema in (PROPERTY_SCHEMA, EVENT_SCHEMA, BOARD_SCHEMA)}
+
+
+def convert_frame(df, schema, source=None, index_offset=0):
+    """
+    Prüft das Schema einmal und konvertiert alle Spalten vektorisiert
+
+    Args:
+        df (DataFrame): Rohdaten
+        schema (Schema): Erwartete Spalten
+        source (str): Pfad der Quelle (für Fehlermeldungen)
+        index_offset (int): Zeilennummer der ersten Zeile (beim Streamen in Blöcken)
+
+    Raises:
+        ValueError: Bei fehlenden Pflichtspalten oder nicht-numerischen Werten in Zahlenspalten
+    """
+    import pandas as pd
+
+    missing = schema.missing_columns(df.columns)
+    if missing:
+        raise ValueError(f"Fehlende Spalten in '{source or schema.name}': {missing} "
+                         f"(verfügbar: {list(df.columns)})")
+
+    columns = {}
+    for column in schema.columns:
+        if column.name not in df.columns:
+            columns[column.name] = [column.default] * len(df)
+            continue
+
+        series = df[column.name]
+        if column.kind == 'int':
+            try:
+                numbers = pd.to_numeric(series, errors='raise')
+            except (ValueError, TypeError) as e:
+                raise ValueError(f"Spalte '{column.name}' in '{source or schema.name}' ist nicht numerisch: {e}")
+            columns[column.name] = numbers.fillna(column.default).astype('int64').tolist()
+        else:
+            texts = series.astype(object).where(series.notna(), None)
+            columns[column.name] = [column.default if value is None else str(value) for value in texts]
+
+    index = [index_offset + position for position in range(len(df))]
+    return LoadedWorkbook(schema, columns, index, source)
+
+
+def as_workbook(data, schema):
+    """
+    Nimmt einen LoadedWorkbook oder ein DataFrame und liefert einen LoadedWorkbook
+    """
+    if isinstance(data, LoadedWorkbook):
+        return data
+    return convert_frame(data, schema)
+
+
+def read_frame(path, chunksize=None):
+    """
+    Liest eine Quelldatei (XLSX/XLS/ODS, CSV oder JSON) als DataFrame
+
+    Mit chunksize werden CSV- und JSON-Lines-Dateien blockweise gelesen (Iterator von DataFrames).
+    """
+    import pandas as pd
+
+    extension = os.path.splitext(path)[1].lower()
+    if extension in ('.xlsx', '.xlsm', '.xls'):
+        frame = pd.read_excel(path)
+    elif extension == '.ods':
+        frame = pd.read_excel(path, engine='odf')
+    elif extension == '.csv':
+        return pd.read_csv(path, chunksize=chunksize) if chunksize else pd.read_csv(path)
+    elif extension in ('.jsonl', '.ndjson'):
+        return pd.read_json(path, lines=True, chunksize=chunksize) if chunksize else pd.read_json(path, lines=True)
+    elif extension == '.json':
+        frame = pd.read_json(path)
+    else:
+        raise ValueError(f"Nicht unterstütztes Dateiformat: {path}")
+
+    return [frame] if chunksize else frame
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def cache_path(path, schema):
+    return _cache_file(path, schema.name)
+
+
+def _cache_file(path, name):
+    folder = os.path.join(os.path.dirname(os.path.abspath(path)), CACHE_FOLDER)
+    return os.path.join(folder, f"{os.path.basename(path)}.{name}.pickle")
+
+
+def load_workbook(path, schema, use_cache=True):
+    """
+    Lädt eine Arbeitsmappe, bei unveränderter Datei aus dem Binär-Cache
+
+    Der Cache wird über Änderungszeit und Größe geprüft; weicht die Änderungszeit ab,
+    entscheidet der SHA-256 des Inhalts, sodass ein bloßes Speichern ohne Änderung
+    kein erneutes Parsen auslöst.
+
+    Returns:
+        LoadedWorkbook
+    """
+    with metrics.span("excel", file=os.path.basename(path), schema=schema.name):
+        return load_cached(path, schema.name, schema.version,
+                           lambda: convert_frame(read_frame(path), schema, source=path), use_cache)
+
+
+def load_cached(path, name, version, build, use_cache=True, counter="excel"):
+    """
+    Liefert ein aus der Datei path abgeleitetes Objekt aus dem Cache neben der Datei (.dkt_cache)
+
+    Gültigkeit wie bei load_workbook; sonst wird build() aufgerufen und das Ergebnis gespeichert.
+
+    Args:
+        name (str): Art des Objekts (Teil des Cache-Dateinamens)
+        version (int): Bei Änderungen am Objekt erhöhen
+        counter (str): Präfix der Zähler '<counter>.cached' / '<counter>.parsed'
+    """
+    stat = os.stat(path)
+    key = (CACHE_VERSION, version, stat.st_size)
+    cached_file = _cache_file(path, name)
+
+    if use_cache and os.path.exists(cached_file):
+        try:
+            with open(cached_file, 'rb') as f:
+                cached = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, KeyError, ImportError):
+            cached = None
+
+        if cached is not None and cached['key'] == key:
+            if cached['mtime_ns'] == stat.st_mtime_ns:
+                metrics.count(f"{counter}.cached")
+                return cached['value']
+            digest = file_digest(path)
+            if cached['digest'] == digest:
+                metrics.count(f"{counter}.cached")
+                _write_cache(cached_file, key, stat.st_mtime_ns, digest, cached['value'])
+                return cached['value']
+
+    metrics.count(f"{counter}.parsed")
+    value = build()
+
+    if use_cache:
+        try:
+            _write_cache(cached_file, key, stat.st_mtime_ns, file_digest(path), value)
+        except OSError:
+            # Cache ist optional (z. B. schreibgeschützter Ordner)
+            pass
+
+    return value
+
+
+def _write_cache(cached_file, key, mtime_ns, digest, value):
+    os.makedirs(os.path.dirname(cached_file), exist_ok=True)
+    temp_file = cached_file + ".tmp"
+    with open(temp_file, 'wb') as f:
+        pickle.dump({'key': key, 'mtime_ns': mtime_ns, 'digest': digest, 'value': value}, f,
+                    protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temp_file, cached_file)
+
+
+def iter_records(path, schema, chunksize=10000):
+    """
+    Liest sehr große Decks blockweise (CSV/JSON Lines) und liefert (Zeilennummer, Datensatz)
+
+    Excel- und ODS-Dateien werden am Stück gelesen, da sie sich nicht streamen lassen.
+    """
+    offset = 0
+    for frame in read_frame(path, chunksize=chunksize):
+        workbook = convert_frame(frame, schema, source=path, index_offset=offset)
+        yield from workbook.rows()
+        offset += len(frame)
+
+
+def load_editions(paths, schema):
+    """
+    Lädt Ausgaben (Editionen) aus einer oder mehreren Arbeitsmappen
+
+    Jede Datei ist eine Ausgabe, benannt nach dem Dateinamen. Excel- und ODS-Dateien mit
+    mehreren Tabellenblättern liefern eine Ausgabe je Blatt, benannt nach dem Blatt.
+
+    Returns:
+        list: (Name, LoadedWorkbook) in Reihenfolge der Dateien bzw. Blätter
+
+    Raises:
+        ValueError: Bei doppelten Namen oder ungültigem Schema
+    """
+    editions = []
+    for path in paths:
+        stem = os.path.splitext(os.path.basename(path))[0]
+        sheets = _sheet_names(path)
+        if len(sheets) <= 1:
+            editions.append((stem, load_workbook(path, schema)))
+            continue
+
+        import pandas as pd
+
+        with metrics.span("excel", file=os.path.basename(path), schema=schema.name, sheets=len(sheets)):
+            frames = pd.read_excel(path, sheet_name=None, engine='odf' if path.lower().endswith('.ods') else None)
+        for sheet, frame in frames.items():
+            editions.append((str(sheet), convert_frame(frame, schema, source=f"{path}#{sheet}")))
+
+    names = [name for name, _ in editions]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise ValueError(f"Doppelte Ausgaben: {duplicates} (Dateien bzw. Tabellenblätter umbenennen)")
+    return editions
+
+
+def _sheet_names(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in ('.xlsx', '.xlsm', '.xls', '.ods'):
+        return []
+    import pandas as pd
+
+    with pd.ExcelFile(path, engine='odf' if extension == '.ods' else None) as workbook:
+        return workbook.sheet_names